@@ -6,22 +6,89 @@ Beautiful modern desktop app to calculate total duration of copied Cubase/Nuendo
 Uses CustomTkinter for modern, rounded buttons and native dark mode support.
 """
 
+import time
+launch_started = time.perf_counter()  # The startup budget counts from here, imports included
+
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import customtkinter
-import xml.etree.ElementTree as ET
-import subprocess
+import argparse
 import json
 import os
-from PIL import Image, ImageDraw
+import itertools
+import multiprocessing
+import sys
+import threading
+
+import audiotally_core as core
+from audiotally_clipboard import ClipboardGuard, get_backend
+from audiotally_worker import TallyWorker
+from audiotally_scheduler import AdaptivePollScheduler, DEFAULT_MAX_INTERVAL, DEFAULT_MIN_INTERVAL
+from audiotally_cache import TallyCache
+from audiotally_basket import TallyBasket
+from audiotally_history import HistoryWriter, TallyHistory, make_entry
+from audiotally_timing import StartupTimer, timings
+import audiotally_export as export
+from audiotally_view import WidgetView, status_sections
+import audiotally_coverage
+from audiotally_store import FileIndex, FILE_SORTS
+
+# Launch phases: imports, window, app state, UI build, first poll, first window shown, deferred assets
+startup = StartupTimer(launch_started)
+startup.mark("import")
+
 
-# Set CustomTkinter appearance and theme
-customtkinter.set_appearance_mode("System")  # Modes: "System" (default), "Dark", "Light"  
-customtkinter.set_default_color_theme("dark-blue")  # Themes: "blue" (default), "green", "dark-blue"
+def unbind_handler(widget, sequence, funcid):
+    """Remove one handler added with bind(..., add='+'), keeping the others bound to sequence"""
+    others = [line for line in widget.bind(sequence).split('\n') if line and funcid not in line]
+    widget.unbind(sequence, funcid)
+    # Before Python 3.13 unbind() drops every handler of the sequence, funcid or not
+    if others and sys.version_info < (3, 13):
+        widget.bind(sequence, '\n'.join(others))
+
+
+# Images shown in the window (PIL is only imported once the window is up)
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
 
 # Configuration file to remember user preferences
 CONFIG_FILE = os.path.expanduser("~/.cubase-nuendo_duration_calc_config.json")
 
+# Local SQLite database keeping every tally
+HISTORY_FILE = os.path.expanduser("~/.cubase-nuendo_duration_calc_history.sqlite3")
+
+# Tallies shown per page in the history window
+HISTORY_PAGE_ROWS = 100
+
+# Config changes are written this long after the last one, so bursts cost one write (ms)
+CONFIG_SAVE_DELAY = 1000
+
+# How often to check whether a background export finished (ms)
+EXPORT_CHECK_INTERVAL = 100
+
+# Export menu entries as (label, what, format)
+EXPORT_CHOICES = [
+    ("Clips as CSV…", 'clips', 'csv'),
+    ("Clips as JSON Lines…", 'clips', 'jsonl'),
+    ("Clips as EDL…", 'clips', 'edl'),
+    ("Source files as CSV…", 'files', 'csv'),
+    ("Source files as JSON Lines…", 'files', 'jsonl'),
+]
+
+# How often the stage timing overlay refreshes (ms)
+TIMING_OVERLAY_REFRESH = 1000
+
+# How often to look for finished background tallies while a job is in flight (ms)
+WORKER_CHECK_INTERVAL = 30
+
+# Details panel rendering: clip rows inserted per page, and how far down (0-1) the view
+# must be scrolled before the next page is materialized
+DETAILS_PAGE_ROWS = 200
+DETAILS_LOAD_THRESHOLD = 0.9
+
+# Footer appended to the detailed results
+DETAILS_FOOTER = ("\n✅ Original clipboard data preserved for pasting!\n"
+                  "📋 You can still paste normally in Cubase/Nuendo")
+
 class NuendoDurationCalculator:
     def __init__(self, root):
         self.root = root
@@ -31,14 +98,55 @@ class NuendoDurationCalculator:
         
         # Load saved configuration
         self.config = self.load_config()
+        self.saved_config = json.dumps(self.config)  # What the config file holds, to skip writes that change nothing
+        self.config_save_id = None  # Pending debounced write
         
         # Optimized clipboard tracking for better performance
-        self.cached_clips = None
-        self.cached_clipboard_content = ""
-        self.original_clipboard_content = ""  # Store original XML for restoration
-        
+        self.cached_clips = None  # Clips of the selection currently shown
+        self.tally_cache = self.create_tally_cache()  # Recently parsed selections by fingerprint
+        self.last_tally = None  # TallyResult of the selection copied last
+        self.basket = TallyBasket()  # Distinct regions accumulated across copies in basket mode
+        
+        # Tallies are written to the history database in batches by a background thread
+        self.history = HistoryWriter(HISTORY_FILE) if self.config.get('history', True) else None
+        self.history_window = None
+        self.timing_window = None  # Stage timing overlay, opened with F12
+        self.view = WidgetView()  # Labels and buttons are only reconfigured when what they show changes
+        self.original_clipboard_bytes = b""  # Store original raw XML for restoration
+        self.original_clipboard_count = None  # Clipboard change count when it was read
+        self.last_clipboard_hash = None  # Fingerprint of the last Cubase/Nuendo payload seen
+        
+        # Details are rendered lazily: only when the panel is shown, one page of rows at a time
+        self.details_source = None  # Clips, sample rate and aggregates of the latest calculation
+        self.details_dirty = False
+        self.details_rows = None  # Iterator over the rows not inserted yet
+        self.details_load_pending = False
+        
+        # Clipboard backend with a cheap change counter, so unchanged polls never fetch the payload
+        self.clipboard = get_backend()
+        self.clipboard_guard = ClipboardGuard(self.clipboard)
+        
+        # Parsing and aggregation run on a background thread so large selections never freeze the window
+        self.worker = TallyWorker(self.get_coverage_mode(), parallel=True)
+        self.worker_check_id = None
+        
+        # Poll fast right after activity and back off while idle; bounds come from the config
+        self.poller = self.create_poll_scheduler()
+        self.poll_id = None
+        self.root.bind('<FocusIn>', self.on_window_focus, add='+')
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.bind('<F12>', self.toggle_timing_overlay)
+        startup.mark("app_init")
+        
+        # Only what the first window shows is built now; images follow once it is on screen,
+        # the details panel and the pinned icon on first use
+        self.images = {}  # Asset file name -> CTkImage
+        self.startup_report = False  # Print the startup breakdown to stderr once assets are loaded
         self.setup_ui()
+        startup.mark("ui_build")
         self.auto_check_clipboard()
+        startup.mark("first_poll")
+        self.map_binding = self.root.bind('<Map>', self.on_first_map, add='+')
         
     def load_config(self):
         """Load user configuration"""
@@ -50,18 +158,53 @@ class NuendoDurationCalculator:
             pass
         return {'last_sample_rate': '48000'}
     
+    def get_coverage_mode(self):
+        """Configured overlap-aware coverage mode ("selection", "per_file"), or None when switched off"""
+        mode = self.config.get('coverage_mode', audiotally_coverage.MODE_SELECTION)
+        return mode if mode in audiotally_coverage.MODES else None
+    
+    def create_poll_scheduler(self):
+        """Create the clipboard poll scheduler from the configured interval bounds"""
+        try:
+            return AdaptivePollScheduler(int(self.config.get('poll_min_ms', DEFAULT_MIN_INTERVAL)),
+                                         int(self.config.get('poll_max_ms', DEFAULT_MAX_INTERVAL)))
+        except (TypeError, ValueError):
+            # Bad bounds in the config file - fall back to the defaults
+            return AdaptivePollScheduler()
+    
+    def create_tally_cache(self):
+        """Create the parsed-selection cache from the configured entry and memory bounds"""
+        try:
+            return TallyCache(int(self.config.get('cache_max_entries', 8)),
+                              int(float(self.config.get('cache_max_mb', 64)) * 1024 * 1024))
+        except (TypeError, ValueError):
+            # Bad bounds in the config file - fall back to the defaults
+            return TallyCache()
+    
     def save_config(self):
-        """Save user configuration"""
+        """Save user configuration shortly, so a burst of changes is written once"""
+        if self.config_save_id is None:
+            self.config_save_id = self.root.after(CONFIG_SAVE_DELAY, self.write_config)
+    
+    def write_config(self):
+        """Write user configuration now, unless the file already holds it"""
+        if self.config_save_id is not None:
+            self.root.after_cancel(self.config_save_id)
+            self.config_save_id = None
+        text = json.dumps(self.config)
+        if text == self.saved_config:
+            return
         try:
             with open(CONFIG_FILE, 'w') as f:
-                json.dump(self.config, f)
+                f.write(text)
+            self.saved_config = text
         except:
             pass
     
     def setup_ui(self):
         """Create the user interface"""
         # Main frame
-        main_frame = ttk.Frame(self.root, padding="20")
+        main_frame = self.main_frame = ttk.Frame(self.root, padding="20")
         main_frame.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Configure grid weights
@@ -72,21 +215,14 @@ class NuendoDurationCalculator:
         main_frame.columnconfigure(2, weight=1)  # Right column for buttons
         main_frame.rowconfigure(9, weight=1)  # Updated for new layout - expandable area for results
         
-        # Logo and Always-on-top setup
-        logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "logo.png")
-        
         # BIG TITLE "AudioTally" - Above logo, centered
         big_title_label = ttk.Label(main_frame, text="AudioTally", 
                                font=("Arial", 32, "bold"))
         big_title_label.grid(row=0, column=0, columnspan=3, pady=(0, 15))
         
-        # Logo (centered)
-        logo_image = customtkinter.CTkImage(
-            Image.open(logo_path),
-            size=(128, 64)  # Width calculated from 512:256 ratio at 64px height
-        )
-        logo_label = customtkinter.CTkLabel(main_frame, image=logo_image, text="")
-        logo_label.grid(row=1, column=0, columnspan=3, pady=(0, 10))  # Centered across all 3 columns
+        # Logo (centered) - its space is reserved now and the image set by load_deferred_assets
+        self.logo_label = customtkinter.CTkLabel(main_frame, text="", width=128, height=64)
+        self.logo_label.grid(row=1, column=0, columnspan=3, pady=(0, 10))  # Centered across all 3 columns
         
         # Always-on-top toggle button (top-right corner)
         self.always_on_top = False  # Default state: not always on top
@@ -107,16 +243,7 @@ class NuendoDurationCalculator:
         ttk.Label(main_frame, text="Project Sample Rate:").grid(row=4, column=0, sticky=tk.W, pady=5)
         
         self.sample_rate_var = tk.StringVar()
-        sample_rates = [
-            ("8 kHz", "8000"),
-            ("16 kHz", "16000"), 
-            ("22.05 kHz", "22050"),
-            ("32 kHz", "32000"),
-            ("44.1 kHz", "44100"),
-            ("48 kHz", "48000"),
-            ("96 kHz", "96000"),
-            ("192 kHz", "192000")
-        ]
+        sample_rates = core.SAMPLE_RATES
         
         self.sample_rate_combo = ttk.Combobox(main_frame, textvariable=self.sample_rate_var, 
                                              values=[f"{name}" for name, _ in sample_rates], 
@@ -130,6 +257,20 @@ class NuendoDurationCalculator:
         
         # Store the mapping for easy lookup
         self.rate_mapping = {name: value for name, value in sample_rates}
+        # A new rate re-formats the sample totals already computed - nothing is parsed again
+        self.sample_rate_combo.bind('<<ComboboxSelected>>', self.on_sample_rate_changed)
+        
+        # Timecode frame rate for the formatted total
+        timecode_frame = ttk.Frame(main_frame)
+        timecode_frame.grid(row=4, column=2, sticky=tk.E, pady=5)
+        ttk.Label(timecode_frame, text="Timecode:").pack(side=tk.LEFT)
+        saved_timecode_rate = self.config.get('timecode_rate', core.DEFAULT_TIMECODE_RATE)
+        self.timecode_rate_var = tk.StringVar(value=saved_timecode_rate if saved_timecode_rate in core.TIMECODE_RATES
+                                              else core.DEFAULT_TIMECODE_RATE)
+        timecode_combo = ttk.Combobox(timecode_frame, textvariable=self.timecode_rate_var,
+                                      values=list(core.TIMECODE_RATES), state="readonly", width=8)
+        timecode_combo.pack(side=tk.LEFT, padx=(5, 0))
+        timecode_combo.bind('<<ComboboxSelected>>', self.on_timecode_rate_changed)
         
         # 3-Section Status Bar
         self.setup_status_bar(main_frame)
@@ -149,6 +290,23 @@ class NuendoDurationCalculator:
         
         # Remove ttk styling since we're using tk.Button now for better control
         
+        # Basket mode - each copy adds its regions to a running total, counting shared regions once
+        basket_frame = ttk.Frame(main_frame)
+        basket_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(0, 5))
+        basket_frame.columnconfigure(1, weight=1)
+        
+        self.basket_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(basket_frame, text="🧺 Basket mode", variable=self.basket_var,
+                        command=self.toggle_basket).grid(row=0, column=0, sticky=tk.W)
+        self.basket_label = ttk.Label(basket_frame, text="")
+        self.view.remember(self.basket_label, text="")
+        self.basket_label.grid(row=0, column=1, sticky=tk.W, padx=(10, 0))
+        ttk.Button(basket_frame, text="Undo last copy", command=self.undo_basket_copy).grid(row=0, column=2, padx=(0, 5))
+        ttk.Button(basket_frame, text="Clear", command=self.clear_basket).grid(row=0, column=3)
+        ttk.Button(basket_frame, text="🕘 History", command=self.open_history).grid(row=0, column=4, padx=(15, 0))
+        self.export_btn = ttk.Button(basket_frame, text="📤 Export", command=self.show_export_menu)
+        self.export_btn.grid(row=0, column=5, padx=(5, 0))
+        
         # Configure main frame row for expandable area
         main_frame.rowconfigure(9, weight=1)
         
@@ -159,13 +317,35 @@ class NuendoDurationCalculator:
         self.big_result_label = ttk.Label(self.big_result_frame, text="", 
                                          font=("Arial", 32, "bold"), foreground="#CDEFF7") # RESULT COLOR
         self.big_result_label.pack()
+        self.view.remember(self.big_result_label, text="")
+        
+        # The same total in seconds and as timecode
+        self.formats_label = ttk.Label(self.big_result_frame, text="", font=("Arial", 13), foreground="#AAAAAA")
+        self.formats_label.pack()
+        self.view.remember(self.formats_label, text="")
         
         # Show/Hide Details button - Initially hidden, will appear after calculation
         self.details_visible = tk.BooleanVar(value=False)
         
+        self.toggle_details_btn = None  # Created by show_total after the first calculation
+        self.results_frame = None  # Created by build_results_panel when first shown
+        
+        # Per-source-file summary ordering - re-sorts the cached index, never re-parses
+        self.file_sort_var = tk.StringVar(value=self.config.get('file_sort', 'duration'))
+        
+        # Auto-detect is always enabled (simplified - no checkbox needed)
+        self.auto_detect_var = tk.BooleanVar(value=True)
+        
+        self.last_result = ""
+        
+        # Initialize status to ready state
+        self.set_status_ready()
+    
+    def build_details_button(self):
+        """Create the Show/Hide Details button, hidden until the first calculation"""
         # Use solid colors that mimic your gradient (no layering issues)
         self.toggle_details_btn = customtkinter.CTkButton(
-            main_frame,
+            self.main_frame,
             text="📝 Show Details",
             command=self.toggle_details,
             height=40,  # Good height for touch targets  
@@ -175,42 +355,76 @@ class NuendoDurationCalculator:
             hover_color="#2D2D5F",  # Bottom color from your gradient
             text_color="white"  # Ensure text is visible
         )
-        # Don't grid it initially - it will be shown after calculation
-        
-        # Results area - Initially hidden
-        self.results_frame = ttk.LabelFrame(main_frame, text="Detailed Results", padding="10")
-        # Don't grid it initially - it will be shown/hidden by toggle
-        
-        self.results_frame.columnconfigure(0, weight=1)
-        self.results_frame.rowconfigure(0, weight=1)
-        
-        # Results text widget with scrollbar - High contrast colors
-        self.results_text = tk.Text(self.results_frame, height=20, wrap=tk.WORD, 
-                                   font=("Monaco", 12), 
-                                   bg="white", fg="black",  # High contrast: black text on white background
-                                   relief=tk.SOLID, bd=1, padx=10, pady=10)
-        scrollbar = ttk.Scrollbar(self.results_frame, orient=tk.VERTICAL, command=self.results_text.yview)
-        self.results_text.configure(yscrollcommand=scrollbar.set)
-        
-        self.results_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
-        
-        # Add placeholder text to show the area is working
-        placeholder_text = "Detailed analysis will appear here...\n\n"
-        placeholder_text += "📊 Individual clip durations\n"
-        placeholder_text += "📈 Sample information\n" 
-        placeholder_text += "🔊 Technical details\n"
-        
-        self.results_text.insert(1.0, placeholder_text)
-        self.results_text.config(state=tk.DISABLED)  # Make read-only initially
-        
-        # Auto-detect is always enabled (simplified - no checkbox needed)
-        self.auto_detect_var = tk.BooleanVar(value=True)
-        
-        self.last_result = ""
-        
-        # Initialize status to ready state
-        self.set_status_ready()
+        self.view.remember(self.toggle_details_btn, text="📝 Show Details")
+    
+    def build_results_panel(self):
+        """Create the detailed results panel the first time it is shown"""
+        with timings.stage("ui.results_panel"):
+            self.results_frame = ttk.LabelFrame(self.main_frame, text="Detailed Results", padding="10")
+            
+            self.results_frame.columnconfigure(1, weight=1)
+            self.results_frame.rowconfigure(1, weight=1)
+            
+            # Per-source-file summary ordering
+            ttk.Label(self.results_frame, text="Sort files by:").grid(row=0, column=0, sticky=tk.W, pady=(0, 5))
+            file_sort_combo = ttk.Combobox(self.results_frame, textvariable=self.file_sort_var,
+                                           values=list(FILE_SORTS), state="readonly", width=10)
+            file_sort_combo.grid(row=0, column=1, sticky=tk.W, pady=(0, 5), padx=(10, 0))
+            file_sort_combo.bind('<<ComboboxSelected>>', self.on_file_sort_changed)
+            
+            # Results text widget with scrollbar - High contrast colors
+            self.results_text = tk.Text(self.results_frame, height=20, wrap=tk.WORD, 
+                                       font=("Monaco", 12), 
+                                       bg="white", fg="black",  # High contrast: black text on white background
+                                       relief=tk.SOLID, bd=1, padx=10, pady=10)
+            self.results_scrollbar = ttk.Scrollbar(self.results_frame, orient=tk.VERTICAL,
+                                                   command=self.results_text.yview)
+            self.results_text.configure(yscrollcommand=self.on_details_scroll)
+            
+            self.results_text.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
+            self.results_scrollbar.grid(row=1, column=2, sticky=(tk.N, tk.S))
+            
+            # Add placeholder text to show the area is working
+            placeholder_text = "Detailed analysis will appear here...\n\n"
+            placeholder_text += "📊 Individual clip durations\n"
+            placeholder_text += "📈 Sample information\n" 
+            placeholder_text += "🔊 Technical details\n"
+            
+            self.results_text.insert(1.0, placeholder_text)
+            self.results_text.config(state=tk.DISABLED)  # Make read-only initially
+    
+    def load_image(self, name, size):
+        """CTkImage of an asset, loaded on first use"""
+        image = self.images.get(name)
+        if image is None:
+            from PIL import Image  # Not needed before the window is on screen
+            image = self.images[name] = customtkinter.CTkImage(Image.open(os.path.join(ASSETS_DIR, name)),
+                                                               size=size)
+        return image
+    
+    def on_first_map(self, event):
+        """The window is on screen: end the startup budget and load the images it still lacks"""
+        if event.widget is not self.root:
+            return
+        unbind_handler(self.root, '<Map>', self.map_binding)
+        startup.mark("window_shown", ends_budget=True)
+        self.root.after_idle(self.load_deferred_assets)
+    
+    def load_deferred_assets(self):
+        """Set the logo and pin icon, then report the startup phases"""
+        try:
+            self.logo_label.configure(image=self.load_image("logo.png", (128, 64)))  # 512:256 ratio at 64px height
+            self.always_on_top_btn.configure(image=self.load_image(
+                "pinned.png" if self.always_on_top else "unpinned.png", (20, 20)))
+        except Exception as e:
+            # Missing assets or PIL - the window works without its images
+            print(f"AudioTally: could not load images: {e}", file=sys.stderr)
+        startup.mark("assets")
+        
+        if timings.enabled:
+            startup.record(timings)
+        if self.startup_report:
+            print(startup.format_report(), file=sys.stderr)
     
     def setup_pin_tooltip(self):
         """Setup inline tooltip text for the pin button"""
@@ -227,22 +441,7 @@ class NuendoDurationCalculator:
     
     def setup_always_on_top_button(self, parent_frame):
         """Setup the always-on-top toggle button in the top-right corner"""
-        assets_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
-        
-        # Load pin icons
-        unpinned_path = os.path.join(assets_path, "unpinned.png")
-        pinned_path = os.path.join(assets_path, "pinned.png")
-        
-        # Create icon images (small size for top-right corner)
-        self.unpinned_image = customtkinter.CTkImage(
-            Image.open(unpinned_path),
-            size=(20, 20)
-        )
-        self.pinned_image = customtkinter.CTkImage(
-            Image.open(pinned_path),
-            size=(20, 20)
-        )
-        
+        # The pin icons are loaded once the window is shown (unpinned) or first toggled (pinned)
         # Create inline tooltip label (positioned to the left of the button)
         self.pin_tooltip_label = customtkinter.CTkLabel(
             parent_frame,
@@ -261,7 +460,6 @@ class NuendoDurationCalculator:
         # Always-on-top toggle button
         self.always_on_top_btn = customtkinter.CTkButton(
             parent_frame,
-            image=self.unpinned_image,
             text="",  # No text, just icon
             width=28,  # Small square button
             height=28,
@@ -342,97 +540,51 @@ class NuendoDurationCalculator:
         )
         self.status_section3.grid(row=0, column=4, sticky=(tk.W, tk.E), padx=(2, 4), pady=4)  # Only horizontal expansion
         
+        # The sections start out in the ready state
+        for section, options in zip(self.status_sections, status_sections("ready")):
+            self.view.remember(section, **options)
+        self.view.remember(self.status_section1, text="▶︎  Ready")
+        
         # Current status state and flags
         self.current_status_state = "ready"
         self.has_calculated_before = False  # Track if we've calculated before
+        self.status_phase2_id = None  # Pending switch from calculated phase 1 to phase 2
+    
+    @property
+    def status_sections(self):
+        return (self.status_section1, self.status_section2, self.status_section3)
+    
+    def set_status(self, state, event_count=0):
+        """Show a status state, configuring only the sections whose colors or text change"""
+        self.current_status_state = state
+        with timings.stage("show.status"):
+            for section, options in zip(self.status_sections,
+                                        status_sections(state, event_count, self.has_calculated_before)):
+                if options:
+                    self.view.configure(section, **options)
     
     def set_status_ready(self):
         """Set status to ready state"""
-        self.current_status_state = "ready"
-        # Section 1: Active (green)
-        self.status_section1.configure(fg_color="#024A14", text_color="white")
-        
-        # Section 2: Grayed out - check if we should show "Events Detection" or reset
-        self.status_section2.configure(
-            fg_color="#444444", 
-            text_color="#AAAAAA",
-            text="Events Detection"
-        )
-        
-        # Section 3: Keep calculated state if we've calculated before, otherwise show "Status"
-        if self.has_calculated_before:
-            # Keep the calculated state visible but ensure correct colors
-            pass  # Don't change section 3 if we've calculated before
-        else:
-            self.status_section3.configure(
-                fg_color="#444444", 
-                text_color="#AAAAAA",
-                text="Status"
-            )
+        self.set_status("ready")
     
     def set_status_detecting(self, event_count):
         """Set status to detecting/calculating state"""
-        self.current_status_state = "detecting"
-        # Section 1: Grayed out
-        self.status_section1.configure(fg_color="#444444", text_color="#AAAAAA")
-        # Section 2: Active (purple)
-        self.status_section2.configure(
-            fg_color="#6A36E3", 
-            text_color="white",
-            text=f"🔎  Detected {event_count} events - Calculating"
-        )
-        # Section 3: Grayed out or keep previous state
-        if self.has_calculated_before:
-            # Keep previous calculated state but grayed out
-            self.status_section3.configure(fg_color="#444444", text_color="#AAAAAA")
-        else:
-            self.status_section3.configure(
-                fg_color="#444444", 
-                text_color="#AAAAAA",
-                text="Status"
-            )
+        self.set_status("detecting", event_count)
     
     def set_status_calculated_phase1(self, event_count):
         """Set status to calculated phase 1 (with checkmark for 1 second)"""
-        self.current_status_state = "calculated_phase1"
         self.has_calculated_before = True
+        self.set_status("calculated_phase1", event_count)
         
-        # Section 1: Grayed out
-        self.status_section1.configure(fg_color="#444444", text_color="#AAAAAA")
-        # Section 2: Grayed out
-        self.status_section2.configure(
-            fg_color="#444444", 
-            text_color="#AAAAAA",
-            text="Events Detection"
-        )
-        # Section 3: Active (light yellow) with checkmark
-        self.status_section3.configure(
-            fg_color="#FDF9DC",
-            text_color="black", 
-            text=f"✅ Calculated! ({event_count} events)"
-        )
-        
-        # Schedule phase 2 after 1 second
-        self.root.after(1000, lambda: self.set_status_calculated_phase2(event_count))
+        # Schedule phase 2 after 1 second, replacing the switch of an earlier calculation
+        if self.status_phase2_id is not None:
+            self.root.after_cancel(self.status_phase2_id)
+        self.status_phase2_id = self.root.after(1000, lambda: self.set_status_calculated_phase2(event_count))
     
     def set_status_calculated_phase2(self, event_count):
         """Set status to calculated phase 2 (without checkmark, both Ready and Calculated active)"""
-        self.current_status_state = "calculated_phase2"
-        
-        # Section 1: Back to active (green)
-        self.status_section1.configure(fg_color="#024A14", text_color="white")
-        # Section 2: Grayed out
-        self.status_section2.configure(
-            fg_color="#444444", 
-            text_color="#AAAAAA",
-            text="Events Detection"
-        )
-        # Section 3: Grayed background with white text, no checkmark
-        self.status_section3.configure(
-            fg_color="#444444",  # Use grayed background like Events Detection
-            text_color="white",  # White text for visibility
-            text=f"Calculated! ({event_count} events)"  # No checkmark
-        )
+        self.status_phase2_id = None
+        self.set_status("calculated_phase2", event_count)
     
     def set_status_calculated(self, event_count, total_duration):
         """Set status to calculated state (starts phase 1)"""
@@ -446,242 +598,529 @@ class NuendoDurationCalculator:
         self.root.attributes('-topmost', self.always_on_top)
         
         # Update button icon
-        if self.always_on_top:
-            self.always_on_top_btn.configure(image=self.pinned_image)
-        else:
-            self.always_on_top_btn.configure(image=self.unpinned_image)
-    
-    def get_clipboard_content(self):
-        """Get clipboard content using pbpaste command with robust encoding handling"""
         try:
-            # Try UTF-8 first (most common)
-            result = subprocess.run(['pbpaste'], capture_output=True, timeout=0.5)
-            
-            # Try multiple encodings to handle different clipboard formats
-            for encoding in ['utf-8', 'latin-1', 'iso-8859-1', 'cp1252']:
-                try:
-                    content = result.stdout.decode(encoding)
-                    # Verify it's valid XML by checking for XML declaration
-                    if '<?xml' in content:
-                        return content
-                except (UnicodeDecodeError, AttributeError):
-                    continue
-            
-            # If all encodings fail, try with error replacement
-            content = result.stdout.decode('utf-8', errors='replace')
-            return content
-            
-        except Exception as e:
-            return None
+            self.always_on_top_btn.configure(image=self.load_image(
+                "pinned.png" if self.always_on_top else "unpinned.png", (20, 20)))
+        except Exception:
+            pass  # No icon to show - the tooltip still tells the state
     
-    def has_clipboard_changed(self, clipboard_content):
-        """Robust check if clipboard content has changed - detects timing modifications"""
-        if not clipboard_content:
-            return False
-        
-        # Use hash of entire content to detect ANY change, including timing modifications
-        import hashlib
-        current_hash = hashlib.md5(clipboard_content.encode('utf-8')).hexdigest()
-        
-        # Compare with last known hash
-        if not hasattr(self, 'last_clipboard_hash'):
-            self.last_clipboard_hash = ""
-        
-        if current_hash != self.last_clipboard_hash:
-            self.last_clipboard_hash = current_hash
-            return True
-        
-        return False
+    def get_clipboard_content(self, known=()):
+        """Read the clipboard and return (fingerprint, cleaned Cubase/Nuendo XML text), or (None, None)
+
+        The text is None for a payload whose fingerprint is in known, which is not decoded.
+        """
+        raw = core.read_clipboard(self.clipboard)
+        if not raw:
+            return None, None
+        return core.scan_clipboard_bytes(raw, known=known)
     
-    def is_nuendo_xml_content(self, content):
-        """Quick validation if content might be Nuendo XML without full parsing"""
-        if not content:
-            return False
-        
-        # Fast preliminary checks - more lenient to handle partial clipboard reads
-        # Don't require 'filename' as it might not be in truncated/partial clipboard data
-        return ('<?xml' in content and 
-                ('region' in content or 'vst-xml' in content))
-    
-    def parse_nuendo_xml(self, xml_content):
-        """Parse Nuendo XML to extract clip information with caching"""
-        
-        # Use cached result if parsing the same content
-        if xml_content == self.cached_clipboard_content and self.cached_clips is not None:
-            return self.cached_clips
-        
-        clips = []
-        
-        try:
-            # Quick validation before expensive parsing
-            if not self.is_nuendo_xml_content(xml_content):
-                return None
-            
-            # CRITICAL FIX: Remove invalid XML control characters that Cubase/Nuendo sometimes includes
-            # Control characters (0x00-0x1F except tab/CR/LF) are not valid in XML
-            import re
-            # Remove control chars except tab (\x09), LF (\x0A), CR (\x0D)
-            xml_content = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]', '', xml_content)
-            
-            # Parse XML using ElementTree
-            root = ET.fromstring(xml_content)
-            regions = root.findall('.//region')
-            
-            for region in regions:
-                filename_elem = region.find('filename')
-                start_elem = region.find('start') 
-                end_elem = region.find('end')
-                
-                if filename_elem is not None and start_elem is not None and end_elem is not None:
-                    full_filepath = filename_elem.text
-                    filename = full_filepath.split('/')[-1] if full_filepath else "Unknown"
-                    start = int(start_elem.text)
-                    end = int(end_elem.text)
-                    
-                    if end > start:
-                        clips.append({
-                            'filename': filename,
-                            'start': start,
-                            'end': end,
-                            'duration_samples': end - start
-                        })
-            
-            # Cache the result
-            self.cached_clipboard_content = xml_content
-            self.cached_clips = clips
-                        
-        except Exception as e:
-            # Don't change status for parsing errors, just return None
-            return None
-            
-        return clips
+    def parse_nuendo_xml(self, xml_content, fingerprint=None):
+        """Parse Nuendo XML to extract clip information, reusing a cached tally of the same payload"""
+        # Every new payload goes through the worker, which fills the cache
+        cached = self.tally_cache.get(fingerprint) if fingerprint else None
+        if cached is not None:
+            return cached.clips
+        
+        # Don't change status for parsing errors, just return None
+        # Content always comes through scan_clipboard_bytes, which already stripped control characters
+        return core.parse_nuendo_xml(xml_content, sanitized=True, parallel=True)
     
     def samples_to_time(self, samples, sample_rate):
         """Convert samples to time format (mm:ss.mmm)"""
-        seconds = samples / sample_rate
-        minutes = int(seconds // 60)
-        remaining_seconds = int(seconds % 60)
-        milliseconds = int((seconds - int(seconds)) * 1000)
-        
-        return f"{minutes}:{remaining_seconds:02d}.{milliseconds:03d}"
+        return core.samples_to_time(samples, sample_rate)
     
     def toggle_details(self):
         """Show or hide the detailed results panel"""
         if self.details_visible.get():
             # Hide details
             self.results_frame.grid_remove()
-            self.toggle_details_btn.configure(text="📝 Show Details")  # Fixed: Use configure for CustomTkinter
+            self.view.configure(self.toggle_details_btn, text="📝 Show Details")
             self.details_visible.set(False)
             self.root.geometry("600x500")  # Smaller window when details hidden
         else:
             # Show details
+            if self.results_frame is None:
+                self.build_results_panel()
             self.results_frame.grid(row=9, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
-            self.toggle_details_btn.configure(text="📝 Hide Details")  # Fixed: Use configure for CustomTkinter
+            self.view.configure(self.toggle_details_btn, text="📝 Hide Details")
             self.details_visible.set(True)
             self.root.geometry("600x800")  # Larger window when details shown
+            
+            # Build the report only now that it is actually visible
+            if self.details_dirty:
+                self.render_details()
     
-    def calculate_duration(self, clips=None):
-        """Calculate total duration from clipboard content or provided clips"""
-        # Get sample rate
+    def render_details(self):
+        """Restart the details panel from the latest calculation, materializing only the first page"""
+        source = self.details_source
+        if source['clips'] is None:
+            # Basket totals defer building their clip store until the details are shown
+            source['clips'] = self.basket.clips()
+        with timings.stage("details.index"):
+            if source['files'] is None:
+                source['files'] = FileIndex(source['clips'])
+        report = core.iter_report_rows(source['clips'], source['sample_rate'], source['total_samples'],
+                                       source['coverage'], source['files'], self.file_sort_var.get())
+        formats = core.iter_format_rows(source['total_samples'], source['sample_rate'])
+        self.details_rows = itertools.chain(formats, report, [DETAILS_FOOTER])
+        self.details_dirty = False
+        
+        self.results_text.config(state=tk.NORMAL)  # Enable editing to insert text
+        self.results_text.delete(1.0, tk.END)
+        self.results_text.config(state=tk.DISABLED)  # Make read-only again
+        self.load_more_details()
+    
+    def on_file_sort_changed(self, event=None):
+        """Re-render the details with the per-file summary in the newly selected order"""
+        self.config['file_sort'] = self.file_sort_var.get()
+        self.save_config()
+        if self.details_source is not None:
+            self.refresh_details()
+    
+    def load_more_details(self):
+        """Append the next page of report rows to the details panel"""
+        self.details_load_pending = False
+        if self.details_rows is None:
+            return
+        
+        with timings.stage("details.format"):
+            page = "".join(itertools.islice(self.details_rows, DETAILS_PAGE_ROWS))
+        if not page:
+            self.details_rows = None  # Whole report is on screen
+            return
+        
+        with timings.stage("details.tk_insert"):
+            self.results_text.config(state=tk.NORMAL)
+            self.results_text.insert(tk.END, page)
+            self.results_text.config(state=tk.DISABLED)
+    
+    def on_details_scroll(self, first, last):
+        """Keep the scrollbar in sync and load the next page when the view nears the end"""
+        self.results_scrollbar.set(first, last)
+        if (self.details_rows is not None and not self.details_load_pending
+                and float(last) >= DETAILS_LOAD_THRESHOLD):
+            # Insert outside the scroll callback to avoid re-entering it
+            self.details_load_pending = True
+            self.root.after_idle(self.load_more_details)
+    
+    def get_selected_sample_rate(self):
+        """Sample rate chosen in the combo box, remembered in the config, or None if none is selected"""
         selected_text = self.sample_rate_combo.get()
         if not selected_text:
             messagebox.showerror("Error", "Please select a sample rate")
-            return
-        
-        sample_rate = int(self.rate_mapping[selected_text])
+            return None
         
-        # Save the selected sample rate
+        return int(self.rate_mapping[selected_text])
+    
+    def on_sample_rate_changed(self, event=None):
+        """Show the current total at the newly selected rate and remember the rate"""
+        sample_rate = self.get_selected_sample_rate()
+        if sample_rate is None:
+            return
         self.config['last_sample_rate'] = str(sample_rate)
         self.save_config()
         
+        # Totals are kept in samples, so this only formats them again
+        if self.details_source is not None:
+            self.details_source['sample_rate'] = sample_rate
+            self.show_duration()
+            self.refresh_details()
+    
+    def on_timecode_rate_changed(self, event=None):
+        """Show the current total as timecode at the newly selected frame rate and remember it"""
+        self.config['timecode_rate'] = self.timecode_rate_var.get()
+        self.save_config()
+        if self.details_source is not None:
+            self.show_duration()
+    
+    def calculate_duration(self, clips=None, total_samples=None, coverage=None, files=None):
+        """Calculate total duration from clipboard content or provided clips"""
+        sample_rate = self.get_selected_sample_rate()
+        if sample_rate is None:
+            return
+        
         # Use provided clips or parse from clipboard
         if clips is None:
-            # Get clipboard content
-            clipboard = self.get_clipboard_content()
-            if not clipboard:
+            # Get clipboard content; a payload tallied earlier is hashed but not decoded
+            with timings.stage("calculate.read"):
+                fingerprint, clipboard = self.get_clipboard_content(known=self.tally_cache)
+            cached = self.tally_cache.get(fingerprint) if fingerprint else None
+            if cached is not None:
+                clips, total_samples, coverage, files = (cached.clips, cached.total_samples,
+                                                         cached.coverage, cached.files)
+            elif not clipboard:
                 messagebox.showerror("Error", "Could not read clipboard content")
                 return
-            
-            # Parse XML
-            clips = self.parse_nuendo_xml(clipboard)
+            else:
+                # Parse XML
+                with timings.stage("calculate.parse"):
+                    clips = self.parse_nuendo_xml(clipboard, fingerprint)
             if not clips:
                 messagebox.showwarning("No Data", 
                                      "No valid Cubase/Nuendo clip data found in clipboard.\n" +
                                      "Please copy selected clips from Cubase/Nuendo and try again.")
                 return
         
-        # Calculate results
-        total_samples = sum(clip['duration_samples'] for clip in clips)
-        total_duration = self.samples_to_time(total_samples, sample_rate)
-        total_seconds = total_samples / sample_rate
-        
-        # Display BIG result prominently
-        big_result_text = f"{total_duration} sec"
-        self.big_result_label.config(text=big_result_text)
-        
-        # Format detailed results 
-        result_text = "CUBASE/NUENDO CLIPS ANALYSIS\n"
-        result_text += "=" * 60 + "\n\n"
-        result_text += f"Found {len(clips)} clips:\n\n"
-        
-        for i, clip in enumerate(clips, 1):
-            duration = self.samples_to_time(clip['duration_samples'], sample_rate)
-            duration_seconds = clip['duration_samples'] / sample_rate
-            result_text += f"{i}. {clip['filename']}\n"
-            result_text += f"   Duration: {duration} ({duration_seconds:.3f}s)\n"
-            result_text += f"   Samples: {clip['start']:,} to {clip['end']:,}\n\n"
-        
-        result_text += "=" * 60 + "\n"
-        result_text += f"⌛ TOTAL DURATION: {total_duration}\n"
-        result_text += f"📀 Total Samples: {total_samples:,}\n"
-        result_text += f"🔊 Sample Rate: {sample_rate:,} Hz\n"
-        result_text += "=" * 60 + "\n\n"
-        result_text += "✅ Original clipboard data preserved for pasting!\n"
-        result_text += f"📋 You can still paste normally in Cubase/Nuendo"
-        
-        # Update detailed results panel
-        self.results_text.config(state=tk.NORMAL)  # Enable editing to insert text
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(1.0, result_text)
-        self.results_text.config(state=tk.DISABLED)  # Make read-only again
+        # Calculate results (the background worker already summed them)
+        if total_samples is None:
+            total_samples = core.total_samples(clips)
+        
+        self.show_total(total_samples, len(clips), {'clips': clips, 'sample_rate': sample_rate,
+                                                    'total_samples': total_samples, 'coverage': coverage,
+                                                    'files': files})
+    
+    def show_basket(self):
+        """Show the running total of the basket"""
+        self.update_basket_label()
+        sample_rate = self.get_selected_sample_rate()
+        if sample_rate is None:
+            return
+        
+        # The basket's clip store is only built if the details are shown
+        self.show_total(self.basket.total, self.basket.events, {'clips': None, 'sample_rate': sample_rate,
+                                                                'total_samples': self.basket.total,
+                                                                'coverage': None, 'files': None})
+    
+    def show_duration(self):
+        """Format the total of the latest calculation at the selected sample and frame rates"""
+        with timings.stage("show.total"):
+            total_samples = self.details_source['total_samples']
+            sample_rate = self.details_source['sample_rate']
+            total_duration = self.samples_to_time(total_samples, sample_rate)
+            timecode_rate = self.timecode_rate_var.get()
+            
+            # Display BIG result prominently
+            big_result_text = f"{total_duration} sec"
+            self.view.configure(self.big_result_label, text=big_result_text)
+            self.view.configure(self.formats_label,
+                                text=f"{core.samples_to_seconds(total_samples, sample_rate)} s  ·  "
+                                     f"{core.samples_to_timecode(total_samples, sample_rate, timecode_rate)} "
+                                     f"@ {timecode_rate} fps")
         
         # Store result for copying
         self.last_result = f"{total_duration}"
+        return total_duration
+    
+    def refresh_details(self):
+        """Re-render the details now if they are shown, otherwise the next time they are"""
+        if self.details_visible.get():
+            self.render_details()
+        else:
+            self.details_dirty = True
+    
+    def show_total(self, total_samples, event_count, details_source):
+        """Display a calculated total, its details and the calculated status"""
+        self.details_source = details_source
+        total_duration = self.show_duration()
         
-        # Show the previously hidden button - Centered
-        self.toggle_details_btn.grid(row=8, column=0, columnspan=3, pady=(0, 15))  # Centered across all 3 columns
+        # Detailed results are only rendered while the panel is visible
+        self.refresh_details()
+        
+        # Show the previously hidden button once - Centered
+        if self.toggle_details_btn is None:
+            self.build_details_button()
+        if not self.toggle_details_btn.winfo_manager():
+            self.toggle_details_btn.grid(row=8, column=0, columnspan=3, pady=(0, 15))  # Centered across all 3 columns
         
         # Update status to calculated
-        self.set_status_calculated(len(clips), total_duration)
+        self.set_status_calculated(event_count, total_duration)
+        
+        # Preserve Cubase/Nuendo paste functionality: the original XML goes back to the clipboard
+        # off the Tk thread, and only if the clipboard lost it
+        if self.original_clipboard_bytes:
+            self.clipboard_guard.restore(self.original_clipboard_bytes, self.original_clipboard_count)
+    
+    def toggle_basket(self):
+        """Switch basket mode, starting it from the selection currently shown"""
+        if self.basket_var.get():
+            if self.last_tally is not None:
+                self.basket.add(self.last_tally.fingerprint, self.last_tally.clips)
+            self.show_basket()
+        else:
+            self.update_basket_label()
+            if self.last_tally is not None:
+                result = self.last_tally
+                self.calculate_duration(result.clips, result.total_samples, result.coverage, result.files)
+    
+    def undo_basket_copy(self):
+        """Take the most recent copy out of the basket"""
+        if self.basket.remove_last() is not None and self.basket_var.get():
+            self.show_basket()
+    
+    def clear_basket(self):
+        """Empty the basket"""
+        self.basket.clear()
+        if self.basket_var.get():
+            self.show_basket()
+    
+    def update_basket_label(self):
+        """Show how many copies and distinct events the basket holds while basket mode is on"""
+        if self.basket_var.get():
+            self.view.configure(self.basket_label, text=f"{len(self.basket)} copies · {self.basket.events} events")
+        else:
+            self.view.configure(self.basket_label, text="")
+    
+    def show_export_menu(self):
+        """Offer the export formats for the selection currently shown"""
+        if self.details_source is None:
+            messagebox.showinfo("Export", "Copy some events in Cubase/Nuendo first")
+            return
+        menu = tk.Menu(self.root, tearoff=0)
+        for label, what, fmt in EXPORT_CHOICES:
+            menu.add_command(label=label, command=lambda what=what, fmt=fmt: self.export_results(what, fmt))
+        menu.tk_popup(self.export_btn.winfo_rootx(),
+                      self.export_btn.winfo_rooty() + self.export_btn.winfo_height())
+    
+    def export_results(self, what, fmt):
+        """Write the clips or per-file totals shown to a file, streaming them from a background thread"""
+        source = self.details_source
+        if source['clips'] is None:
+            source['clips'] = self.basket.clips()
+        if what == 'files' and source['files'] is None:
+            source['files'] = FileIndex(source['clips'])
+        
+        extension = "." + fmt
+        path = filedialog.asksaveasfilename(defaultextension=extension,
+                                            initialfile=f"audiotally-{what}{extension}",
+                                            filetypes=[(fmt.upper(), "*" + extension), ("All files", "*.*")])
+        if not path:
+            return
+        
+        # Stores and file indexes are never modified once built, so the thread can read them as they are
+        clips, files, sample_rate = source['clips'], source['files'], source['sample_rate']
+        timecode_rate, file_sort = self.timecode_rate_var.get(), self.file_sort_var.get()
+        outcome = []
+        
+        def run():
+            try:
+                with export.open_export(path) as out:
+                    if what == 'clips':
+                        count = export.export_clips(export.store_records(clips), sample_rate, out, fmt,
+                                                    timecode_rate)
+                    else:
+                        count = export.export_files(files.rows(file_sort), sample_rate, out, fmt)
+                outcome.append((count, None))
+            except Exception as e:
+                outcome.append((0, e))
+        
+        thread = threading.Thread(target=run, name="AudioTallyExport", daemon=True)
+        thread.start()
+        self.root.after(EXPORT_CHECK_INTERVAL, lambda: self.check_export(thread, outcome, what, path))
+    
+    def check_export(self, thread, outcome, what, path):
+        """Report a background export once it finished"""
+        if thread.is_alive():
+            self.root.after(EXPORT_CHECK_INTERVAL, lambda: self.check_export(thread, outcome, what, path))
+            return
+        count, error = outcome[0] if outcome else (0, None)
+        if error is not None:
+            messagebox.showerror("Export", f"Could not write {path}: {error}")
+        else:
+            messagebox.showinfo("Export", f"Exported {count} {'clips' if what == 'clips' else 'source files'} "
+                                          f"to {os.path.basename(path)}")
+    
+    def record_history(self, result):
+        """Queue a finished tally for the history database"""
+        if self.history is None or not self.details_source:
+            return
+        self.history.record(make_entry(self.details_source['sample_rate'], result.total_samples,
+                                       len(result.clips), result.files, result.fingerprint))
+    
+    def open_history(self):
+        """Show the history window, or bring it to the front"""
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.lift()
+            return
+        try:
+            self.history_reader = TallyHistory(HISTORY_FILE)
+        except Exception:
+            messagebox.showerror("Error", "Could not open the calculation history")
+            return
+        
+        window = customtkinter.CTkToplevel(self.root)
+        window.title("AudioTally - History")
+        window.geometry("680x460")
+        window.protocol("WM_DELETE_WINDOW", self.close_history)
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(1, weight=1)
+        
+        # Filter by source file path (uses the path index)
+        filter_frame = ttk.Frame(window, padding=(10, 10, 10, 0))
+        filter_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        filter_frame.columnconfigure(1, weight=1)
+        ttk.Label(filter_frame, text="Source file:").grid(row=0, column=0, sticky=tk.W)
+        self.history_path_var = tk.StringVar()
+        path_entry = ttk.Entry(filter_frame, textvariable=self.history_path_var)
+        path_entry.grid(row=0, column=1, sticky=(tk.W, tk.E), padx=(10, 10))
+        path_entry.bind('<Return>', lambda event: self.load_history_page(None))
+        ttk.Button(filter_frame, text="Filter", command=lambda: self.load_history_page(None)).grid(row=0, column=2)
+        
+        columns = (("time", "Date", 150), ("rate", "Rate", 70), ("events", "Events", 70),
+                   ("duration", "Duration", 100), ("files", "Files", 60))
+        tree = ttk.Treeview(window, columns=[name for name, _, _ in columns], show="headings")
+        for name, heading, width in columns:
+            tree.heading(name, text=heading)
+            tree.column(name, width=width, anchor=tk.W if name == "time" else tk.E)
+        tree_scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=tree_scrollbar.set)
+        tree.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(10, 0), pady=10)
+        tree_scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S), padx=(0, 10), pady=10)
+        tree.bind('<Double-1>', self.show_history_files)
+        
+        # Keyset paging: only one page of rows is ever loaded
+        nav_frame = ttk.Frame(window, padding=(10, 0, 10, 10))
+        nav_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        nav_frame.columnconfigure(1, weight=1)
+        self.history_newer_btn = ttk.Button(nav_frame, text="◀ Newer", command=self.history_newer)
+        self.history_newer_btn.grid(row=0, column=0)
+        self.history_page_label = ttk.Label(nav_frame, text="")
+        self.history_page_label.grid(row=0, column=1)
+        self.history_older_btn = ttk.Button(nav_frame, text="Older ▶", command=self.history_older)
+        self.history_older_btn.grid(row=0, column=2)
+        
+        self.history_window = window
+        self.history_tree = tree
+        self.load_history_page(None)
+    
+    def load_history_page(self, cursor, previous=None):
+        """Show the page of tallies older than cursor ((created, id) of the row above it, None for the newest)"""
+        if previous is None:
+            previous = []  # Cursors of the newer pages, to step back through
+        path = self.history_path_var.get().strip() or None
+        rows = self.history_reader.page(before=cursor, limit=HISTORY_PAGE_ROWS + 1, path=path)
+        has_older = len(rows) > HISTORY_PAGE_ROWS
+        rows = rows[:HISTORY_PAGE_ROWS]
+        
+        tree = self.history_tree
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert("", tk.END, iid=str(row.id), values=(
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row.created)),
+                f"{row.sample_rate / 1000:g} kHz", row.events,
+                core.samples_to_time(row.total_samples, row.sample_rate), row.file_count))
+        
+        self.history_cursor = cursor
+        self.history_previous = previous
+        self.history_next = (rows[-1].created, rows[-1].id) if has_older else None
+        self.history_newer_btn.state(['!disabled'] if previous else ['disabled'])
+        self.history_older_btn.state(['!disabled'] if has_older else ['disabled'])
+        self.history_page_label.config(text=f"Page {len(previous) + 1}")
+    
+    def history_older(self):
+        """Step to the next page of older tallies"""
+        if self.history_next is not None:
+            self.load_history_page(self.history_next, self.history_previous + [self.history_cursor])
+    
+    def history_newer(self):
+        """Step back to the previous page of newer tallies"""
+        if self.history_previous:
+            self.load_history_page(self.history_previous[-1], self.history_previous[:-1])
+    
+    def show_history_files(self, event=None):
+        """Show the per-file breakdown of the selected tally"""
+        selection = self.history_tree.selection()
+        if not selection:
+            return
+        tally = self.history_reader.get(int(selection[0]))
+        if tally is None:
+            return
+        lines = [f"{core.samples_to_time(samples, tally.sample_rate)}  {events} events  {path or 'Unknown'}"
+                 for path, events, samples in self.history_reader.files(tally.id)[:30]]
+        messagebox.showinfo("Source files", "\n".join(lines) or "No per-file breakdown recorded",
+                            parent=self.history_window)
+    
+    def close_history(self):
+        """Close the history window and its database connection"""
+        self.history_reader.close()
+        self.history_window.destroy()
+        self.history_window = None
+    
+    def toggle_timing_overlay(self, event=None):
+        """Show or hide the stage timing overlay, switching the instrumentation on with it"""
+        if self.timing_window is not None and self.timing_window.winfo_exists():
+            self.timing_window.destroy()
+            self.timing_window = None
+            return
+        timings.enabled = True
+        
+        window = customtkinter.CTkToplevel(self.root)
+        window.title("AudioTally - Stage Timings")
+        window.geometry("620x360")
+        window.attributes('-topmost', True)
+        self.timing_text = tk.Text(window, height=16, wrap=tk.NONE, font=("Monaco", 11),
+                                   bg="black", fg="#CDEFF7", relief=tk.FLAT, padx=10, pady=10)
+        self.timing_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+        buttons = ttk.Frame(window, padding=(10, 0, 10, 10))
+        buttons.pack(fill=tk.X)
+        ttk.Button(buttons, text="Export JSON…", command=self.export_timings).pack(side=tk.LEFT)
+        ttk.Button(buttons, text="Reset", command=timings.reset).pack(side=tk.LEFT, padx=(5, 0))
+        
+        self.timing_window = window
+        self.refresh_timing_overlay()
+    
+    def refresh_timing_overlay(self):
+        """Redraw the overlay with the latest stage, poll and cache statistics while it is open"""
+        if self.timing_window is None or not self.timing_window.winfo_exists():
+            self.timing_window = None
+            return
         
-        # Restore original XML data to clipboard to preserve Cubase/Nuendo paste functionality
-        if hasattr(self, 'original_clipboard_content') and self.original_clipboard_content:
+        poll = self.poller.stats()
+        cache = self.tally_cache.stats()
+        widgets = self.view.stats()
+        text = (timings.format_table() +
+                f"\n\npoll interval {poll['interval_ms']} ms, {poll['idle_polls']}/{poll['polls']} idle"
+                f"\ncache {cache['entries']} entries, {cache['bytes'] / 1048576:.1f} MB, "
+                f"{cache['hits']} hits / {cache['misses']} misses"
+                f"\nwidget updates {widgets['configured']} applied, {widgets['skipped']} unchanged")
+        self.timing_text.config(state=tk.NORMAL)
+        self.timing_text.delete(1.0, tk.END)
+        self.timing_text.insert(1.0, text)
+        self.timing_text.config(state=tk.DISABLED)
+        self.root.after(TIMING_OVERLAY_REFRESH, self.refresh_timing_overlay)
+    
+    def export_timings(self):
+        """Save the stage statistics as JSON"""
+        path = filedialog.asksaveasfilename(parent=self.timing_window, defaultextension=".json",
+                                            initialfile="audiotally-timings.json",
+                                            filetypes=[("JSON", "*.json")])
+        if path:
             try:
-                subprocess.run(['pbcopy'], input=self.original_clipboard_content, text=True)
-            except:
-                pass
+                timings.export_json(path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not write {path}: {e}", parent=self.timing_window)
+    
+    def on_close(self):
+        """Stop the background threads, writing out queued history, and quit"""
+        self.worker.stop()
+        self.clipboard_guard.close()
+        self.write_config()
+        if self.history is not None:
+            self.history.close()
+        self.root.destroy()
     
     def auto_check_clipboard(self):
         """Optimized clipboard monitoring - only responds to Cubase/Nuendo content"""
-        clipboard = self.get_clipboard_content()
+        # The payload is fetched only after a copy and checked and fingerprinted in one pass; it is
+        # cleaned and decoded only when it is neither the last payload nor one in the cache
+        poll = core.poll_clipboard(self.clipboard, self.last_clipboard_hash, self.tally_cache)
+        fingerprint, clipboard, raw, changed = poll.fingerprint, poll.text, poll.raw, poll.changed
         
         # Only process if content is potentially from Cubase/Nuendo
-        if clipboard and self.is_nuendo_xml_content(clipboard):
-            if self.has_clipboard_changed(clipboard):
-                # Store original clipboard content for later restoration
-                self.original_clipboard_content = clipboard
+        if fingerprint:
+            if changed:
+                self.last_clipboard_hash = fingerprint
+                # Results shown from here on are for this read of the clipboard
+                self.original_clipboard_count = self.clipboard.last_change_count
                 
-                # Parse once and cache the result
-                clips = self.parse_nuendo_xml(clipboard)
-                if clips:
-                    # Show detecting status
-                    self.set_status_detecting(len(clips))
-                    
-                    # Calculate after a brief moment to show detecting status
-                    self.root.after(150, lambda: self.calculate_duration(clips))
+                cached = self.tally_cache.get(fingerprint)
+                if cached is not None:
+                    # Selection seen earlier this session - show it again without parsing
+                    self.apply_tally_result(cached._replace(generation=self.worker.supersede(), raw=raw),
+                                            cached=True)
                 else:
-                    # Invalid XML, back to ready
-                    self.set_status_ready()
+                    # Parse and aggregate off the Tk thread - a newer copy supersedes this job
+                    self.worker.submit(fingerprint, clipboard, raw)
+                    self.schedule_worker_check()
             else:
                 # Same valid content - don't interfere with calculated states
                 if self.cached_clips:
@@ -695,15 +1134,120 @@ class NuendoDurationCalculator:
         # If clipboard doesn't contain Cubase/Nuendo content, don't change status
         # This prevents status changes when copying other things
         
-        # Schedule next check with faster polling for better responsiveness
-        self.root.after(300, self.auto_check_clipboard)  # Check every 300ms
+        # A new Cubase/Nuendo copy counts as activity and speeds polling back up
+        self.schedule_poll(changed=changed)
+    
+    def schedule_poll(self, changed):
+        """Schedule the next clipboard check using the adaptive interval"""
+        self.poll_id = self.root.after(self.poller.next_interval(changed), self.auto_check_clipboard)
+    
+    def on_window_focus(self, event):
+        """The user is back in the app - poll right away instead of waiting out an idle back-off"""
+        # <FocusIn> bound on the root also fires for every child widget that takes focus
+        if event.widget is not self.root:
+            return
+        self.poller.note_activity()
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = self.root.after(self.poller.interval, self.auto_check_clipboard)
 
-def main():
-    # Create and run the modern GUI with CustomTkinter
-    root = customtkinter.CTk()  # Use CustomTkinter window instead of tk.Tk()
+    def schedule_worker_check(self):
+        """Look for a finished background tally soon, unless a check is already scheduled"""
+        if self.worker_check_id is None:
+            self.worker_check_id = self.root.after(WORKER_CHECK_INTERVAL, self.check_worker_results)
+    
+    def check_worker_results(self):
+        """Apply the newest finished tally; keeps checking only while a job is in flight"""
+        self.worker_check_id = None
+        result = self.worker.poll_result()
+        if result is not None:
+            self.apply_tally_result(result)
+        if self.worker.busy or not self.worker.results.empty():
+            self.schedule_worker_check()
+    
+    def apply_tally_result(self, result, cached=False):
+        """Show a tally produced by the background worker or taken from the cache"""
+        # Store original clipboard bytes for later restoration
+        self.original_clipboard_bytes = result.raw
+        
+        if result.clips:
+            self.cached_clips = result.clips
+            if not cached:
+                # The raw payload is on the clipboard whenever this entry is used again
+                self.tally_cache.put(result.fingerprint, result._replace(raw=None),
+                                     result.clips.nbytes() + len(result.files) * 16)
+            
+            self.last_tally = result
+            
+            def finish():
+                if self.worker.is_stale(result.generation):
+                    return
+                if self.basket_var.get():
+                    # Basket mode: only regions not already in the basket add to the running total
+                    self.basket.add(result.fingerprint, result.clips)
+                    self.show_basket()
+                else:
+                    self.calculate_duration(result.clips, result.total_samples, result.coverage, result.files)
+                    self.record_history(result)
+            
+            if cached or result.delta is not None:
+                # Known selection, or a re-copy of the previous one with a few edits - update straight away
+                finish()
+            else:
+                # Show detecting status, then calculate after a brief moment unless a newer copy arrived meanwhile
+                self.set_status_detecting(len(result.clips))
+                self.root.after(150, finish)
+        else:
+            # Invalid XML, back to ready
+            self.set_status_ready()
+
+def main(argv=None):
+    # Parser processes of frozen builds start from this executable and must stop here
+    multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(prog="AudioTally", description="Cubase/Nuendo events duration calculator")
+    parser.add_argument("--timing", action="store_true",
+                        help="record per-stage timings and open the timing overlay (also AUDIOTALLY_TIMING=1)")
+    parser.add_argument("--timing-json", metavar="FILE", help="write the stage timings to FILE on exit")
+    parser.add_argument("--profile", metavar="FILE", default=os.environ.get("AUDIOTALLY_PROFILE"),
+                        help="run the session under cProfile and dump the stats to FILE on exit "
+                             "(also AUDIOTALLY_PROFILE=FILE)")
+    parser.add_argument("--startup-report", action="store_true",
+                        default=bool(os.environ.get("AUDIOTALLY_STARTUP_REPORT")),
+                        help="print how long imports, UI build, first poll and first window took "
+                             "(also AUDIOTALLY_STARTUP_REPORT=1)")
+    # App bundles may pass extra arguments of their own (e.g. -psn_ on macOS)
+    args, _ = parser.parse_known_args(argv)
+    if args.timing or args.timing_json:
+        timings.enabled = True
     
-    app = NuendoDurationCalculator(root)
-    root.mainloop()
+    # cProfile only sees the Tk thread; worker stages show up in the timing histograms instead
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        # Set CustomTkinter appearance and theme - here rather than at import, which parser
+        # processes started with spawn repeat
+        customtkinter.set_appearance_mode("System")  # Modes: "System" (default), "Dark", "Light"  
+        customtkinter.set_default_color_theme("dark-blue")  # Themes: "blue" (default), "green", "dark-blue"
+        
+        # Create and run the modern GUI with CustomTkinter
+        root = customtkinter.CTk()  # Use CustomTkinter window instead of tk.Tk()
+        startup.mark("window")
+        
+        app = NuendoDurationCalculator(root)
+        app.startup_report = args.startup_report
+        if args.timing:
+            app.toggle_timing_overlay()
+        root.mainloop()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.timing_json:
+            timings.export_json(args.timing_json)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
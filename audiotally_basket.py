@@ -0,0 +1,97 @@
+"""
+AudioTally tally basket
+
+Accumulates regions across many copies when the events to total cannot all be selected
+in one go. Each region is identified by (path, start, end) and counted once no matter how
+many copies contain it. The basket keeps a reference count per identity, so a copy can be
+taken out again by walking only its own regions, and the running total is adjusted by
+the regions that enter or leave instead of being summed again.
+"""
+
+import collections
+
+from audiotally_store import ClipStore
+
+
+class TallyBasket:
+    """Running total over the distinct regions of every copy added to it"""
+
+    def __init__(self):
+        self.refcounts = {}  # (path, start, end) -> number of copies holding that region
+        self.snapshots = collections.OrderedDict()  # Copy key -> its distinct region identities, oldest first
+        self.total = 0  # Summed duration of the distinct regions, in samples
+        self._clips = None  # ClipStore of the basket, built on demand
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def __contains__(self, key):
+        return key in self.snapshots
+
+    @property
+    def events(self):
+        """Number of distinct regions in the basket"""
+        return len(self.refcounts)
+
+    def add(self, key, clips):
+        """Add the regions of one copy, keyed e.g. by payload fingerprint, in O(k)
+
+        Returns how many of its regions were not in the basket yet. A key that is
+        already in the basket is ignored.
+        """
+        if key in self.snapshots or not clips:
+            return 0
+        paths = clips.paths
+        regions = tuple(set(zip([paths[file_id] for file_id in clips.file_ids], clips.starts, clips.ends)))
+
+        refcounts = self.refcounts
+        added = 0
+        for identity in regions:
+            count = refcounts.get(identity, 0)
+            refcounts[identity] = count + 1
+            if not count:
+                self.total += identity[2] - identity[1]
+                added += 1
+        self.snapshots[key] = regions
+        self._clips = None
+        return added
+
+    def remove(self, key):
+        """Take one copy out again in O(k); returns how many regions left the basket"""
+        regions = self.snapshots.pop(key, None)
+        if regions is None:
+            return 0
+
+        refcounts = self.refcounts
+        removed = 0
+        for identity in regions:
+            count = refcounts[identity] - 1
+            if count:
+                refcounts[identity] = count
+            else:
+                del refcounts[identity]
+                self.total -= identity[2] - identity[1]
+                removed += 1
+        self._clips = None
+        return removed
+
+    def remove_last(self):
+        """Take out the most recently added copy; returns its key, or None for an empty basket"""
+        if not self.snapshots:
+            return None
+        key = next(reversed(self.snapshots))
+        self.remove(key)
+        return key
+
+    def clear(self):
+        """Empty the basket"""
+        self.refcounts.clear()
+        self.snapshots.clear()
+        self.total = 0
+        self._clips = None
+
+    def clips(self):
+        """ClipStore of the distinct regions in the order they entered the basket"""
+        if self._clips is None:
+            self._clips = ClipStore.from_records(self.refcounts)
+        return self._clips
@@ -0,0 +1,105 @@
+"""
+AudioTally batch mode - tally directories of saved Cubase/Nuendo XML selections
+
+Files are parsed in a process pool with the same region rules as the clipboard path,
+and per-file results are streamed out in input order as they complete.
+"""
+
+import concurrent.futures
+import csv
+import glob
+import json
+import os
+
+import audiotally_core as core
+
+# Extension of exported clip/track-archive selections when a directory is given
+XML_EXTENSION = ".xml"
+
+CSV_FIELDS = ['file', 'events', 'total_samples', 'duration', 'seconds', 'error']
+
+
+def expand_inputs(inputs):
+    """Expand directories and glob patterns into a sorted list of XML file paths"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for dirpath, _, filenames in os.walk(item):
+                paths.extend(os.path.join(dirpath, name) for name in filenames
+                             if name.lower().endswith(XML_EXTENSION))
+        elif glob.has_magic(item):
+            paths.extend(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+def tally_file(path):
+    """Parse one saved selection and return its event count and total samples"""
+    result = {'file': path, 'events': 0, 'total_samples': 0, 'error': None}
+    try:
+        with open(path, 'rb') as f:
+            clips = core.parse_nuendo_bytes(f.read(), parallel=False)  # Already one process per file
+    except OSError as e:
+        result['error'] = str(e)
+        return result
+
+    if clips is None:
+        result['error'] = "no valid Cubase/Nuendo clip data"
+    else:
+        result['events'] = len(clips)
+        result['total_samples'] = core.total_samples(clips)
+    return result
+
+
+def default_chunksize(file_count, workers):
+    """Hand each worker a few chunks so the pool stays balanced without per-file IPC"""
+    return max(1, file_count // (workers * 4))
+
+
+def iter_batch(paths, workers=None, chunksize=None):
+    """Yield tally_file results for paths, in order, parsing them in a process pool"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 2:
+        yield from map(tally_file, paths)
+        return
+
+    chunksize = chunksize or default_chunksize(len(paths), workers)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(tally_file, paths, chunksize=chunksize)
+
+
+def _with_duration(result, sample_rate):
+    """Add formatted duration fields to a result for the given sample rate"""
+    return dict(result,
+                duration=core.samples_to_time(result['total_samples'], sample_rate),
+                seconds=round(result['total_samples'] / sample_rate, 6))
+
+
+def write_results(results, sample_rate, out, fmt="csv"):
+    """Stream per-file rows then a grand total to out as CSV or JSON Lines, returning the total row"""
+    grand_total = {'file': "TOTAL", 'events': 0, 'total_samples': 0, 'error': None}
+    files = failed = 0
+
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        write_row = writer.writerow
+    else:
+        def write_row(row):
+            out.write(json.dumps(row) + "\n")
+
+    for result in results:
+        files += 1
+        if result['error']:
+            failed += 1
+        grand_total['events'] += result['events']
+        grand_total['total_samples'] += result['total_samples']
+        write_row(_with_duration(result, sample_rate))
+        out.flush()
+
+    grand_total = _with_duration(grand_total, sample_rate)
+    if failed:
+        grand_total['error'] = f"{failed} of {files} files had no valid clip data"
+    write_row(grand_total)
+    return grand_total
@@ -0,0 +1,86 @@
+"""
+AudioTally tally cache
+
+Keeps the parsed results of recently seen clipboard payloads, keyed by their fingerprint,
+so flipping back and forth between a few selections never parses the same payload twice.
+The cache is bounded both by entry count and by approximate memory, evicting the least
+recently used entries first.
+"""
+
+import collections
+
+# Default bounds
+DEFAULT_MAX_ENTRIES = 8
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class TallyCache:
+    """Least-recently-used map from payload fingerprint to a parsed result"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError("cache bounds must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()  # Fingerprint -> (value, nbytes), oldest first
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, fingerprint):
+        # Membership test only - does not count as a use or touch the counters
+        return fingerprint in self.entries
+
+    def get(self, fingerprint):
+        """Return the cached value and mark it most recently used, or None"""
+        entry = self.entries.get(fingerprint)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(fingerprint)
+        return entry[0]
+
+    def put(self, fingerprint, value, nbytes):
+        """Cache a value of roughly nbytes, evicting old entries to stay within both bounds
+
+        Values larger than the whole byte budget are not cached at all.
+        """
+        self.discard(fingerprint)
+        if nbytes > self.max_bytes:
+            return
+        self.entries[fingerprint] = (value, nbytes)
+        self.nbytes += nbytes
+        while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, (_, evicted_bytes) = self.entries.popitem(last=False)
+            self.nbytes -= evicted_bytes
+            self.evictions += 1
+
+    def discard(self, fingerprint):
+        """Drop one entry if present"""
+        entry = self.entries.pop(fingerprint, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def clear(self):
+        """Drop every entry, keeping the counters"""
+        self.entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        """Size, bounds and hit/miss counters, for diagnostics"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
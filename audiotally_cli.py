@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+audiotally - command-line tally of Cubase/Nuendo clipboard XML
+
+Reads XML from a file, stdin or the clipboard and prints the total duration.
+Only imports the GUI-free core, so it runs on machines without a display.
+
+    pbpaste | audiotally --rate 48000
+    audiotally selection.xml --details
+    audiotally archive/ --workers 8 > totals.csv
+    audiotally selection.xml --export-clips clips.csv --export-files files.jsonl
+"""
+
+import argparse
+import collections
+import contextlib
+import glob
+import json
+import os
+import sys
+
+import audiotally_core as core
+import audiotally_coverage
+from audiotally_store import FileIndex, FILE_SORTS
+
+
+def build_parser():
+    """Build the command-line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="audiotally",
+        description="Calculate the total duration of Cubase/Nuendo events from copied XML.")
+    parser.add_argument("inputs", nargs="*", default=["-"], metavar="input",
+                        help="XML file to read, '-' for stdin (default); several files, "
+                             "directories or glob patterns run in batch mode")
+    parser.add_argument("--clipboard", action="store_true",
+                        help="read the XML from the system clipboard instead of a file")
+    parser.add_argument("-r", "--rate", type=int, default=core.DEFAULT_SAMPLE_RATE,
+                        help=f"project sample rate in Hz (default {core.DEFAULT_SAMPLE_RATE})")
+    parser.add_argument("-d", "--details", action="store_true",
+                        help="print the per-clip analysis as well as the total")
+    parser.add_argument("--timecode", choices=list(core.TIMECODE_RATES), metavar="FPS", default=None,
+                        help="also print the total as SMPTE timecode at this frame rate "
+                             f"({', '.join(core.TIMECODE_RATES)})")
+    parser.add_argument("--json", action="store_true",
+                        help="print the totals as JSON (JSON Lines in batch mode)")
+    parser.add_argument("--coverage", choices=audiotally_coverage.MODES, default=None,
+                        help="also report overlap-aware coverage across the whole selection or per source file")
+    parser.add_argument("--by-file", action="store_true",
+                        help="also report event count, duration and share per source file")
+    parser.add_argument("--sort", choices=list(FILE_SORTS), default="duration",
+                        help="order of the per-file summary (default duration)")
+    parser.add_argument("--export-clips", metavar="FILE",
+                        help="stream one row per clip to FILE ('-' for stdout) instead of printing totals")
+    parser.add_argument("--export-files", metavar="FILE",
+                        help="write the per-source-file totals to FILE ('-' for stdout)")
+    parser.add_argument("--export-format", choices=["csv", "jsonl", "edl"], default=None,
+                        help="export format (default: from the file extension, else csv; edl is clips only)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="batch mode: number of worker processes (default: CPU count)")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="batch mode: files handed to a worker at a time")
+    return parser
+
+
+# Options that only make sense for one selection; batch mode prints per-file totals only
+SINGLE_SELECTION_OPTIONS = {
+    'details': "--details", 'timecode': "--timecode", 'coverage': "--coverage", 'by_file': "--by-file",
+    'export_clips': "--export-clips", 'export_files': "--export-files", 'export_format': "--export-format",
+}
+
+
+def is_batch(inputs):
+    """Whether the inputs name more than a single file or stdin"""
+    return len(inputs) > 1 or any(os.path.isdir(item) or glob.has_magic(item) for item in inputs)
+
+
+def run_batch(args):
+    """Tally every file named by the inputs and stream per-file and grand totals"""
+    import audiotally_batch as batch
+
+    paths = batch.expand_inputs(args.inputs)
+    if not paths:
+        print("audiotally: no XML files found", file=sys.stderr)
+        return 1
+
+    results = batch.iter_batch(paths, workers=args.workers, chunksize=args.chunksize)
+    grand_total = batch.write_results(results, args.rate, sys.stdout, "json" if args.json else "csv")
+    return 1 if grand_total['events'] == 0 else 0
+
+
+def _output(path):
+    """Open an export target; '-' is stdout, which is left open"""
+    import audiotally_export as export
+    return contextlib.nullcontext(sys.stdout) if path == "-" else export.open_export(path)
+
+
+def run_export(args, raw):
+    """Stream the clips and per-file totals of one payload to the export targets"""
+    import audiotally_export as export
+
+    _, xml_content = core.scan_clipboard_bytes(raw) if raw else (None, None)
+    if xml_content is None:
+        print("audiotally: no valid Cubase/Nuendo clip data found", file=sys.stderr)
+        return 1
+    clip_format = args.export_format or export.format_for_path(args.export_clips or "")
+    file_format = args.export_format or export.format_for_path(args.export_files or "")
+    if args.export_files and file_format == "edl":
+        print("audiotally: per-file totals cannot be exported as an EDL", file=sys.stderr)
+        return 2
+
+    # One pass over the regions: clips are written as they are read while per-file sums accumulate
+    totals = export.FileTotals()
+    records = totals.track(core.iter_region_records(xml_content, sanitized=True))
+    try:
+        if args.export_clips:
+            with _output(args.export_clips) as out:
+                export.export_clips(records, args.rate, out, clip_format,
+                                    args.timecode or core.DEFAULT_TIMECODE_RATE)
+        else:
+            collections.deque(records, maxlen=0)
+        if args.export_files:
+            with _output(args.export_files) as out:
+                export.export_files(totals.rows(args.sort), args.rate, out, file_format)
+    except OSError as e:
+        print(f"audiotally: {e}", file=sys.stderr)
+        return 2
+    except Exception:
+        # Malformed or truncated XML part way through
+        print("audiotally: no valid Cubase/Nuendo clip data found", file=sys.stderr)
+        return 1
+
+    events = sum(totals.events.values())
+    if not events:
+        print("audiotally: no valid Cubase/Nuendo clip data found", file=sys.stderr)
+        return 1
+    print(f"{core.samples_to_time(sum(totals.samples.values()), args.rate)}\t{events} events", file=sys.stderr)
+    return 0
+
+
+def read_input(args):
+    """Read the raw XML payload selected on the command line"""
+    if args.clipboard:
+        return core.read_clipboard()
+    if args.inputs[0] == "-":
+        return sys.stdin.buffer.read()
+    with open(args.inputs[0], 'rb') as f:
+        return f.read()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.rate <= 0:
+        print("audiotally: sample rate must be positive", file=sys.stderr)
+        return 2
+    if args.workers is not None and args.workers < 1:
+        print("audiotally: --workers must be at least 1", file=sys.stderr)
+        return 2
+
+    if not args.clipboard and is_batch(args.inputs):
+        ignored = [option for name, option in SINGLE_SELECTION_OPTIONS.items() if getattr(args, name)]
+        if ignored:
+            print(f"audiotally: {', '.join(ignored)} cannot be used in batch mode", file=sys.stderr)
+            return 2
+        return run_batch(args)
+
+    try:
+        raw = read_input(args)
+    except OSError as e:
+        print(f"audiotally: {e}", file=sys.stderr)
+        return 2
+
+    if args.export_clips or args.export_files:
+        return run_export(args, raw)
+
+    clips = core.parse_nuendo_bytes(raw, parallel=True) if raw else None
+    if not clips:
+        print("audiotally: no valid Cubase/Nuendo clip data found", file=sys.stderr)
+        return 1
+
+    total = core.total_samples(clips)
+    coverage = audiotally_coverage.coverage(clips, args.coverage) if args.coverage else None
+    files = FileIndex(clips) if args.by_file else None
+    if args.json:
+        print(json.dumps(core.tally_summary(clips, args.rate, total, coverage, args.coverage, files, args.sort,
+                                            args.timecode)))
+    elif args.details:
+        print(core.format_report(clips, args.rate, coverage, files, args.sort), end="")
+    else:
+        print(f"{core.samples_to_time(total, args.rate)}\t{len(clips)} events")
+        if args.timecode:
+            print(f"{core.samples_to_timecode(total, args.rate, args.timecode)}\t{args.timecode} fps")
+        if coverage is not None:
+            print(f"{core.samples_to_time(coverage.covered, args.rate)}\tcovered "
+                  f"({core.samples_to_time(coverage.overlap, args.rate)} overlap, "
+                  f"{core.samples_to_time(coverage.gaps, args.rate)} gaps)")
+        if files is not None:
+            for row in files.rows(args.sort):
+                print(f"{core.samples_to_time(row.total_samples, args.rate)}\t{row.events} events\t"
+                      f"{row.percent:.1f}%\t{row.path or row.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""
+AudioTally clipboard backends
+
+Each backend exposes a cheap change counter (the pasteboard change count on macOS,
+the clipboard sequence number on Windows) so the payload is only fetched when the
+clipboard actually changed. FakeClipboardBackend keeps everything in-process so the
+polling path can be exercised and benchmarked on any platform.
+
+ClipboardGuard puts a payload back from a background thread, and only when the
+clipboard lost it - never over something the user copied afterwards.
+"""
+
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+# Environment variable to force a backend: "mac", "windows", "pbpaste" or "fake"
+BACKEND_ENV_VAR = "AUDIOTALLY_CLIPBOARD"
+
+
+class ClipboardBackend:
+    """Base class for clipboard access with change detection"""
+
+    name = "base"
+
+    def __init__(self):
+        self.last_change_count = None
+
+    def change_count(self):
+        """Return a counter that moves whenever the clipboard changes, or None if unknown"""
+        return None
+
+    def read_bytes(self):
+        """Return the clipboard text as UTF-8 bytes, or None if unavailable"""
+        raise NotImplementedError
+
+    def write_bytes(self, data):
+        """Replace the clipboard text with UTF-8 bytes"""
+        raise NotImplementedError
+
+    def is_empty(self):
+        """Whether the clipboard holds nothing at all; backends that cannot tell say False"""
+        return False
+
+    def has_changed(self):
+        """Cheap check whether the clipboard changed since the last call
+
+        Backends without a change counter always report a change, leaving it to the
+        caller's content hash to decide.
+        """
+        count = self.change_count()
+        if count is None:
+            return True
+        if count == self.last_change_count:
+            return False
+        self.last_change_count = count
+        return True
+
+
+class MacPasteboardBackend(ClipboardBackend):
+    """Reads NSPasteboard in-process via PyObjC; changeCount is a single Objective-C call"""
+
+    name = "mac"
+
+    def __init__(self):
+        super().__init__()
+        from AppKit import NSPasteboard, NSPasteboardTypeString
+        from Foundation import NSData
+        self.pasteboard = NSPasteboard.generalPasteboard()
+        self.string_type = NSPasteboardTypeString
+        self.NSData = NSData
+
+    def change_count(self):
+        return self.pasteboard.changeCount()
+
+    def read_bytes(self):
+        data = self.pasteboard.dataForType_(self.string_type)
+        return bytes(data) if data is not None else None
+
+    def write_bytes(self, data):
+        self.pasteboard.clearContents()
+        # Hand the original bytes over as they are instead of decoding and re-encoding them
+        self.pasteboard.setData_forType_(self.NSData.dataWithBytes_length_(data, len(data)), self.string_type)
+
+    def is_empty(self):
+        return not self.pasteboard.types()
+
+
+class WindowsClipboardBackend(ClipboardBackend):
+    """Reads the Win32 clipboard via ctypes; GetClipboardSequenceNumber never opens the clipboard"""
+
+    name = "windows"
+
+    CF_UNICODETEXT = 13
+    GMEM_MOVEABLE = 0x0002
+
+    def __init__(self):
+        super().__init__()
+        import ctypes
+        from ctypes import wintypes
+        self.ctypes = ctypes
+        self.user32 = ctypes.windll.user32
+        self.kernel32 = ctypes.windll.kernel32
+        self.user32.GetClipboardData.restype = wintypes.HANDLE
+        self.user32.SetClipboardData.argtypes = [wintypes.UINT, wintypes.HANDLE]
+        self.kernel32.GlobalLock.argtypes = [wintypes.HGLOBAL]
+        self.kernel32.GlobalLock.restype = wintypes.LPVOID
+        self.kernel32.GlobalUnlock.argtypes = [wintypes.HGLOBAL]
+        self.kernel32.GlobalAlloc.restype = wintypes.HGLOBAL
+
+    def change_count(self):
+        return self.user32.GetClipboardSequenceNumber()
+
+    def read_bytes(self):
+        if not self.user32.OpenClipboard(None):
+            return None
+        try:
+            handle = self.user32.GetClipboardData(self.CF_UNICODETEXT)
+            if not handle:
+                return None
+            pointer = self.kernel32.GlobalLock(handle)
+            try:
+                return self.ctypes.wstring_at(pointer).encode('utf-8', errors='replace')
+            finally:
+                self.kernel32.GlobalUnlock(handle)
+        finally:
+            self.user32.CloseClipboard()
+
+    def write_bytes(self, data):
+        text = data.decode('utf-8', errors='replace')
+        buffer = self.ctypes.create_unicode_buffer(text)
+        size = self.ctypes.sizeof(buffer)
+        if not self.user32.OpenClipboard(None):
+            return
+        try:
+            self.user32.EmptyClipboard()
+            handle = self.kernel32.GlobalAlloc(self.GMEM_MOVEABLE, size)
+            pointer = self.kernel32.GlobalLock(handle)
+            self.ctypes.memmove(pointer, buffer, size)
+            self.kernel32.GlobalUnlock(handle)
+            self.user32.SetClipboardData(self.CF_UNICODETEXT, handle)
+        finally:
+            self.user32.CloseClipboard()
+
+    def is_empty(self):
+        return self.user32.CountClipboardFormats() == 0
+
+
+class PbpasteBackend(ClipboardBackend):
+    """Fallback that spawns pbpaste/pbcopy; it has no change counter so every poll fetches"""
+
+    name = "pbpaste"
+
+    def read_bytes(self):
+        try:
+            return subprocess.run(['pbpaste'], capture_output=True, timeout=0.5).stdout
+        except Exception:
+            return None
+
+    def write_bytes(self, data):
+        subprocess.run(['pbcopy'], input=data)
+
+
+class FakeClipboardBackend(ClipboardBackend):
+    """In-process clipboard for tests and benchmarks; counts reads so polling cost can be measured"""
+
+    name = "fake"
+
+    def __init__(self, data=b""):
+        super().__init__()
+        self.data = data
+        self.counter = 0
+        self.reads = 0
+        self.writes = 0
+
+    def set_clipboard(self, data):
+        """Simulate a copy in another application"""
+        self.data = data.encode('utf-8') if isinstance(data, str) else data
+        self.counter += 1
+
+    def change_count(self):
+        return self.counter
+
+    def read_bytes(self):
+        self.reads += 1
+        return self.data
+
+    def write_bytes(self, data):
+        self.writes += 1
+        self.set_clipboard(data)
+
+    def is_empty(self):
+        return not self.data
+
+
+class ClipboardGuard:
+    """Background thread restoring a payload to the clipboard only if the clipboard lost it
+
+    Reading never disturbs the clipboard, so the payload normally is still there and
+    nothing is written. A clipboard that changed since the payload was read and now holds
+    anything at all - the payload or a newer copy - is left alone too; only an empty one
+    gets the original bytes back.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.queue = queue.Queue()
+        self.checks = 0
+        self.restores = 0
+        self._thread = threading.Thread(target=self._run, name="AudioTallyClipboard", daemon=True)
+        self._thread.start()
+
+    def restore(self, data, change_count=None):
+        """Queue a check for a payload read at change_count; never blocks"""
+        self.queue.put((data, change_count))
+
+    def close(self, timeout=1.0):
+        """Stop the thread, dropping checks that have not started yet"""
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            # Only the latest payload matters; older checks are superseded
+            while job is not None:
+                try:
+                    newer = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                job = newer
+            if job is None:
+                return
+            try:
+                self.check(*job)
+            except Exception:
+                pass
+
+    def check(self, data, change_count=None):
+        """Restore data if the clipboard lost it; returns whether it was written"""
+        self.checks += 1
+        backend = self.backend
+        count = backend.change_count()
+        if change_count is not None and count == change_count:
+            return False  # Untouched since the payload was read
+        if not backend.is_empty():
+            return False  # Still the payload, or a newer copy - never clobber it
+        if backend.change_count() != count:
+            return False  # Something was copied while we looked
+        backend.write_bytes(data)
+        self.restores += 1
+        return True
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (MacPasteboardBackend, WindowsClipboardBackend, PbpasteBackend, FakeClipboardBackend)
+}
+
+
+def get_backend(name=None):
+    """Create the requested backend, or the best one available on this platform"""
+    name = name or os.environ.get(BACKEND_ENV_VAR)
+    if name:
+        return BACKENDS[name]()
+
+    if sys.platform == "win32":
+        return WindowsClipboardBackend()
+    if sys.platform == "darwin":
+        try:
+            return MacPasteboardBackend()
+        except ImportError:
+            # PyObjC not installed - fall back to spawning pbpaste
+            pass
+    return PbpasteBackend()
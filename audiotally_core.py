@@ -0,0 +1,565 @@
+"""
+AudioTally core - clipboard reading, Nuendo XML parsing and report formatting
+
+Everything needed to tally Cubase/Nuendo events without a display.
+Deliberately free of GUI imports so it loads in milliseconds from scripts and render nodes.
+"""
+
+import xml.etree.ElementTree as ET
+import xml.parsers.expat as expat
+import collections
+import fractions
+import hashlib
+import itertools
+import os
+import re
+import sys
+
+import audiotally_clipboard
+from audiotally_store import ClipStore
+from audiotally_timing import timings
+
+# Project sample rates offered by the app, as (display name, value) pairs
+SAMPLE_RATES = [
+    ("8 kHz", "8000"),
+    ("16 kHz", "16000"),
+    ("22.05 kHz", "22050"),
+    ("32 kHz", "32000"),
+    ("44.1 kHz", "44100"),
+    ("48 kHz", "48000"),
+    ("96 kHz", "96000"),
+    ("192 kHz", "192000")
+]
+
+DEFAULT_SAMPLE_RATE = 48000
+
+# SMPTE frame rates for timecode output: name -> (frames per second as numerator, denominator, drop-frame)
+TIMECODE_RATES = {
+    "23.976": (24000, 1001, False),
+    "24": (24, 1, False),
+    "25": (25, 1, False),
+    "29.97": (30000, 1001, False),
+    "29.97df": (30000, 1001, True),
+    "30": (30, 1, False),
+    "50": (50, 1, False),
+    "59.94": (60000, 1001, False),
+    "59.94df": (60000, 1001, True),
+    "60": (60, 1, False),
+}
+
+DEFAULT_TIMECODE_RATE = "25"
+
+# Control characters (0x00-0x1F except tab/CR/LF) are not valid in XML, but Cubase/Nuendo sometimes includes them
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F]')
+INVALID_XML_BYTES = bytes(range(0x00, 0x09)) + b'\x0B\x0C' + bytes(range(0x0E, 0x20))
+
+# Size of payload fingerprints in bytes - only used to tell snapshots apart, not for security
+FINGERPRINT_SIZE = 16
+
+# Outcome of one clipboard poll: raw is None when nothing was copied since the last poll, fingerprint
+# and text are as returned by scan_clipboard_bytes, and changed marks a new Cubase/Nuendo selection
+ClipboardPoll = collections.namedtuple('ClipboardPoll', ['raw', 'fingerprint', 'text', 'changed'])
+NOTHING_COPIED = ClipboardPoll(None, None, None, False)
+
+# Size of the slices fed to the incremental parser
+PARSE_CHUNK_SIZE = 64 * 1024
+
+# Payloads from this size (characters) are handed to audiotally_parallel first
+PARALLEL_MIN_SIZE = 16 * 1024 * 1024
+
+# Fast path for the regular Cubase/Nuendo layout: <region> blocks whose children are all plain
+# leaf elements (no attributes, comments, CDATA or entity references), with <filename>, <start>
+# and <end> appearing once each and in that order. Other leaf children may sit anywhere.
+def _fast_other_children(n):
+    return rf'(?:\s*<(?!(?:filename|start|end)>)(?P<other{n}>[A-Za-z_][\w.-]*)>[^<&]*</(?P=other{n})>)*'
+
+FAST_REGION = re.compile(
+    r'<region>' + _fast_other_children(1) +
+    r'\s*<filename>(?P<filename>[^<&]*)</filename>' + _fast_other_children(2) +
+    r'\s*<start>(?P<start>[^<&]*)</start>' + _fast_other_children(3) +
+    r'\s*<end>(?P<end>[^<&]*)</end>' + _fast_other_children(4) +
+    r'\s*</region>')
+FAST_FIELDS = [FAST_REGION.groupindex[name] - 1 for name in ('filename', 'start', 'end')]
+REGION_TAG = re.compile(r'<region[\s/>]')
+
+# Stands in for each matched region when the markup around the regions is checked
+REGION_PLACEHOLDER = '<region/>'
+ROOT_TAG = re.compile(r'<([A-Za-z_][\w.-]*)')
+
+# Set to cross-check every fast-path result against the ElementTree parser
+VERIFY_FAST_PATH = bool(os.environ.get("AUDIOTALLY_VERIFY_FAST_PATH"))
+
+
+def read_clipboard(backend=None):
+    """Read the raw clipboard bytes, or None if the clipboard could not be read"""
+    if backend is None:
+        backend = audiotally_clipboard.get_backend()
+    try:
+        return backend.read_bytes()
+    except Exception:
+        return None
+
+
+def is_nuendo_xml_content(content):
+    """Quick validation if content might be Nuendo XML without full parsing"""
+    if not content:
+        return False
+
+    # Fast preliminary checks - more lenient to handle partial clipboard reads
+    # Don't require 'filename' as it might not be in truncated/partial clipboard data
+    if isinstance(content, bytes):
+        return b'<?xml' in content and (b'region' in content or b'vst-xml' in content)
+    return ('<?xml' in content and
+            ('region' in content or 'vst-xml' in content))
+
+
+def fingerprint_bytes(raw):
+    """Fast fixed-size fingerprint of a payload for change detection"""
+    return hashlib.blake2b(raw, digest_size=FINGERPRINT_SIZE).digest()
+
+
+def decode_xml_bytes(raw):
+    """Decode an XML payload, falling back to Latin-1 for clipboards that are not valid UTF-8"""
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        # Latin-1 maps every byte, so this never fails
+        return raw.decode('latin-1')
+
+
+def scan_clipboard_bytes(raw, last_fingerprint=None, known=()):
+    """Check, fingerprint and clean a raw clipboard payload
+
+    Returns (fingerprint, text). fingerprint is None when the payload does not look like
+    Cubase/Nuendo XML. text is the decoded payload with invalid control characters
+    already stripped, or None when the fingerprint matches last_fingerprint or is in
+    known (e.g. a cache of parsed payloads) - so such a payload is hashed but never
+    cleaned or decoded.
+    """
+    if not is_nuendo_xml_content(raw):
+        return None, None
+
+    fingerprint = fingerprint_bytes(raw)
+    if fingerprint == last_fingerprint or fingerprint in known:
+        return fingerprint, None
+
+    return fingerprint, decode_xml_bytes(raw.translate(None, INVALID_XML_BYTES))
+
+
+def poll_clipboard(backend, last_fingerprint=None, known=()):
+    """One round of the clipboard poll loop, returning a ClipboardPoll
+
+    The payload is only fetched when the backend reports a copy since the last poll, and
+    only scanned with scan_clipboard_bytes when it could be read.
+    """
+    with timings.stage("poll.has_changed"):
+        clipboard_changed = backend.has_changed()
+    if not clipboard_changed:
+        return NOTHING_COPIED
+
+    with timings.stage("poll.read"):
+        raw = read_clipboard(backend)
+    with timings.stage("poll.scan"):
+        fingerprint, text = scan_clipboard_bytes(raw, last_fingerprint, known) if raw else (None, None)
+    return ClipboardPoll(raw, fingerprint, text, fingerprint is not None and fingerprint != last_fingerprint)
+
+
+def iter_nuendo_regions(xml_content, chunk_size=PARSE_CHUNK_SIZE, sanitized=False, cancelled=None):
+    """Incrementally parse Nuendo XML, yielding (filename, start, end) for each complete <region>
+
+    The payload is fed to a pull parser in slices, so records are available before the
+    whole payload has been consumed. Every element is released as soon as it is read,
+    which keeps memory flat no matter how many regions the selection contains.
+    Records come in document order: a nested region follows the region around it.
+    Pass sanitized=True for text that already went through scan_clipboard_bytes.
+    cancelled is an optional callable checked between slices; parsing stops early once it returns True.
+    Raises ET.ParseError on malformed XML.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    open_elements = []  # Path from the root down to the element currently being parsed
+    open_regions = []   # Slots in pending of the <region> elements on that path
+    pending = []        # Records of an outermost region and those nested in it, in start-tag order
+
+    def drain():
+        for event, elem in parser.read_events():
+            if event == 'start':
+                open_elements.append(elem)
+                if elem.tag == 'region':
+                    # Reserve the slot now so a nested region cannot come out ahead of this one
+                    open_regions.append(len(pending))
+                    pending.append(None)
+                continue
+
+            open_elements.pop()
+            if elem.tag == 'region':
+                filename_elem = elem.find('filename')
+                start_elem = elem.find('start')
+                end_elem = elem.find('end')
+                if filename_elem is not None and start_elem is not None and end_elem is not None:
+                    pending[open_regions[-1]] = (filename_elem.text, int(start_elem.text), int(end_elem.text))
+                open_regions.pop()
+                if not open_regions:
+                    yield from filter(None, pending)
+                    pending.clear()
+
+            # Children of an open region are still needed; anything else can be freed now
+            if not open_regions:
+                if open_elements:
+                    open_elements[-1].remove(elem)
+                elem.clear()
+
+    for offset in range(0, len(xml_content), chunk_size):
+        if cancelled is not None and cancelled():
+            return
+        chunk = xml_content[offset:offset + chunk_size]
+        parser.feed(chunk if sanitized else INVALID_XML_CHARS.sub('', chunk))
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
+def is_complete_document(xml_content):
+    """Whether cleaned XML ends with the closing tag of its root element"""
+    root = ROOT_TAG.search(xml_content, xml_content.find('?>') + 1)
+    if root is None:
+        return False
+    # Skip trailing whitespace without copying the whole payload the way rstrip() would
+    end = len(xml_content)
+    while end and xml_content[end - 1].isspace():
+        end -= 1
+    return xml_content.endswith(f"</{root.group(1)}>", 0, end)
+
+
+def prolog_end(xml_content):
+    """Offset just past the XML declaration, or 0 when there is none"""
+    return xml_content.find('?>') + 2 if xml_content.startswith('<?xml') else 0
+
+
+def has_special_markup(text):
+    """Whether text holds comments, CDATA, declarations or processing instructions after the prolog
+
+    The fast scanner would read <region> elements inside them as real ones.
+    """
+    begin = prolog_end(text)
+    return text.find('<!', begin) >= 0 or text.find('<?', begin) >= 0
+
+
+def split_regions_fast(text):
+    """Split cleaned XML on the fast scanner's pattern into (records, skeleton)
+
+    skeleton is the text with every matched region replaced by an empty <region/>, which
+    leaves the markup around the regions to be checked by is_well_formed. Returns None
+    when a matched start or end is not a number.
+    """
+    parts = FAST_REGION.split(text)
+    step = FAST_REGION.groups + 1
+    filename_index, start_index, end_index = (index + 1 for index in FAST_FIELDS)
+    try:
+        records = list(zip([filename or None for filename in parts[filename_index::step]],
+                           map(int, parts[start_index::step]), map(int, parts[end_index::step])))
+    except ValueError:
+        return None
+    return records, REGION_PLACEHOLDER.join(parts[0::step])
+
+
+def is_well_formed(*pieces):
+    """Whether the concatenated pieces are one well-formed XML document, checked by expat"""
+    parser = expat.ParserCreate()
+    try:
+        for piece in pieces:
+            parser.Parse(piece, False)
+        parser.Parse('', True)
+    except expat.ExpatError:
+        return False
+    return True
+
+
+def region_block(part):
+    """The <region> block closing a piece of XML split on '</region>', or None if it has no opening tag"""
+    start = part.rfind('<region>')
+    return part[start:] + '</region>' if start >= 0 else None
+
+
+def parse_region_block(block):
+    """(filename, start, end) of one block from region_block, or None if the fast scanner cannot read it"""
+    match = FAST_REGION.fullmatch(block)
+    if match is None:
+        return None
+    try:
+        return (match['filename'] or None, int(match['start']), int(match['end']))
+    except ValueError:
+        return None
+
+
+def scan_regions_fast(xml_content):
+    """Pull (filename, start, end) out of cleaned Nuendo XML with one precompiled pattern
+
+    Returns a list of records, or None when the payload contains anything the scanner
+    does not understand (attributes on <region>, nested elements, comments, CDATA,
+    entities, broken markup between regions, a truncated document...) so the caller can
+    fall back to iter_nuendo_regions.
+    """
+    # The document must be complete: a truncated clipboard is left to ElementTree to reject
+    if not is_complete_document(xml_content) or has_special_markup(xml_content):
+        return None
+
+    split = split_regions_fast(xml_content)
+    if split is None:
+        return None
+    records, skeleton = split
+    # Every <region> has to fit the pattern, otherwise some would be skipped, and the markup
+    # around them has to be well-formed, as ElementTree would reject the document otherwise
+    if skeleton.count('<region') != len(records) or not is_well_formed(skeleton):
+        return None
+    return records
+
+
+def fast_path_matches(xml_content):
+    """Whether the fast scanner agrees with the ElementTree parser on cleaned Nuendo XML"""
+    fast = scan_regions_fast(xml_content)
+    if fast is None:
+        return True  # Nothing to compare - the payload would take the ElementTree path anyway
+    try:
+        return fast == list(iter_nuendo_regions(xml_content, sanitized=True))
+    except Exception:
+        return False
+
+
+def iter_region_records(xml_content, sanitized=False):
+    """Yield (filename, start, end) for every region in document order, without holding them all
+
+    Regions are matched one at a time with the fast scanner's pattern. At the first one it
+    does not understand, the ElementTree pull parser takes over and continues from there,
+    so the stream is the same as parse_nuendo_xml would have read. Raises ET.ParseError
+    on malformed XML, possibly after some records were already yielded.
+    """
+    if not sanitized:
+        xml_content = INVALID_XML_CHARS.sub('', xml_content)
+
+    yielded = 0
+    if is_complete_document(xml_content) and not has_special_markup(xml_content):
+        # The markup between regions goes through expat as the stream advances, as in scan_regions_fast
+        skeleton = expat.ParserCreate()
+        position = 0
+        try:
+            for tag in REGION_TAG.finditer(xml_content):
+                if tag.start() < position:
+                    break  # A <region> inside the one just matched
+                match = FAST_REGION.match(xml_content, tag.start())
+                if match is None:
+                    break
+                record = (match['filename'] or None, int(match['start']), int(match['end']))
+                skeleton.Parse(xml_content[position:match.start()] + REGION_PLACEHOLDER, False)
+                position = match.end()
+                yield record
+                yielded += 1
+            else:
+                skeleton.Parse(xml_content[position:], True)
+                return
+        except (ValueError, expat.ExpatError):
+            pass
+    yield from itertools.islice(iter_nuendo_regions(xml_content, sanitized=True), yielded, None)
+
+
+def parse_nuendo_xml(xml_content, sanitized=False, cancelled=None, parallel=False):
+    """Parse Nuendo XML to extract clip information, or None if it holds no valid clip data
+
+    parallel lets very large payloads be split over several processes. Only top-level
+    callers set it; code already running in a process pool would multiply the processes.
+    """
+    if not is_nuendo_xml_content(xml_content):
+        return None
+    if not sanitized:
+        xml_content = INVALID_XML_CHARS.sub('', xml_content)
+
+    # Very large payloads are scanned on several cores when the fast scanner can read every chunk
+    if parallel and len(xml_content) >= PARALLEL_MIN_SIZE and not VERIFY_FAST_PATH:
+        import audiotally_parallel
+        clips = audiotally_parallel.parse_chunked(xml_content, cancelled)
+        if clips is not None:
+            return clips
+        if cancelled is not None and cancelled():
+            return None
+
+    # Try the specialized scanner first, falling back to ElementTree for anything unusual
+    records = scan_regions_fast(xml_content)
+    if records is not None and VERIFY_FAST_PATH and not fast_path_matches(xml_content):
+        print("audiotally: fast-path scanner disagrees with ElementTree, using ElementTree", file=sys.stderr)
+        records = None
+    if records is None:
+        # Stream regions out of the XML instead of building the whole element tree
+        records = iter_nuendo_regions(xml_content, sanitized=True, cancelled=cancelled)
+
+    clips = ClipStore()
+    try:
+        clips.extend(records)
+    except Exception:
+        # Malformed or truncated XML
+        return None
+
+    return clips
+
+
+def parse_nuendo_bytes(raw, parallel=False):
+    """Parse a raw Nuendo XML payload, or None if it holds no valid clip data"""
+    _, xml_content = scan_clipboard_bytes(raw)
+    if xml_content is None:
+        return None
+    return parse_nuendo_xml(xml_content, sanitized=True, parallel=parallel)
+
+
+def exact_rate(sample_rate):
+    """A sample rate as an exact (numerator, denominator) pair
+
+    Integer rates pass straight through. Non-integer ones (e.g. 47952.048 for a pulled-down
+    48 kHz) are taken at their decimal value, so the conversions below stay in integer math.
+    """
+    if isinstance(sample_rate, int):
+        return sample_rate, 1
+    rate = fractions.Fraction(str(sample_rate) if isinstance(sample_rate, float) else sample_rate)
+    return rate.numerator, rate.denominator
+
+
+def samples_to_time(samples, sample_rate):
+    """Convert samples to time format (mm:ss.mmm), truncated to the millisecond"""
+    # Integer math: no float rounding can turn x.999 into the next second
+    numerator, denominator = exact_rate(sample_rate)
+    milliseconds = samples * 1000 * denominator // numerator
+    return f"{milliseconds // 60000}:{milliseconds // 1000 % 60:02d}.{milliseconds % 1000:03d}"
+
+
+def samples_to_seconds(samples, sample_rate, places=3):
+    """Convert samples to seconds as a decimal string, rounded half up to the given places"""
+    numerator, denominator = exact_rate(sample_rate)
+    scale = 10 ** places
+    scaled = (samples * scale * denominator * 2 + numerator) // (numerator * 2)
+    if not places:
+        return str(scaled)
+    return f"{scaled // scale}.{scaled % scale:0{places}d}"
+
+
+def samples_to_timecode(samples, sample_rate, rate=DEFAULT_TIMECODE_RATE):
+    """Convert samples to SMPTE timecode (hh:mm:ss:ff, hh:mm:ss;ff for drop-frame), truncated to the frame
+
+    rate is a key of TIMECODE_RATES. Hours keep counting past 24, as this is a duration.
+    """
+    return frames_to_timecode(samples_to_frames(samples, sample_rate, rate), rate)
+
+
+def samples_to_frames(samples, sample_rate, rate=DEFAULT_TIMECODE_RATE):
+    """Whole frames in a number of samples at a TIMECODE_RATES frame rate, truncated"""
+    numerator, denominator, _ = TIMECODE_RATES[rate]
+    rate_numerator, rate_denominator = exact_rate(sample_rate)
+    return samples * numerator * rate_denominator // (rate_numerator * denominator)
+
+
+def frames_to_timecode(frames, rate=DEFAULT_TIMECODE_RATE):
+    """Format a frame count as SMPTE timecode at a TIMECODE_RATES frame rate"""
+    numerator, denominator, drop_frame = TIMECODE_RATES[rate]
+    nominal = -(-numerator // denominator)  # Frames per timecode second, 30 for 29.97
+
+    if drop_frame:
+        # Frame numbers 0 and 1 (0-3 at 59.94) are skipped every minute except every tenth
+        dropped = nominal // 15
+        per_minute = nominal * 60 - dropped
+        per_ten_minutes = per_minute * 10 + dropped
+        tens, rest = divmod(frames, per_ten_minutes)
+        frames += dropped * 9 * tens
+        if rest > dropped:
+            frames += dropped * ((rest - dropped) // per_minute)
+
+    separator = ";" if drop_frame else ":"
+    return (f"{frames // (nominal * 3600):02d}:{frames // (nominal * 60) % 60:02d}:"
+            f"{frames // nominal % 60:02d}{separator}{frames % nominal:02d}")
+
+
+def total_samples(clips):
+    """Sum the durations of all clips in samples"""
+    return clips.total_samples()
+
+
+def tally_summary(clips, sample_rate, total=None, coverage=None, coverage_mode=None, files=None, file_sort='duration',
+                  timecode_rate=None):
+    """Totals of a selection as a JSON-ready dict, as printed by audiotally --json"""
+    if total is None:
+        total = total_samples(clips)
+    summary = {
+        'events': len(clips),
+        'total_samples': total,
+        'sample_rate': sample_rate,
+        'total_duration': samples_to_time(total, sample_rate),
+        'total_seconds': total / sample_rate,
+    }
+    if timecode_rate is not None:
+        summary.update(timecode=samples_to_timecode(total, sample_rate, timecode_rate), timecode_rate=timecode_rate)
+    if coverage is not None:
+        summary.update(coverage_mode=coverage_mode, covered_samples=coverage.covered,
+                       overlap_samples=coverage.overlap, gap_samples=coverage.gaps)
+    if files is not None:
+        summary['files'] = [row._asdict() for row in files.rows(file_sort)]
+    return summary
+
+
+def iter_format_rows(samples, sample_rate):
+    """Yield a total in every output format, at every frame rate and at every project sample rate"""
+    yield ("TOTAL IN ALL FORMATS\n" +
+           "=" * 60 + "\n\n" +
+           f"   {samples_to_time(samples, sample_rate)} (mm:ss.mmm)\n"
+           f"   {samples_to_seconds(samples, sample_rate)} seconds\n"
+           f"   {samples:,} samples at {sample_rate:,} Hz\n\n")
+    yield "Timecode:\n" + "".join(f"   {samples_to_timecode(samples, sample_rate, rate)}  {rate} fps\n"
+                                   for rate in TIMECODE_RATES) + "\n"
+    yield "At other project sample rates:\n" + "".join(f"   {name:<10} {samples_to_time(samples, int(value))}\n"
+                                                      for name, value in SAMPLE_RATES) + "\n"
+    yield "-" * 60 + "\n\n"
+
+
+def iter_file_rows(files, sample_rate, sort='duration'):
+    """Yield the per-source-file summary as text rows, one block per file"""
+    yield f"By source file ({len(files)} files, sorted by {sort}):\n\n"
+    for row in files.rows(sort):
+        yield (f"• {row.name}\n"
+               f"   {row.events} events, {samples_to_time(row.total_samples, sample_rate)} ({row.percent:.1f}%)\n"
+               f"   {row.path or row.name}\n\n")
+    yield "-" * 60 + "\n\n"
+
+
+def iter_report_rows(clips, sample_rate, total=None, coverage=None, files=None, file_sort='duration'):
+    """Yield the detailed per-clip analysis as text rows: a header, one block per clip, then the totals
+
+    coverage is an optional audiotally_coverage.Coverage reported next to the raw sum, and
+    files an optional FileIndex summarized before the clip list.
+    """
+    if total is None:
+        total = total_samples(clips)
+
+    yield ("CUBASE/NUENDO CLIPS ANALYSIS\n" +
+           "=" * 60 + "\n\n")
+
+    if files is not None:
+        yield from iter_file_rows(files, sample_rate, file_sort)
+
+    yield f"Found {len(clips)} clips:\n\n"
+
+    for i, clip in enumerate(clips, 1):
+        duration = samples_to_time(clip.duration_samples, sample_rate)
+        duration_seconds = clip.duration_samples / sample_rate
+        yield (f"{i}. {clip.filename}\n"
+               f"   Duration: {duration} ({duration_seconds:.3f}s)\n"
+               f"   Samples: {clip.start:,} to {clip.end:,}\n\n")
+
+    footer = ("=" * 60 + "\n" +
+              f"⌛ TOTAL DURATION: {samples_to_time(total, sample_rate)}\n")
+    if coverage is not None:
+        footer += (f"🧩 Covered (overlaps counted once): {samples_to_time(coverage.covered, sample_rate)}\n" +
+                   f"   Overlap: {samples_to_time(coverage.overlap, sample_rate)}"
+                   f"   Gaps: {samples_to_time(coverage.gaps, sample_rate)}\n")
+    yield (footer +
+           f"📀 Total Samples: {total:,}\n" +
+           f"🔊 Sample Rate: {sample_rate:,} Hz\n" +
+           "=" * 60 + "\n")
+
+
+def format_report(clips, sample_rate, coverage=None, files=None, file_sort='duration'):
+    """Format the detailed per-clip analysis shown in the details panel"""
+    return "".join(iter_report_rows(clips, sample_rate, coverage=coverage, files=files, file_sort=file_sort))
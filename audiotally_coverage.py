@@ -0,0 +1,126 @@
+"""
+AudioTally timeline coverage
+
+Summing end - start over every region overstates the running time when events overlap
+(stacked takes, layered sound design, crossfaded comps). This module sorts the regions
+and sweeps them once to report the covered duration, the overlap and the gaps, either
+across the whole selection or separately for each source file.
+"""
+
+import collections
+
+from audiotally_store import load_numpy, numpy_for
+
+# Coverage of a set of regions, all in samples:
+#   summed  - plain sum of region durations (what the big result shows)
+#   covered - length of the union of the regions
+#   overlap - summed - covered, time counted more than once
+#   gaps    - span - covered, silence between the first start and the last end
+#   span    - last end - first start
+Coverage = collections.namedtuple('Coverage', ['summed', 'covered', 'overlap', 'gaps', 'span'])
+
+# Coverage modes: the whole selection as one timeline, or each source file on its own
+MODE_SELECTION = "selection"
+MODE_PER_FILE = "per_file"
+MODES = (MODE_SELECTION, MODE_PER_FILE)
+
+EMPTY = Coverage(0, 0, 0, 0, 0)
+
+# Largest value the vectorized sweep may produce after shifting groups apart
+_INT64_SAFE = 2 ** 62
+
+
+def _sweep_numpy(starts, ends, groups, group_count):
+    """Vectorized sort-and-sweep returning (covered, span) lists per group"""
+    np = load_numpy()
+    order = np.lexsort((starts, groups))
+    starts, ends, groups = starts[order], ends[order], groups[order]
+
+    # Shift every group into its own disjoint range so one running maximum serves them all
+    width = int(ends.max()) - int(starts.min()) + 1
+    if group_count > 1:
+        shift = groups.astype(np.int64) * width
+        starts = starts + shift
+        ends = ends + shift
+
+    reach = np.maximum.accumulate(ends)
+    block_first = np.empty(len(starts), dtype=bool)
+    block_first[0] = True
+    block_first[1:] = starts[1:] > reach[:-1]
+    first_index = np.flatnonzero(block_first)
+    last_index = np.append(first_index[1:] - 1, len(starts) - 1)
+
+    covered = np.zeros(group_count, dtype=np.int64)
+    np.add.at(covered, groups[first_index], reach[last_index] - starts[first_index])
+
+    group_first = np.flatnonzero(np.append(True, groups[1:] != groups[:-1]))
+    group_last = np.append(group_first[1:] - 1, len(starts) - 1)
+    span = np.zeros(group_count, dtype=np.int64)
+    span[groups[group_first]] = reach[group_last] - starts[group_first]
+    return covered.tolist(), span.tolist()
+
+
+def _sweep_python(starts, ends, groups, group_count):
+    """Pure-Python sort-and-sweep returning (covered, span) lists per group"""
+    covered = [0] * group_count
+    span = [0] * group_count
+    group = block_start = block_end = group_start = None
+
+    # Block ends only grow within a group, so the last one is also the group's furthest end
+    for region_group, start, end in sorted(zip(groups, starts, ends)):
+        if region_group != group:
+            if group is not None:
+                covered[group] += block_end - block_start
+                span[group] = block_end - group_start
+            group, block_start, block_end, group_start = region_group, start, end, start
+        elif start > block_end:
+            covered[group] += block_end - block_start
+            block_start, block_end = start, end
+        elif end > block_end:
+            block_end = end
+
+    if group is not None:
+        covered[group] += block_end - block_start
+        span[group] = block_end - group_start
+    return covered, span
+
+
+def _sweep(store, per_file):
+    """Covered and span per group, where groups are files or the whole selection"""
+    group_count = len(store.paths) if per_file else 1
+    np = numpy_for(len(store))
+    if np is not None:
+        starts, ends, _, file_ids = store.columns()
+        groups = file_ids if per_file else np.zeros(len(store), dtype=np.intc)
+        width = int(ends.max()) - int(starts.min()) + 1
+        if (group_count - 1) * width + int(ends.max()) < _INT64_SAFE:
+            return _sweep_numpy(starts, ends, groups, group_count)
+
+    groups = store.file_ids if per_file else [0] * len(store)
+    return _sweep_python(store.starts, store.ends, groups, group_count)
+
+
+def file_coverage(store):
+    """Coverage of each source file on its own, as a list indexed by file id"""
+    if not store:
+        return []
+    covered, span = _sweep(store, per_file=True)
+    return [Coverage(summed, cov, summed - cov, file_span - cov, file_span)
+            for summed, cov, file_span in zip(store.per_file_samples(), covered, span)]
+
+
+def coverage(store, mode=MODE_SELECTION):
+    """Coverage of a ClipStore in O(n log n)
+
+    With MODE_SELECTION all regions share one timeline. With MODE_PER_FILE overlaps only
+    count between regions of the same source file and the figures are summed over files.
+    """
+    if not store:
+        return EMPTY
+    if mode == MODE_PER_FILE:
+        files = file_coverage(store)
+        return Coverage(*(sum(values) for values in zip(*files)))
+
+    covered, span = _sweep(store, per_file=False)
+    summed = store.total_samples()
+    return Coverage(summed, covered[0], summed - covered[0], span[0] - covered[0], span[0])
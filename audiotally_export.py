@@ -0,0 +1,179 @@
+"""
+AudioTally export writers
+
+Per-clip and per-file results as CSV, JSON Lines or a simple EDL-style event list. The
+writers consume (path, start, end) records from a generator - core.iter_region_records
+straight off the XML, or the rows of a ClipStore - and format one row at a time, so memory
+stays flat whatever the number of events. Rows are formatted in batches and each batch
+reaches the file as one large write, keeping per-row overhead low for big exports.
+"""
+
+import collections
+import csv
+import io
+import itertools
+import json
+import os
+
+import audiotally_core as core
+from audiotally_store import FileTotal, FILE_SORTS, display_name
+
+FORMATS = ('csv', 'jsonl', 'edl')
+
+# File extensions recognized when no format is given
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.edl': 'edl'}
+
+CLIP_FIELDS = ['event', 'file', 'path', 'start', 'end', 'samples', 'duration', 'seconds']
+FILE_FIELDS = ['file', 'path', 'events', 'total_samples', 'duration', 'seconds', 'percent']
+
+# Rows formatted per write, and the buffer of files opened for export
+BATCH_ROWS = 10000
+FILE_BUFFER = 1024 * 1024
+
+
+def format_for_path(path, default='csv'):
+    """Export format implied by a file name's extension"""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), default)
+
+
+def open_export(path):
+    """Open a file for an export with a large write buffer"""
+    return open(path, 'w', newline='', encoding='utf-8', buffering=FILE_BUFFER)
+
+
+def store_records(clips):
+    """(path, start, end) records of a ClipStore, one at a time"""
+    paths = clips.paths
+    for file_id, start, end in zip(clips.file_ids, clips.starts, clips.ends):
+        yield paths[file_id], start, end
+
+
+def batches(rows, size=BATCH_ROWS):
+    """Split an iterable into lists of at most size items"""
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class FileTotals:
+    """Per-source-file events and samples accumulated while records stream past"""
+
+    def __init__(self):
+        self.events = collections.Counter()
+        self.samples = collections.Counter()
+
+    def track(self, records):
+        """Pass records through unchanged, counting the valid ones per file"""
+        events, samples = self.events, self.samples
+        for record in records:
+            path, start, end = record
+            if end > start:
+                events[path] += 1
+                samples[path] += end - start
+            yield record
+
+    def rows(self, sort='duration'):
+        """Per-file totals in the requested order, like FileIndex.rows"""
+        total = sum(self.samples.values())
+        rows = [FileTotal(path, display_name(path), events, self.samples[path],
+                          self.samples[path] * 100 / total if total else 0.0)
+                for path, events in self.events.items()]
+        key, descending = FILE_SORTS[sort]
+        rows.sort(key=key, reverse=descending)
+        return rows
+
+
+def iter_clip_rows(records, sample_rate):
+    """Yield one tuple of CLIP_FIELDS per clip; regions with end <= start are skipped, as in every tally"""
+    names = {}  # Path -> display name, as paths repeat across clips
+    event = 0
+    for path, start, end in records:
+        if end <= start:
+            continue
+        event += 1
+        name = names.get(path)
+        if name is None:
+            name = names[path] = display_name(path)
+        samples = end - start
+        yield (event, name, path or "", start, end, samples,
+               core.samples_to_time(samples, sample_rate), round(samples / sample_rate, 6))
+
+
+def iter_file_rows(rows, sample_rate):
+    """Yield one tuple of FILE_FIELDS per FileTotal row"""
+    for row in rows:
+        yield (row.name, row.path or "", row.events, row.total_samples,
+               core.samples_to_time(row.total_samples, sample_rate),
+               round(row.total_samples / sample_rate, 6), round(row.percent, 3))
+
+
+def iter_edl_lines(records, sample_rate, timecode_rate=core.DEFAULT_TIMECODE_RATE, title="AudioTally export"):
+    """Yield a CMX 3600-style event list: source in/out from each region, laid end to end on the record side
+
+    Source in and out are converted to whole frames once, and each record event is as many
+    frames long as its source event, so the two sides never disagree on a duration.
+    """
+    drop_frame = core.TIMECODE_RATES[timecode_rate][2]
+    yield f"TITLE: {title}\n"
+    yield f"FCM: {'DROP FRAME' if drop_frame else 'NON-DROP FRAME'}\n\n"
+
+    event = 0
+    record_in = 0  # Frames
+    for path, start, end in records:
+        if end <= start:
+            continue
+        event += 1
+        source_in = core.samples_to_frames(start, sample_rate, timecode_rate)
+        source_out = core.samples_to_frames(end, sample_rate, timecode_rate)
+        record_out = record_in + source_out - source_in
+        yield (f"{event:03d}  AX       A     C        "
+               f"{core.frames_to_timecode(source_in, timecode_rate)} "
+               f"{core.frames_to_timecode(source_out, timecode_rate)} "
+               f"{core.frames_to_timecode(record_in, timecode_rate)} "
+               f"{core.frames_to_timecode(record_out, timecode_rate)}\n"
+               f"* FROM CLIP NAME: {display_name(path)}\n"
+               f"* SOURCE FILE: {path or ''}\n\n")
+        record_in = record_out
+
+
+def _write_rows(rows, fields, out, fmt):
+    """Stream tuple rows to out as CSV or JSON Lines, one write per batch; returns the number of rows"""
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError(f"unsupported export format {fmt!r}")
+    if fmt == 'csv':
+        out.write(",".join(fields) + "\r\n")
+
+    count = 0
+    for batch in batches(rows):
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(batch)
+            out.write(buffer.getvalue())
+        else:
+            out.write("".join(json.dumps(dict(zip(fields, row))) + "\n" for row in batch))
+        count += len(batch)
+    return count
+
+
+def export_clips(records, sample_rate, out, fmt='csv', timecode_rate=core.DEFAULT_TIMECODE_RATE):
+    """Write one row per clip of a record stream to out; returns the number of clips written"""
+    if fmt != 'edl':
+        return _write_rows(iter_clip_rows(records, sample_rate), CLIP_FIELDS, out, fmt)
+
+    lines = iter_edl_lines(records, sample_rate, timecode_rate)
+    out.write("".join(itertools.islice(lines, 2)))  # Title and FCM lines
+    count = 0
+    for batch in batches(lines):
+        out.write("".join(batch))
+        count += len(batch)
+    return count
+
+
+def export_files(rows, sample_rate, out, fmt='csv'):
+    """Write per-file totals (FileTotal rows) to out; returns the number of files written"""
+    if fmt == 'edl':
+        raise ValueError("per-file totals cannot be written as an EDL")
+    return _write_rows(iter_file_rows(rows, sample_rate), FILE_FIELDS, out, fmt)
@@ -0,0 +1,194 @@
+"""
+AudioTally calculation history
+
+Every tally can be kept in a local SQLite database: when it happened, at which sample
+rate, how many events and samples, and the per-source-file breakdown. Writes go through
+a background thread that commits them in batches, so the Tk loop never waits on disk.
+Reads page through the history with keyset queries on indexed columns, so browsing
+thousands of past tallies only ever loads one page.
+"""
+
+import collections
+import queue
+import sqlite3
+import threading
+import time
+
+# One tally as written to the history; files is a list of (path, events, total_samples)
+HistoryEntry = collections.namedtuple('HistoryEntry',
+                                      ['created', 'sample_rate', 'events', 'total_samples', 'files', 'fingerprint'])
+
+# One tally as read back; files are loaded separately with TallyHistory.files
+HistoryRow = collections.namedtuple('HistoryRow',
+                                    ['id', 'created', 'sample_rate', 'events', 'total_samples', 'file_count'])
+
+# Entries written per transaction at most, and how long the writer waits to fill a batch (s)
+BATCH_SIZE = 100
+BATCH_WAIT = 0.5
+
+DEFAULT_PAGE_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tallies (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    sample_rate INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    total_samples INTEGER NOT NULL,
+    file_count INTEGER NOT NULL,
+    fingerprint BLOB
+);
+CREATE TABLE IF NOT EXISTS tally_files (
+    tally_id INTEGER NOT NULL REFERENCES tallies(id) ON DELETE CASCADE,
+    path TEXT,
+    events INTEGER NOT NULL,
+    total_samples INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tallies_created ON tallies(created);
+CREATE INDEX IF NOT EXISTS tally_files_tally ON tally_files(tally_id);
+CREATE INDEX IF NOT EXISTS tally_files_path ON tally_files(path, tally_id);
+"""
+
+
+def connect(path):
+    """Open the history database, creating the schema on first use"""
+    connection = sqlite3.connect(path, timeout=5)
+    # WAL lets the history view read while the writer thread commits
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("PRAGMA foreign_keys=ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def make_entry(sample_rate, total_samples, events, files=None, fingerprint=None, created=None):
+    """Build a HistoryEntry from a tally; files is a FileIndex or None"""
+    file_rows = [(row.path, row.events, row.total_samples) for row in files.rows()] if files is not None else []
+    return HistoryEntry(time.time() if created is None else created, sample_rate, events, total_samples,
+                        file_rows, fingerprint)
+
+
+def write_entries(connection, entries):
+    """Insert a batch of entries in one transaction"""
+    with connection:
+        for entry in entries:
+            cursor = connection.execute(
+                "INSERT INTO tallies (created, sample_rate, events, total_samples, file_count, fingerprint)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.created, entry.sample_rate, entry.events, entry.total_samples, len(entry.files),
+                 entry.fingerprint))
+            tally_id = cursor.lastrowid
+            connection.executemany(
+                "INSERT INTO tally_files (tally_id, path, events, total_samples) VALUES (?, ?, ?, ?)",
+                [(tally_id, path, events, samples) for path, events, samples in entry.files])
+
+
+class HistoryWriter:
+    """Background thread that appends entries to the history in batches"""
+
+    def __init__(self, path):
+        self.path = path
+        self.queue = queue.Queue()
+        self.written = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="AudioTallyHistory", daemon=True)
+        self._thread.start()
+
+    def record(self, entry):
+        """Queue an entry; never blocks"""
+        self.queue.put(entry)
+
+    def close(self, timeout=2.0):
+        """Write whatever is still queued and stop the thread"""
+        self.queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            connection = connect(self.path)
+        except Exception:
+            # No usable database (read-only home, locked file...) - history is simply not kept
+            connection = None
+
+        while True:
+            entry = self.queue.get()
+            batch = [] if entry is None else [entry]
+            stopping = entry is None
+
+            # Collect whatever else arrives shortly after, so a burst of copies is one transaction
+            deadline = time.monotonic() + BATCH_WAIT
+            while not stopping and len(batch) < BATCH_SIZE:
+                try:
+                    entry = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    stopping = True
+                else:
+                    batch.append(entry)
+
+            if batch and connection is not None:
+                try:
+                    write_entries(connection, batch)
+                    self.written += len(batch)
+                except Exception:
+                    self.failed += len(batch)
+            if stopping:
+                if connection is not None:
+                    connection.close()
+                return
+
+
+class TallyHistory:
+    """Read side of the history: keyset-paged queries, newest first"""
+
+    def __init__(self, path):
+        self.connection = connect(path)
+
+    def close(self):
+        self.connection.close()
+
+    def count(self, path=None):
+        """Number of tallies, optionally only those with clips from one source file"""
+        if path is None:
+            return self.connection.execute("SELECT COUNT(*) FROM tallies").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM tally_files WHERE path = ?", (path,)).fetchone()[0]
+
+    def page(self, before=None, limit=DEFAULT_PAGE_SIZE, path=None, since=None, until=None):
+        """One page of tallies, newest first
+
+        before is the (created, id) of the last row of the previous page; since and until
+        bound the timestamp; path keeps only tallies with clips from that source file.
+        """
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("(t.created < ? OR (t.created = ? AND t.id < ?))")
+            params.extend((before[0], before[0], before[1]))
+        if since is not None:
+            clauses.append("t.created >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("t.created < ?")
+            params.append(until)
+        if path is not None:
+            clauses.append("t.id IN (SELECT tally_id FROM tally_files WHERE path = ?)")
+            params.append(path)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self.connection.execute(
+            "SELECT t.id, t.created, t.sample_rate, t.events, t.total_samples, t.file_count FROM tallies t"
+            f"{where} ORDER BY t.created DESC, t.id DESC LIMIT ?", params + [limit])
+        return [HistoryRow(*row) for row in rows]
+
+    def get(self, tally_id):
+        """One tally by id, or None"""
+        row = self.connection.execute(
+            "SELECT id, created, sample_rate, events, total_samples, file_count FROM tallies WHERE id = ?",
+            (tally_id,)).fetchone()
+        return HistoryRow(*row) if row is not None else None
+
+    def files(self, tally_id):
+        """Per-file breakdown of one tally as (path, events, total_samples), largest first"""
+        return self.connection.execute(
+            "SELECT path, events, total_samples FROM tally_files WHERE tally_id = ? ORDER BY total_samples DESC",
+            (tally_id,)).fetchall()
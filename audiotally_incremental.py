@@ -0,0 +1,276 @@
+"""
+AudioTally incremental re-tally
+
+Editors often nudge a few events and copy the selection again. Instead of re-parsing the
+whole payload, IncrementalTally keeps the previous snapshot and diffs the next one against
+it. Identical stretches are only compared, with C-level slice comparisons; at each
+difference the <region> blocks of both snapshots are read one at a time until a block of
+one turns up in the other, which lines them up again. Only the blocks in those hunks that
+were not in the previous snapshot are scanned, so the cost follows the changed regions,
+not how far apart they are. The clip rows of the old hunks are spliced out and the new
+ones in, and the total and per-file aggregates are adjusted by the same rows.
+"""
+
+import bisect
+import collections
+import re
+
+import audiotally_core as core
+from audiotally_store import FileIndex
+
+# Region counts that changed between two snapshots; a modified region counts once in each
+TallyDelta = collections.namedtuple('TallyDelta', ['added', 'removed'])
+
+# Above this share of regions to read or scan a full parse is cheaper than diffing block by block
+MAX_CHANGED_FRACTION = 0.5
+
+# Slice lengths used while comparing two snapshots: small first, so a nearby difference is cheap
+MIN_COMPARE_STEP = 256
+COMPARE_STEP = 64 * 1024
+
+REGION_CLOSE = '</region>'
+REGION_CLOSE_TAG = re.compile(re.escape(REGION_CLOSE))
+
+
+def common_run(a, a_start, b, b_start):
+    """Length of the identical run of a from a_start and b from b_start"""
+    limit = min(len(a) - a_start, len(b) - b_start)
+    low = 0
+    step = MIN_COMPARE_STEP
+    # Grow the compared slices while they match, then bisect the first one that differs
+    while low + step <= limit and a[a_start + low:a_start + low + step] == b[b_start + low:b_start + low + step]:
+        low += step
+        step = min(step * 2, COMPARE_STEP)
+    high = min(limit, low + step)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[a_start + low:a_start + mid] == b[b_start + low:b_start + mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def next_block(text, begin):
+    """End of the block starting at begin (just past its </region>), or None after the last one"""
+    closing = text.find(REGION_CLOSE, begin)
+    return closing + len(REGION_CLOSE) if closing >= 0 else None
+
+
+def changed_hunks(old, new, block_limit):
+    """Block-aligned spans that differ between two snapshots, as (old_begin, old_end, new_begin, new_end)
+
+    Text between the hunks is identical in both. Each hunk starts right after a </region>
+    (or at 0) and ends right after one (or at the end of the text). Returns None when more
+    than block_limit blocks had to be read to line the snapshots up again.
+    """
+    hunks = []
+    old_at = new_at = 0
+    read = 0
+    while True:
+        run = common_run(old, old_at, new, new_at)
+        if old_at + run == len(old) and new_at + run == len(new):
+            return hunks
+        # Back up to the start of the block holding the difference
+        closing = new.rfind(REGION_CLOSE, new_at, new_at + run)
+        skip = closing + len(REGION_CLOSE) - new_at if closing >= 0 else 0
+        old_begin, new_begin = old_at + skip, new_at + skip
+
+        # Read blocks on both sides until one side's block was already read on the other
+        old_bounds, new_bounds = [old_begin], [new_begin]
+        old_seen, new_seen = {}, {}
+        synced = None
+        while synced is None:
+            old_end = next_block(old, old_bounds[-1]) if old_bounds[-1] is not None else None
+            new_end = next_block(new, new_bounds[-1]) if new_bounds[-1] is not None else None
+            if old_end is None and new_end is None:
+                synced = (len(old), len(new))  # No block left on either side: the rest is one hunk
+                break
+            read += 1
+            if read > block_limit:
+                return None
+            old_block = old[old_bounds[-1]:old_end] if old_end is not None else None
+            new_block = new[new_bounds[-1]:new_end] if new_end is not None else None
+            old_seen.setdefault(old_block, len(old_bounds) - 1)
+            new_seen.setdefault(new_block, len(new_bounds) - 1)
+            if new_block is not None and new_block in old_seen:
+                synced = (old_bounds[old_seen[new_block]], new_bounds[-1])
+            elif old_block is not None and old_block in new_seen:
+                synced = (old_bounds[-1], new_bounds[new_seen[old_block]])
+            old_bounds.append(old_end)
+            new_bounds.append(new_end)
+        old_at, new_at = synced
+        hunks.append((old_begin, old_at, new_begin, new_at))
+
+
+class IncrementalTally:
+    """Clips, total and per-file aggregates of the latest snapshot, updated by delta"""
+
+    def __init__(self, parallel=False):
+        self.parallel = parallel  # Full parses of very large snapshots may use several processes
+        self.reset()
+
+    def reset(self):
+        """Forget the previous snapshot so the next update is a full parse"""
+        self.text = None  # Previous snapshot, kept only while its clip rows line up with its </region> tags
+        self.skipped = []  # Offsets in text of the </region> tags of regions with end <= start, which have no row
+        self.file_events = collections.Counter()   # Path -> clips from that file
+        self.file_samples = collections.Counter()  # Path -> summed duration of those clips
+        self.clips = None
+        self.total = 0
+        self.files = None
+
+    def update(self, xml_content, cancelled=None):
+        """Tally a cleaned snapshot and return (clips, delta)
+
+        clips is None when the payload holds no valid clip data. delta is a TallyDelta when
+        the snapshot was diffed against the previous one, or None after a full parse.
+        """
+        old = self.text
+        if old is None or not core.is_nuendo_xml_content(xml_content):
+            return self._full(xml_content, cancelled), None
+        if xml_content == old:
+            return self.clips, TallyDelta(0, 0)
+        if not core.is_complete_document(xml_content):
+            return self._full(xml_content, cancelled), None
+
+        limit = (len(self.clips) + len(self.skipped)) * MAX_CHANGED_FRACTION
+        hunks = changed_hunks(old, xml_content, limit)
+        spliced = self._splice(old, xml_content, hunks, limit) if hunks is not None else None
+        if spliced is None:
+            return self._full(xml_content, cancelled), None
+        if self.clips is None:
+            self.reset()
+            return None, None
+        self.text = xml_content
+        return self.clips, spliced
+
+    def _splice(self, old, new, hunks, scan_limit):
+        """Replace the rows of each hunk's old blocks by those of its new blocks and return the delta
+
+        Returns None when a full parse is due instead.
+        """
+        clips, skipped = self.clips, self.skipped
+        paths, file_ids = clips.paths, clips.file_ids
+        starts, ends, durations = clips.starts, clips.ends, clips.durations
+        markup_begin = core.prolog_end(new)
+
+        # Each hunk's old blocks with their rows (None for skipped regions), and its row range
+        dropped = []
+        row_ranges = []
+        rows = 0
+        copied = 0
+        for old_begin, old_end, new_begin, new_end in hunks:
+            # A comment or CDATA section could hide regions from the parser but not from the block split
+            begin = max(new_begin, markup_begin)
+            if new.find('<!', begin, new_end) >= 0 or new.find('<?', begin, new_end) >= 0:
+                return None
+            rows += old.count(REGION_CLOSE, copied, old_begin) - (bisect.bisect_left(skipped, old_begin)
+                                                                  - bisect.bisect_left(skipped, copied))
+            blocks = []
+            row_begin = rows
+            closing = old.find(REGION_CLOSE, old_begin, old_end)
+            while closing >= 0:
+                row = None
+                position = bisect.bisect_left(skipped, closing)
+                if position == len(skipped) or skipped[position] != closing:
+                    row = rows
+                    rows += 1
+                blocks.append((core.region_block(old[old_begin:closing]), row))
+                old_begin = closing + len(REGION_CLOSE)
+                closing = old.find(REGION_CLOSE, old_begin, old_end)
+            dropped.append(blocks)
+            row_ranges.append((row_begin, rows))
+            copied = old_end
+
+        # Blocks that only moved are found among the dropped ones and keep their rows
+        known = {block: row for blocks in dropped for block, row in blocks if row is not None}
+        edits = []
+        new_skipped = []
+        added, removed = collections.Counter(), collections.Counter()
+        scanned = 0
+        copied = shift = 0
+        for (old_begin, old_end, new_begin, new_end), blocks, (row_begin, row_end) in zip(hunks, dropped, row_ranges):
+            # Regions with no row between the hunks moved by the change in length so far
+            new_skipped.extend(position + shift for position in
+                               skipped[bisect.bisect_left(skipped, copied):bisect.bisect_left(skipped, old_begin)])
+            parts = new[new_begin:new_end].split(REGION_CLOSE)
+            if new.count('<region', new_begin, new_end) != len(parts) - 1:
+                return None
+            records = []
+            offset = new_begin
+            for part in parts[:-1]:
+                block = core.region_block(part)
+                if block is None:
+                    return None
+                row = known.get(block)
+                if row is not None:
+                    record = (paths[file_ids[row]], starts[row], ends[row])
+                else:
+                    record = core.parse_region_block(block)
+                    scanned += 1
+                    if record is None or scanned > scan_limit:
+                        return None
+                offset += len(part)
+                if record[2] <= record[1]:
+                    new_skipped.append(offset)
+                offset += len(REGION_CLOSE)
+                records.append(record)
+                added[block] += 1
+            removed.update(block for block, _ in blocks)
+            edits.append((row_begin, row_end, records))
+            copied = old_end
+            shift = new_end - old_end
+
+        new_skipped.extend(position + shift for position in skipped[bisect.bisect_left(skipped, copied):])
+
+        for row_begin, row_end, records in edits:
+            for row in range(row_begin, row_end):
+                self._apply(paths[file_ids[row]], -1, durations[row])
+            for path, start, end in records:
+                self._apply(path, 1, end - start)
+        self._set_clips(clips.splice(edits))
+        self.skipped = new_skipped
+        # Blocks that only moved are not reported as changes
+        return TallyDelta(sum((added - removed).values()), sum((removed - added).values()))
+
+    def _apply(self, path, count, duration):
+        """Add (or with a negative count, remove) one region to the aggregates"""
+        if duration > 0:
+            self.total += count * duration
+            self.file_events[path] += count
+            self.file_samples[path] += count * duration
+
+    def _set_clips(self, clips):
+        """Publish a new store together with the per-file index kept by delta"""
+        if not clips:
+            self.clips = self.files = None
+            return
+        self.clips = clips
+        self.files = FileIndex(clips, [self.file_events[path] for path in clips.paths],
+                               [self.file_samples[path] for path in clips.paths])
+
+    def _full(self, xml_content, cancelled):
+        """Parse the whole snapshot and keep it for the next diff when its rows line up with its regions"""
+        self.reset()
+        clips = core.parse_nuendo_xml(xml_content, sanitized=True, cancelled=cancelled, parallel=self.parallel)
+        if not clips:
+            return None
+
+        self.clips, self.total, self.files = clips, clips.total_samples(), FileIndex(clips)
+        self.file_events.update(dict(zip(clips.paths, self.files.events)))
+        self.file_samples.update(dict(zip(clips.paths, self.files.samples)))
+
+        # Every region has to have produced one row, in document order, or be a known skipped one,
+        # and none may sit in a comment or CDATA section the block split cannot see
+        regions = xml_content.count(REGION_CLOSE)
+        if regions != xml_content.count('<region') or core.has_special_markup(xml_content):
+            return clips
+        if len(clips) != regions:
+            records = core.scan_regions_fast(xml_content)
+            if records is None or len(records) != regions:
+                return clips
+            closings = [match.start() for match in REGION_CLOSE_TAG.finditer(xml_content)]
+            self.skipped = [position for position, (_, start, end) in zip(closings, records) if end <= start]
+        self.text = xml_content
+        return clips
@@ -0,0 +1,205 @@
+"""
+AudioTally chunked parsing
+
+A whole reel of events can make a payload of tens of megabytes. Above PARALLEL_MIN_SIZE,
+parse_chunked splits it at <region> boundaries into one chunk per worker process and
+scans the chunks at the same time with the fast scanner. The payload is placed once in a
+shared memory block that every worker reads its own slice from, so it is never pickled
+through a pipe, and each worker answers with packed int64 columns and a small file table
+rather than one tuple per region. The parent remaps the file ids and appends the columns
+in order, which gives the same ClipStore as the single-process parser.
+
+Each worker also sends back the markup between its regions, which the parent feeds to one
+expat parser in chunk order, so broken markup is caught across chunk boundaries as well.
+Anything the fast scanner would not accept in any chunk makes parse_chunked return None,
+and the caller falls back to the single-process path with its ElementTree fallback.
+"""
+
+import array
+import atexit
+import concurrent.futures
+import os
+import threading
+import xml.parsers.expat as expat
+
+import audiotally_core as core
+from audiotally_store import ClipStore
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Platforms without POSIX or Windows shared memory
+    shared_memory = None
+
+# Payloads smaller than this (characters) are parsed in-process, and chunks are at least MIN_CHUNK_SIZE
+PARALLEL_MIN_SIZE = core.PARALLEL_MIN_SIZE
+MIN_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Environment variable setting the number of parser processes; 0 or 1 turns chunked parsing off
+WORKERS_ENV_VAR = "AUDIOTALLY_PARSE_WORKERS"
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_workers():
+    """Parser processes to use: the environment setting, else one per CPU"""
+    try:
+        return int(os.environ.get(WORKERS_ENV_VAR, ""))
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+def _get_pool(workers):
+    """Process pool kept for the session, so only the first large payload pays for its start-up"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+@atexit.register
+def shutdown():
+    """Stop the parser processes"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def chunk_bounds(data, chunks):
+    """Split points of a payload: each chunk but the first starts on a <region> tag"""
+    bounds = [0]
+    for index in range(1, chunks):
+        split = data.find(b'<region>', max(bounds[-1] + 1, len(data) * index // chunks))
+        if split < 0:
+            break
+        if split > bounds[-1]:
+            bounds.append(split)
+    bounds.append(len(data))
+    return bounds
+
+
+def _attach(name):
+    """Open a shared memory block created by the parent without adopting it for cleanup"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        # Before 3.13 attaching registers the block again. Pool workers share the parent's
+        # resource tracker, which keeps one entry per name, so this is harmless as long as
+        # it happens before the parent's unlink() removes that entry - parse_chunked waits
+        # for every started scan before unlinking
+        return shared_memory.SharedMemory(name=name)
+
+
+def scan_chunk(name, begin, end):
+    """Scan one slice of the shared payload; runs in a worker process
+
+    Returns (paths, starts, ends, durations, file_ids, skeleton) with file ids indexing
+    paths and skeleton the slice's markup around its regions, which the parent checks
+    across all chunks. Returns None when the slice holds anything the fast scanner does
+    not understand.
+    """
+    block = _attach(name)
+    view = block.buf[begin:end]
+    try:
+        text = str(view, 'utf-8')
+    finally:
+        view.release()
+        block.close()
+
+    # As in scan_regions_fast, every <region> has to fit the pattern; parse_chunked already
+    # ruled out comments and CDATA for the whole payload
+    split = core.split_regions_fast(text)
+    if split is None:
+        return None
+    records, skeleton = split
+    if skeleton.count('<region') != len(records):
+        return None
+
+    path_ids = {}
+    starts, ends, durations, file_ids = array.array('q'), array.array('q'), array.array('q'), array.array('i')
+    for path, start, end_sample in records:
+        if end_sample <= start:
+            continue
+        file_id = path_ids.get(path)
+        if file_id is None:
+            file_id = path_ids[path] = len(path_ids)
+        starts.append(start)
+        ends.append(end_sample)
+        durations.append(end_sample - start)
+        file_ids.append(file_id)
+    return list(path_ids), starts, ends, durations, file_ids, skeleton
+
+
+def parse_chunked(xml_content, cancelled=None, workers=None, min_size=PARALLEL_MIN_SIZE, min_chunk=MIN_CHUNK_SIZE):
+    """Parse cleaned Nuendo XML on several processes, or return None to use the in-process parser
+
+    None is also returned when the payload is below min_size, only one worker is
+    available, the document is incomplete or holds comments or CDATA, any chunk needs the
+    ElementTree fallback, or cancelled returned True while the chunks were being scanned.
+    """
+    workers = default_workers() if workers is None else workers
+    chunks = min(workers, len(xml_content) // max(1, min_chunk))
+    if shared_memory is None or chunks < 2 or len(xml_content) < min_size:
+        return None
+    # Comments and CDATA need the ElementTree fallback: rule them out before paying for the copy
+    if not core.is_complete_document(xml_content) or core.has_special_markup(xml_content):
+        return None
+
+    # Latin-1 payloads were decoded already; UTF-8 round-trips any text and splits cleanly at '<'
+    data = xml_content.encode('utf-8')
+    bounds = chunk_bounds(data, chunks)
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    futures = []
+    try:
+        block.buf[:len(data)] = data
+        del data
+        pool = _get_pool(workers)
+        futures = [pool.submit(scan_chunk, block.name, begin, end) for begin, end in zip(bounds, bounds[1:])]
+        # The markup around the regions is checked chunk by chunk while later chunks are still scanned
+        skeleton = expat.ParserCreate()
+        parts = []
+        for future in futures:
+            while True:
+                try:
+                    part = future.result(timeout=0.05)
+                    break
+                except concurrent.futures.TimeoutError:
+                    if cancelled is not None and cancelled():
+                        for pending in futures:
+                            pending.cancel()
+                        return None
+            if part is not None:
+                try:
+                    skeleton.Parse(part[-1], False)
+                except expat.ExpatError:
+                    part = None
+            if part is None:
+                for pending in futures:
+                    pending.cancel()
+                return None
+            parts.append(part[:-1])
+        try:
+            skeleton.Parse('', True)
+        except expat.ExpatError:
+            return None
+    except (OSError, concurrent.futures.process.BrokenProcessPool):
+        # No shared memory or worker processes here after all - parse in-process
+        return None
+    finally:
+        # Cancelling cannot stop a scan that already started: let those attach and finish
+        # before the block goes away, or they would register it again after the unlink
+        concurrent.futures.wait(futures)
+        block.close()
+        block.unlink()
+
+    clips = ClipStore()
+    for part in parts:
+        clips.extend_columns(*part)
+    return clips
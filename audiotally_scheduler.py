@@ -0,0 +1,53 @@
+"""
+AudioTally adaptive polling scheduler
+
+Polls quickly right after activity (a copy, the window gaining focus) and backs off
+exponentially while nothing happens, so a long idle session costs few wakeups.
+"""
+
+# Default interval bounds in milliseconds. An idle poll only reads the clipboard's change
+# count, so the cap stays low: a copy after a long idle stretch still shows within half a second
+DEFAULT_MIN_INTERVAL = 100
+DEFAULT_MAX_INTERVAL = 500
+DEFAULT_BACKOFF = 1.5
+
+
+class AdaptivePollScheduler:
+    """Computes the delay before the next clipboard poll"""
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 backoff=DEFAULT_BACKOFF):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("poll interval bounds must satisfy 0 < min_interval <= max_interval")
+        if backoff < 1:
+            raise ValueError("backoff factor must be at least 1")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval  # Current delay, exposed for diagnostics
+        self.polls = 0
+        self.idle_polls = 0
+
+    def note_activity(self):
+        """Something happened - go back to the fastest polling rate"""
+        self.interval = self.min_interval
+
+    def next_interval(self, changed):
+        """Record the outcome of a poll and return the delay before the next one in ms"""
+        self.polls += 1
+        if changed:
+            self.note_activity()
+        else:
+            self.idle_polls += 1
+            self.interval = min(self.max_interval, int(self.interval * self.backoff))
+        return self.interval
+
+    def stats(self):
+        """Current interval and poll counters, for diagnostics"""
+        return {
+            'interval_ms': self.interval,
+            'min_interval_ms': self.min_interval,
+            'max_interval_ms': self.max_interval,
+            'polls': self.polls,
+            'idle_polls': self.idle_polls,
+        }
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+audiotally-service - local tally service for scripts and other tools
+
+A small asyncio HTTP/1.1 server on a Unix domain socket or a localhost port. POST a
+Cubase/Nuendo XML payload to /tally and get the same JSON totals as ``audiotally --json``;
+GET /stats reports request counts, latency percentiles and throughput.
+
+    audiotally-service --socket /tmp/audiotally.sock
+    curl --unix-socket /tmp/audiotally.sock --data-binary @selection.xml \\
+         'http://localhost/tally?rate=48000&by_file=1'
+
+Memory stays bounded: payloads above --max-body are refused, and a request only reads its
+body once the bytes of every payload in flight fit within --max-inflight. Until then the
+connection is simply not read from, so clients are slowed down by TCP flow control rather
+than queued in memory. Parsing runs in a pool of --workers processes (or one thread), at
+most one job per worker at a time.
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import signal
+import sys
+import time
+import urllib.parse
+
+import audiotally_core as core
+import audiotally_coverage
+from audiotally_store import FileIndex, FILE_SORTS
+from audiotally_timing import RollingHistogram
+
+DEFAULT_PORT = 8765
+
+# Largest payload accepted, and payload bytes held by all requests together (MB)
+DEFAULT_MAX_BODY_MB = 64
+DEFAULT_MAX_INFLIGHT_MB = 256
+
+# Connections served at once; further ones wait before their first request is read
+DEFAULT_MAX_CONNECTIONS = 64
+
+# Seconds a keep-alive connection may sit idle or take to send its headers
+IDLE_TIMEOUT = 30
+
+MAX_HEADERS = 64
+
+# Longest request or header line accepted, which is also the stream reader's buffer limit
+MAX_LINE = 64 * 1024
+
+# Throughput is reported over this many most recent seconds
+THROUGHPUT_WINDOW = 60
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           411: "Length Required", 413: "Payload Too Large", 414: "URI Too Long", 422: "Unprocessable Entity",
+           431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """A request that is answered with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def tally_request(raw, sample_rate, coverage_mode=None, by_file=False, file_sort='duration', timecode_rate=None):
+    """Tally one payload with the app's rules; runs in the worker pool"""
+    clips = core.parse_nuendo_bytes(raw, parallel=False)  # The service's own pool already spreads requests
+    if not clips:
+        return None
+    coverage = audiotally_coverage.coverage(clips, coverage_mode) if coverage_mode else None
+    files = FileIndex(clips) if by_file else None
+    return core.tally_summary(clips, sample_rate, None, coverage, coverage_mode, files, file_sort, timecode_rate)
+
+
+async def read_line(reader, status, what):
+    """Read one CRLF-terminated line, refusing it with status when it exceeds MAX_LINE"""
+    try:
+        return await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+    except (ValueError, asyncio.LimitOverrunError):
+        # readline() reports an overrun of the reader's limit as ValueError
+        raise RequestError(status, f"{what} longer than {MAX_LINE} bytes")
+
+
+def parse_options(query):
+    """Tally options from the query string of a /tally request"""
+    params = urllib.parse.parse_qs(query)
+
+    def get(name, default=None):
+        values = params.get(name)
+        return values[-1] if values else default
+
+    try:
+        sample_rate = int(get('rate', core.DEFAULT_SAMPLE_RATE))
+    except ValueError:
+        raise RequestError(400, "rate must be an integer")
+    if sample_rate <= 0:
+        raise RequestError(400, "rate must be positive")
+    coverage_mode = get('coverage')
+    if coverage_mode is not None and coverage_mode not in audiotally_coverage.MODES:
+        raise RequestError(400, f"coverage must be one of {', '.join(audiotally_coverage.MODES)}")
+    file_sort = get('sort', 'duration')
+    if file_sort not in FILE_SORTS:
+        raise RequestError(400, f"sort must be one of {', '.join(FILE_SORTS)}")
+    timecode_rate = get('timecode')
+    if timecode_rate is not None and timecode_rate not in core.TIMECODE_RATES:
+        raise RequestError(400, f"timecode must be one of {', '.join(core.TIMECODE_RATES)}")
+    by_file = get('by_file', '0').lower() in ('1', 'true', 'yes')
+    return sample_rate, coverage_mode, by_file, file_sort, timecode_rate
+
+
+class ByteBudget:
+    """Payload bytes that may be held at once; acquire waits until they fit"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, nbytes):
+        async with self._condition:
+            # A payload larger than the whole budget still gets through once nothing else is held
+            await self._condition.wait_for(lambda: self.used == 0 or self.used + nbytes <= self.limit)
+            self.used += nbytes
+
+    async def release(self, nbytes):
+        async with self._condition:
+            self.used -= nbytes
+            self._condition.notify_all()
+
+
+class ServiceStats:
+    """Request counters, latency histogram and per-second throughput of the service"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.in_flight = 0
+        self.latency = RollingHistogram()
+        self.seconds = collections.deque(maxlen=THROUGHPUT_WINDOW)  # [second, requests, bytes], oldest first
+
+    def record(self, nbytes, seconds, ok):
+        """Count one finished request"""
+        self.requests += 1
+        self.errors += not ok
+        self.bytes_in += nbytes
+        self.latency.add(seconds)
+        now = int(time.monotonic())
+        if self.seconds and self.seconds[-1][0] == now:
+            self.seconds[-1][1] += 1
+            self.seconds[-1][2] += nbytes
+        else:
+            self.seconds.append([now, 1, nbytes])
+
+    def snapshot(self):
+        """Counters, latency percentiles and recent throughput as a JSON-ready dict"""
+        now = time.monotonic()
+        uptime = now - self.started
+        recent = [entry for entry in self.seconds if entry[0] > now - THROUGHPUT_WINDOW]
+        window = min(THROUGHPUT_WINDOW, max(uptime, 1))
+        return {
+            'uptime_s': round(uptime, 3),
+            'requests': self.requests,
+            'errors': self.errors,
+            'bytes_in': self.bytes_in,
+            'in_flight': self.in_flight,
+            'requests_per_s': sum(entry[1] for entry in recent) / window,
+            'mb_per_s': sum(entry[2] for entry in recent) / window / 1048576,
+            'latency': self.latency.summary(),
+        }
+
+
+class TallyService:
+    """asyncio HTTP server answering /tally and /stats"""
+
+    def __init__(self, workers=1, max_body=DEFAULT_MAX_BODY_MB * 1048576,
+                 max_inflight=DEFAULT_MAX_INFLIGHT_MB * 1048576, max_connections=DEFAULT_MAX_CONNECTIONS):
+        self.workers = workers
+        self.max_body = max_body
+        self.max_inflight = max_inflight
+        self.max_connections = max_connections
+        self.stats = ServiceStats()
+        self.executor = None
+        self.server = None
+
+    async def start(self, socket_path=None, host="127.0.0.1", port=DEFAULT_PORT):
+        """Start listening on a Unix socket, or on host:port when no socket path is given"""
+        # Created here so they belong to the running loop
+        self.budget = ByteBudget(self.max_inflight)
+        self.jobs = asyncio.Semaphore(self.workers)
+        self.connections = asyncio.Semaphore(self.max_connections)
+        if self.workers > 1:
+            self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+        if socket_path:
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)  # Left over from a previous run
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=socket_path, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_LINE)
+        return self.server
+
+    async def close(self):
+        """Stop accepting connections and shut the worker pool down"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def handle_connection(self, reader, writer):
+        async with self.connections:
+            try:
+                while await self.handle_request(reader, writer):
+                    pass
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                pass
+            finally:
+                writer.close()
+
+    async def handle_request(self, reader, writer):
+        """Serve one request; returns whether the connection stays open for another"""
+        try:
+            request_line = await read_line(reader, 414, "request line")
+        except RequestError as e:
+            # The rest of the line is still unread, so the connection cannot be reused
+            await self.respond(writer, e.status, {'error': str(e)}, False)
+            self.stats.record(0, 0.0, False)
+            return False
+        if not request_line:
+            return False
+        started = time.perf_counter()
+        nbytes = 0
+        keep_alive = False
+        self.stats.in_flight += 1
+        try:
+            try:
+                method, target, version, headers = await self.read_head(request_line, reader)
+                keep_alive = (headers.get('connection', '').lower() != 'close'
+                              and version == "HTTP/1.1")
+                status, body, nbytes = await self.dispatch(method, target, headers, reader)
+            except RequestError as e:
+                status, body = e.status, {'error': str(e)}
+                # The body of a refused request was not read, so the connection cannot be reused
+                keep_alive = False
+            except Exception as e:
+                status, body = 500, {'error': str(e)}
+                keep_alive = False
+
+            await self.respond(writer, status, body, keep_alive)
+        finally:
+            self.stats.in_flight -= 1
+        self.stats.record(nbytes, time.perf_counter() - started, status < 400)
+        return keep_alive
+
+    async def respond(self, writer, status, body, keep_alive):
+        """Send a JSON response"""
+        payload = json.dumps(body).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('ascii') + payload)
+        await writer.drain()
+
+    async def read_head(self, request_line, reader):
+        """Request method, target, HTTP version and lower-cased headers"""
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            raise RequestError(400, "malformed request line")
+        headers = {}
+        while True:
+            line = await read_line(reader, 431, "header line")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise RequestError(400, "too many headers")
+            name, _, value = line.decode('latin-1').partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    async def dispatch(self, method, target, headers, reader):
+        """Route a request; returns (status, JSON body, payload bytes read)"""
+        url = urllib.parse.urlsplit(target)
+        if url.path == "/stats":
+            if method != "GET":
+                raise RequestError(405, "use GET for /stats")
+            return 200, self.stats.snapshot(), 0
+        if url.path != "/tally":
+            raise RequestError(404, f"no such endpoint {url.path}")
+        if method != "POST":
+            raise RequestError(405, "use POST for /tally")
+
+        options = parse_options(url.query)
+        if 'content-length' not in headers:
+            raise RequestError(411, "Content-Length is required")
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise RequestError(400, "invalid Content-Length")
+        if length < 0:
+            raise RequestError(400, "invalid Content-Length")
+        if length > self.max_body:
+            raise RequestError(413, f"payload larger than {self.max_body} bytes")
+
+        # Backpressure: the body is not read until it fits in the in-flight budget
+        await self.budget.acquire(length)
+        try:
+            raw = await reader.readexactly(length)
+            async with self.jobs:
+                summary = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, tally_request, raw, *options)
+        finally:
+            await self.budget.release(length)
+
+        if summary is None:
+            return 422, {'error': "no valid Cubase/Nuendo clip data found"}, length
+        return 200, summary, length
+
+
+def build_parser():
+    """Build the command-line argument parser"""
+    parser = argparse.ArgumentParser(
+        prog="audiotally-service",
+        description="Serve Cubase/Nuendo duration totals over a local socket.")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="listen on this Unix domain socket instead of a localhost port")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"localhost port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="parser processes (default: CPU count; 1 parses on a thread)")
+    parser.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY_MB, metavar="MB",
+                        help=f"largest payload accepted (default {DEFAULT_MAX_BODY_MB} MB)")
+    parser.add_argument("--max-inflight", type=int, default=DEFAULT_MAX_INFLIGHT_MB, metavar="MB",
+                        help=f"payload memory held by all requests together (default {DEFAULT_MAX_INFLIGHT_MB} MB)")
+    parser.add_argument("--max-connections", type=int, default=DEFAULT_MAX_CONNECTIONS,
+                        help=f"connections served at once (default {DEFAULT_MAX_CONNECTIONS})")
+    return parser
+
+
+async def serve(args):
+    service = TallyService(args.workers, args.max_body * 1048576, args.max_inflight * 1048576,
+                           args.max_connections)
+    await service.start(args.socket, port=args.port)
+    where = args.socket or f"http://127.0.0.1:{args.port}"
+    print(f"audiotally-service: listening on {where} with {args.workers} workers", file=sys.stderr)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops have no signal handlers; Ctrl+C still raises KeyboardInterrupt
+            pass
+    try:
+        await stop.wait()
+    finally:
+        await service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        print(f"audiotally-service: {json.dumps(service.stats.snapshot())}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.workers < 1 or args.max_body < 1 or args.max_inflight < 1 or args.max_connections < 1:
+        print("audiotally-service: limits must be at least 1", file=sys.stderr)
+        return 2
+    if args.socket and not hasattr(asyncio, 'start_unix_server'):
+        print("audiotally-service: Unix sockets are not available here, use --port", file=sys.stderr)
+        return 2
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,265 @@
+"""
+AudioTally columnar clip store
+
+Clips are kept as contiguous int64 columns (start, end, duration) plus an interned table
+of source file paths referenced by integer id, instead of one dict per clip. Totals,
+extremes and per-file sums run as vectorized NumPy operations when NumPy is installed
+and as C-level builtins over the arrays otherwise. NumPy is only imported the first time
+a store of NUMPY_MIN_ROWS clips or more needs it, so importing the core stays cheap.
+"""
+
+import array
+import collections
+
+# Below this many rows the builtins are as fast as NumPy, and NumPy is not even imported
+NUMPY_MIN_ROWS = 4096
+
+_numpy = None  # The module once imported, False when it is not installed
+
+def load_numpy():
+    """The NumPy module, imported on first use, or None when it is not installed"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:  # NumPy is optional
+            _numpy = False
+    return _numpy or None
+
+
+def numpy_for(rows):
+    """NumPy for a column operation over rows rows, or None to use the builtins"""
+    return load_numpy() if rows >= NUMPY_MIN_ROWS else None
+
+
+# One clip as handed out when iterating a store; filename is the basename shown to the user
+Clip = collections.namedtuple('Clip', ['filename', 'start', 'end', 'duration_samples', 'path'])
+
+# Per-source-file totals; percent is this file's share of the selection's summed duration
+FileTotal = collections.namedtuple('FileTotal', ['path', 'name', 'events', 'total_samples', 'percent'])
+
+# Shown for regions whose <filename> is empty
+UNKNOWN_FILENAME = "Unknown"
+
+# Orderings offered by FileIndex.rows, with whether each sorts largest first by default
+FILE_SORTS = {
+    'duration': (lambda row: row.total_samples, True),
+    'events': (lambda row: row.events, True),
+    'name': (lambda row: (row.name.lower(), row.path or ""), False),
+    'path': (lambda row: row.path or "", False),
+}
+
+
+def display_name(path):
+    """Basename of a Cubase/Nuendo file path as shown in the report"""
+    return path.split('/')[-1] if path else UNKNOWN_FILENAME
+
+
+class ClipStore:
+    """Column-oriented collection of clips"""
+
+    def __init__(self):
+        self.starts = array.array('q')
+        self.ends = array.array('q')
+        self.durations = array.array('q')
+        self.file_ids = array.array('i')
+        self.paths = []       # Interned full source paths, indexed by file id
+        self.names = []       # Display names, parallel to paths
+        self.path_ids = {}    # Full path -> file id
+
+    @classmethod
+    def from_records(cls, records):
+        """Build a store from (path, start, end) records, keeping only regions with end > start"""
+        store = cls()
+        store.extend(records)
+        return store
+
+    def file_id(self, path):
+        """Intern a source path and return its integer id"""
+        file_id = self.path_ids.get(path)
+        if file_id is None:
+            file_id = self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+            self.names.append(display_name(path))
+        return file_id
+
+    def append(self, path, start, end):
+        """Add one clip"""
+        self.starts.append(start)
+        self.ends.append(end)
+        self.durations.append(end - start)
+        self.file_ids.append(self.file_id(path))
+
+    def extend(self, records):
+        """Add (path, start, end) records, skipping regions with end <= start"""
+        file_id = self.file_id
+        starts, ends, durations, file_ids = self.starts, self.ends, self.durations, self.file_ids
+        for path, start, end in records:
+            if end > start:
+                starts.append(start)
+                ends.append(end)
+                durations.append(end - start)
+                file_ids.append(file_id(path))
+
+    def extend_columns(self, paths, starts, ends, durations, file_ids):
+        """Append another chunk's columns, whose file ids index its own paths list"""
+        mapping = [self.file_id(path) for path in paths]
+        self.starts.extend(starts)
+        self.ends.extend(ends)
+        self.durations.extend(durations)
+        np = numpy_for(len(file_ids))
+        if mapping == list(range(len(mapping))):
+            self.file_ids.extend(file_ids)  # Chunk ids already match the store's, e.g. the first chunk
+        elif np is not None:
+            remapped = np.array(mapping, dtype=np.intc)[np.frombuffer(file_ids, dtype=np.intc)]
+            self.file_ids.frombytes(remapped.tobytes())
+        else:
+            self.file_ids.extend(mapping[file_id] for file_id in file_ids)
+
+    def _empty_copy(self):
+        """New store sharing nothing with this one but a copy of the file table"""
+        store = ClipStore()
+        store.paths = list(self.paths)
+        store.names = list(self.names)
+        store.path_ids = dict(self.path_ids)
+        return store
+
+    def splice(self, edits):
+        """New store with row ranges replaced, given (begin, end, records) edits in row order
+
+        Rows [begin:end) make way for the (path, start, end) records. Rows between the ranges
+        are copied column by column, so the cost is in the replaced rows. The original store
+        is left untouched for readers on other threads.
+        """
+        store = self._empty_copy()
+        copied = 0
+        for begin, end, records in edits:
+            store._copy_rows(self, copied, begin)
+            store.extend(records)
+            copied = end
+        store._copy_rows(self, copied, len(self))
+        return store
+
+    def _copy_rows(self, other, begin, end):
+        """Append rows [begin:end) of a store sharing this one's file ids"""
+        self.starts.extend(other.starts[begin:end])
+        self.ends.extend(other.ends[begin:end])
+        self.durations.extend(other.durations[begin:end])
+        self.file_ids.extend(other.file_ids[begin:end])
+
+    def __len__(self):
+        return len(self.durations)
+
+    def __bool__(self):
+        return len(self.durations) > 0
+
+    def __getitem__(self, index):
+        file_id = self.file_ids[index]
+        return Clip(self.names[file_id], self.starts[index], self.ends[index],
+                    self.durations[index], self.paths[file_id])
+
+    def __iter__(self):
+        names, paths = self.names, self.paths
+        for file_id, start, end, duration in zip(self.file_ids, self.starts, self.ends, self.durations):
+            yield Clip(names[file_id], start, end, duration, paths[file_id])
+
+    def columns(self):
+        """Zero-copy NumPy views of (starts, ends, durations, file_ids), or None without NumPy"""
+        np = load_numpy()
+        if np is None:
+            return None
+        return (np.frombuffer(self.starts, dtype=np.int64), np.frombuffer(self.ends, dtype=np.int64),
+                np.frombuffer(self.durations, dtype=np.int64), np.frombuffer(self.file_ids, dtype=np.intc))
+
+    def total_samples(self):
+        """Sum of all clip durations in samples"""
+        np = numpy_for(len(self.durations))
+        if np is not None:
+            return int(np.frombuffer(self.durations, dtype=np.int64).sum())
+        return sum(self.durations)
+
+    def shortest(self):
+        """Shortest clip duration in samples, or 0 for an empty store"""
+        if not self.durations:
+            return 0
+        np = numpy_for(len(self.durations))
+        if np is not None:
+            return int(np.frombuffer(self.durations, dtype=np.int64).min())
+        return min(self.durations)
+
+    def longest(self):
+        """Longest clip duration in samples, or 0 for an empty store"""
+        if not self.durations:
+            return 0
+        np = numpy_for(len(self.durations))
+        if np is not None:
+            return int(np.frombuffer(self.durations, dtype=np.int64).max())
+        return max(self.durations)
+
+    def per_file_events(self):
+        """Number of clips per file id, as a list indexed like paths"""
+        np = numpy_for(len(self.durations))
+        if np is not None:
+            return np.bincount(np.frombuffer(self.file_ids, dtype=np.intc), minlength=len(self.paths)).tolist()
+        counts = [0] * len(self.paths)
+        for file_id in self.file_ids:
+            counts[file_id] += 1
+        return counts
+
+    def per_file_samples(self):
+        """Total duration per file id, as a list indexed like paths"""
+        np = numpy_for(len(self.durations))
+        if np is not None:
+            totals = np.zeros(len(self.paths), dtype=np.int64)
+            np.add.at(totals, np.frombuffer(self.file_ids, dtype=np.intc),
+                      np.frombuffer(self.durations, dtype=np.int64))
+            return totals.tolist()
+        totals = [0] * len(self.paths)
+        for file_id, duration in zip(self.file_ids, self.durations):
+            totals[file_id] += duration
+        return totals
+
+    def nbytes(self):
+        """Approximate memory held by the columns and the file table"""
+        columns = sum(column.itemsize * len(column)
+                      for column in (self.starts, self.ends, self.durations, self.file_ids))
+        strings = sum(len(path or "") + len(name) for path, name in zip(self.paths, self.names))
+        return columns + strings
+
+
+class FileIndex:
+    """Per-source-file aggregation of a ClipStore, keyed on the full file path
+
+    Built once from the store's file-id column; sorting and lookups afterwards never
+    touch the clips again. events and samples (lists indexed like store.paths) can be
+    passed in when they are already known, e.g. kept up to date by an incremental tally.
+    """
+
+    def __init__(self, store, events=None, samples=None):
+        self.paths = store.paths
+        self.names = store.names
+        self.path_ids = store.path_ids
+        self.events = store.per_file_events() if events is None else events
+        self.samples = store.per_file_samples() if samples is None else samples
+        self.total_samples = sum(self.samples)
+
+    def __len__(self):
+        return sum(1 for events in self.events if events)
+
+    def _row(self, file_id):
+        samples = self.samples[file_id]
+        percent = samples * 100 / self.total_samples if self.total_samples else 0.0
+        return FileTotal(self.paths[file_id], self.names[file_id], self.events[file_id], samples, percent)
+
+    def get(self, path):
+        """Totals for one source file, or None if no clip came from it"""
+        file_id = self.path_ids.get(path)
+        return self._row(file_id) if file_id is not None else None
+
+    def rows(self, sort='duration', descending=None):
+        """All per-file totals in the requested order ('duration', 'events', 'name' or 'path')"""
+        key, default_descending = FILE_SORTS[sort]
+        rows = [self._row(file_id) for file_id in range(len(self.paths)) if self.events[file_id]]
+        rows.sort(key=key, reverse=default_descending if descending is None else descending)
+        return rows
@@ -0,0 +1,211 @@
+"""
+AudioTally stage timing
+
+Lightweight instrumentation for the clipboard pipeline: code wraps each stage in
+``with timings.stage("name"):`` and the elapsed time lands in a rolling histogram of the
+most recent runs of that stage. While instrumentation is off, stage() hands back one
+shared no-op context manager, so the cost is a method call and an attribute check.
+
+Set AUDIOTALLY_TIMING=1 to switch it on from the start of a session.
+
+StartupTimer splits one launch into consecutive phases (imports, UI build, first poll,
+first window shown) and checks them against STARTUP_BUDGET_MS.
+"""
+
+import bisect
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Runs of each stage kept for the statistics
+DEFAULT_WINDOW = 512
+
+# Upper bounds of the histogram buckets in milliseconds; the last bucket is open-ended
+BUCKET_BOUNDS_MS = (0.1, 0.3, 1, 3, 10, 30, 100, 300, 1000)
+
+# Launch to first window shown and first clipboard poll done (ms); AUDIOTALLY_STARTUP_BUDGET_MS overrides it
+STARTUP_BUDGET_MS = 750
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class RollingHistogram:
+    """Latencies of the most recent runs of one stage"""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.samples = collections.deque(maxlen=window)  # Seconds, oldest first
+        self.count = 0  # Runs ever recorded, including those that left the window
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        """Percentiles, mean and bucket counts of the window, in milliseconds"""
+        samples = sorted(self.samples)
+        if not samples:
+            return {'count': self.count, 'window': 0}
+
+        def percentile(fraction):
+            return samples[min(len(samples) - 1, int(fraction * len(samples)))] * 1000
+
+        buckets = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        for seconds in samples:
+            buckets[bisect.bisect_right(BUCKET_BOUNDS_MS, seconds * 1000)] += 1
+        return {
+            'count': self.count,
+            'window': len(samples),
+            'mean_ms': sum(samples) / len(samples) * 1000,
+            'p50_ms': percentile(0.5),
+            'p90_ms': percentile(0.9),
+            'p99_ms': percentile(0.99),
+            'max_ms': samples[-1] * 1000,
+            'buckets': dict(zip([f"<{bound}ms" for bound in BUCKET_BOUNDS_MS] + [f">={BUCKET_BOUNDS_MS[-1]}ms"],
+                                buckets)),
+        }
+
+
+class _Stage:
+    """Context manager timing one run of a stage"""
+
+    __slots__ = ('timings', 'name', 'started')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timings.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Timings:
+    """Rolling latency histograms per named stage; safe to record from several threads"""
+
+    def __init__(self, enabled=False, window=DEFAULT_WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """Context manager timing one run of a stage, or a shared no-op one while disabled"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        """Add one run of a stage"""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, RollingHistogram(self.window))
+        histogram.add(seconds)
+
+    def reset(self):
+        """Forget every recorded run"""
+        with self._lock:
+            self.histograms = {}
+
+    def snapshot(self):
+        """Summary of every stage, by name"""
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def format_table(self):
+        """Plain-text table of the stage statistics for the debug overlay"""
+        lines = [f"{'stage':<24}{'runs':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}  (ms)"]
+        for name, summary in self.snapshot().items():
+            if not summary['window']:
+                continue
+            lines.append(f"{name:<24}{summary['count']:>7}{summary['p50_ms']:>9.2f}{summary['p90_ms']:>9.2f}"
+                         f"{summary['p99_ms']:>9.2f}{summary['max_ms']:>9.2f}")
+        return "\n".join(lines)
+
+    def export_json(self, path):
+        """Write the stage statistics to a JSON file"""
+        report = {
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'window': self.window,
+            'stages': self.snapshot(),
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+class StartupTimer:
+    """Consecutive phases of one launch, each timed from the end of the previous one"""
+
+    def __init__(self, started=None, budget_ms=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.phases = []  # (name, seconds) in launch order
+        if budget_ms is None:
+            try:
+                budget_ms = float(os.environ.get("AUDIOTALLY_STARTUP_BUDGET_MS", STARTUP_BUDGET_MS))
+            except ValueError:
+                budget_ms = STARTUP_BUDGET_MS
+        self.budget_ms = budget_ms
+        self.budget_phase = None  # Phase the budget ends with, once it was reached
+
+    def mark(self, name, ends_budget=False):
+        """End the current phase; ends_budget marks the point the startup budget is measured to"""
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+        if ends_budget:
+            self.budget_phase = name
+
+    def budget_elapsed_ms(self):
+        """Milliseconds from launch to the end of the budgeted phases, or None while they run"""
+        if self.budget_phase is None:
+            return None
+        elapsed = 0.0
+        for name, seconds in self.phases:
+            elapsed += seconds
+            if name == self.budget_phase:
+                return elapsed * 1000
+
+    def within_budget(self):
+        """Whether the budgeted phases finished in time"""
+        elapsed = self.budget_elapsed_ms()
+        return elapsed is not None and elapsed <= self.budget_ms
+
+    def record(self, timings):
+        """Add every phase to a Timings instance as a startup.<phase> stage"""
+        for name, seconds in self.phases:
+            timings.record("startup." + name, seconds)
+
+    def as_dict(self):
+        """Phases and budget as plain values, for JSON"""
+        return {
+            'phases_ms': {name: seconds * 1000 for name, seconds in self.phases},
+            'total_ms': (self.last - self.started) * 1000,
+            'budget_ms': self.budget_ms,
+            'budget_elapsed_ms': self.budget_elapsed_ms(),
+            'within_budget': self.within_budget(),
+        }
+
+    def format_report(self):
+        """Plain-text breakdown of the launch, with the budget verdict"""
+        lines = ["AudioTally startup"]
+        elapsed = 0.0
+        for name, seconds in self.phases:
+            elapsed += seconds
+            lines.append(f"  {name:<16}{seconds * 1000:>9.1f} ms  (at {elapsed * 1000:>7.1f} ms)")
+        budget_elapsed = self.budget_elapsed_ms()
+        if budget_elapsed is not None:
+            verdict = "within" if budget_elapsed <= self.budget_ms else "OVER"
+            lines.append(f"  first window and poll after {budget_elapsed:.1f} ms, "
+                         f"{verdict} the {self.budget_ms:.0f} ms budget")
+        return "\n".join(lines)
+
+
+# Shared by the GUI, the worker and anything else that wants its stages in the overlay
+timings = Timings(enabled=bool(os.environ.get("AUDIOTALLY_TIMING")))
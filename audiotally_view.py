@@ -0,0 +1,85 @@
+"""
+AudioTally view state
+
+The status bar, the big result and the buttons are described as plain option values and
+applied through WidgetView, which remembers what each widget was last configured with and
+only calls configure() for the options that actually differ. customtkinter redraws a
+widget on every configure(), so re-applying the state already on screen costs nothing.
+"""
+
+# Status bar section colors as (fg_color, text_color)
+READY_ACTIVE = ("#024A14", "white")        # Dark green
+DETECTING_ACTIVE = ("#6A36E3", "white")    # Purple
+CALCULATED_ACTIVE = ("#FDF9DC", "black")   # Light yellow
+INACTIVE = ("#444444", "#AAAAAA")          # Grayed out
+CALCULATED_KEPT = ("#444444", "white")     # Grayed background, white text for visibility
+
+STATUS_STATES = ("ready", "detecting", "calculated_phase1", "calculated_phase2")
+
+_UNSET = object()
+
+
+def _section(colors, text=None):
+    options = {'fg_color': colors[0], 'text_color': colors[1]}
+    if text is not None:
+        options['text'] = text
+    return options
+
+
+def status_sections(state, event_count=0, calculated_before=False):
+    """Options of the three status bar sections for one status state
+
+    A section without a 'text' option keeps whatever text it shows already, which is how
+    the last calculated result stays visible while a new copy is being detected.
+    """
+    if state == "ready":
+        # Keep the calculated section as it is once there has been a calculation
+        return (_section(READY_ACTIVE),
+                _section(INACTIVE, "Events Detection"),
+                {} if calculated_before else _section(INACTIVE, "Status"))
+    if state == "detecting":
+        return (_section(INACTIVE),
+                _section(DETECTING_ACTIVE, f"🔎  Detected {event_count} events - Calculating"),
+                _section(INACTIVE) if calculated_before else _section(INACTIVE, "Status"))
+    if state == "calculated_phase1":
+        return (_section(INACTIVE),
+                _section(INACTIVE, "Events Detection"),
+                _section(CALCULATED_ACTIVE, f"✅ Calculated! ({event_count} events)"))
+    if state == "calculated_phase2":
+        return (_section(READY_ACTIVE),
+                _section(INACTIVE, "Events Detection"),
+                _section(CALCULATED_KEPT, f"Calculated! ({event_count} events)"))
+    raise ValueError(f"unknown status state {state!r}")
+
+
+class WidgetView:
+    """Options last applied to each widget; configures only what changes"""
+
+    def __init__(self):
+        self.applied = {}  # Widget -> options it was last configured with
+        self.configured = 0  # configure() calls made
+        self.skipped = 0  # Updates dropped because the widget already showed them
+
+    def remember(self, widget, **options):
+        """Record options a widget was created with, without configuring it"""
+        self.applied.setdefault(widget, {}).update(options)
+
+    def configure(self, widget, **options):
+        """Configure the options that differ from the last applied ones; returns whether any did"""
+        applied = self.applied.setdefault(widget, {})
+        changes = {name: value for name, value in options.items() if applied.get(name, _UNSET) != value}
+        if not changes:
+            self.skipped += 1
+            return False
+        widget.configure(**changes)
+        applied.update(changes)
+        self.configured += 1
+        return True
+
+    def forget(self, widget):
+        """Drop what is known about a widget, e.g. after it was configured directly"""
+        self.applied.pop(widget, None)
+
+    def stats(self):
+        """Configure calls made and skipped, for diagnostics"""
+        return {'widgets': len(self.applied), 'configured': self.configured, 'skipped': self.skipped}
@@ -0,0 +1,108 @@
+"""
+AudioTally background worker
+
+Parses clipboard snapshots and aggregates their totals off the Tk thread.
+Only the newest snapshot is ever processed: submitting a new one while a job is
+running cancels it, and results go back to the UI through a queue. Snapshots are
+diffed against the previous one, so a re-copy with a few edits only re-scans those.
+"""
+
+import collections
+import queue
+import threading
+
+import audiotally_coverage
+from audiotally_incremental import IncrementalTally
+from audiotally_timing import timings
+
+# Result handed back to the UI thread; clips is None when the payload held no valid clip data,
+# coverage is None when coverage is switched off, files is the per-source-file FileIndex,
+# delta is the TallyDelta against the previous snapshot or None after a full parse
+TallyResult = collections.namedtuple('TallyResult',
+                                     ['generation', 'fingerprint', 'raw', 'clips', 'total_samples', 'coverage',
+                                      'files', 'delta'])
+
+
+class TallyWorker:
+    """Background thread that parses the latest submitted snapshot"""
+
+    def __init__(self, coverage_mode=None, parallel=False):
+        self.coverage_mode = coverage_mode  # One of audiotally_coverage.MODES, or None to skip it
+        self.results = queue.Queue()
+        self.tally = IncrementalTally(parallel)  # Only touched by the worker thread
+        self.generation = 0  # Bumped on every submit; jobs from older generations are stale
+        self.busy = False
+        self._pending = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="AudioTallyWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, fingerprint, xml_content, raw=None):
+        """Queue a cleaned snapshot for parsing, replacing any snapshot still waiting"""
+        with self._condition:
+            self.generation += 1
+            self._pending = (self.generation, fingerprint, xml_content, raw)
+            self.busy = True
+            self._condition.notify()
+        return self.generation
+
+    def is_stale(self, generation):
+        """Whether a newer snapshot was submitted after the given generation"""
+        return generation != self.generation
+
+    def poll_result(self):
+        """Return the newest finished result that is still current, or None"""
+        latest = None
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if not self.is_stale(result.generation):
+                latest = result
+        return latest
+
+    def supersede(self):
+        """Make every submitted job stale and return the new generation, for results produced elsewhere"""
+        with self._condition:
+            self.generation += 1
+            return self.generation
+
+    def stop(self):
+        """Stop the worker thread after the current job"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                generation, fingerprint, xml_content, raw = self._pending
+                self._pending = None
+
+            if not self.is_stale(generation):
+                self._tally(generation, fingerprint, xml_content, raw)
+            with self._condition:
+                if self._pending is None:
+                    self.busy = False
+
+    def _tally(self, generation, fingerprint, xml_content, raw):
+        """Tally one snapshot and queue the result unless it was superseded meanwhile"""
+        # The parser checks between chunks whether this job was superseded
+        with timings.stage("worker.parse"):
+            clips, delta = self.tally.update(xml_content, cancelled=lambda: self.is_stale(generation))
+        if self.is_stale(generation):
+            return
+
+        total = self.tally.total if clips else 0
+        coverage = None
+        if clips and self.coverage_mode:
+            with timings.stage("worker.coverage"):
+                coverage = audiotally_coverage.coverage(clips, self.coverage_mode)
+        self.results.put(TallyResult(generation, fingerprint, raw, clips, total, coverage,
+                                     self.tally.files, delta))
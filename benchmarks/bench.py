@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+AudioTally benchmark suite
+
+Times each stage of the clipboard-to-report pipeline separately on synthetic payloads
+and writes the results as JSON, so runs from different versions can be compared.
+
+    python benchmarks/bench.py --sizes 10,1000,100000 --output bench.json
+    python benchmarks/bench.py --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import audiotally_core as core  # noqa: E402
+import audiotally_coverage  # noqa: E402
+import audiotally_parallel  # noqa: E402
+from audiotally_incremental import IncrementalTally  # noqa: E402
+from audiotally_cache import TallyCache  # noqa: E402
+from audiotally_clipboard import FakeClipboardBackend  # noqa: E402
+from audiotally_store import FileIndex  # noqa: E402
+from generate_clipboard import generate_clipboard_xml  # noqa: E402
+
+DEFAULT_SIZES = [10, 1000, 100000]
+DEFAULT_RATE = 48000
+
+
+def time_stage(func, repeat):
+    """Run func repeat times and return the individual timings in seconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def stage_functions(raw, sample_rate):
+    """Build the benchmarked stages for one payload, in pipeline order"""
+    fingerprint, text = core.scan_clipboard_bytes(raw)
+    clips = core.parse_nuendo_xml(text, sanitized=True)
+    total = core.total_samples(clips)
+    backend = FakeClipboardBackend(raw)
+    backend.has_changed()
+
+    # Re-copy with two regions edited, diffed against the previous snapshot
+    edited = text.replace('</end>', '1</end>', 1)
+    edited = edited[:len(edited) // 2] + edited[len(edited) // 2:].replace('</end>', '1</end>', 1)
+    # Re-copy with the first and the last region edited: the hunks are as far apart as they get
+    last_end = text.rindex('</end>')
+    far_edited = text.replace('</end>', '1</end>', 1)
+    far_edited = far_edited[:last_end + 1] + far_edited[last_end + 1:].replace('</end>', '1</end>', 1)
+    tally = IncrementalTally()
+    tally.update(text)
+
+    # Copying back a selection seen earlier: fingerprint, then a cache lookup instead of a parse
+    cache = TallyCache()
+    cache.put(fingerprint, clips, clips.nbytes())
+
+    return [
+        # Idle poll: the backend reports no change, so nothing is fetched
+        ("poll_unchanged", backend.has_changed),
+        # get_clipboard_content: signature check, fingerprint, clean and decode a new payload
+        ("decode", lambda: core.scan_clipboard_bytes(raw)),
+        # has_clipboard_changed: fingerprint an unchanged payload
+        ("has_clipboard_changed", lambda: core.scan_clipboard_bytes(raw, fingerprint)),
+        ("cache_hit", lambda: (core.scan_clipboard_bytes(raw, None, cache), cache.get(fingerprint))),
+        ("parse_nuendo_xml", lambda: core.parse_nuendo_xml(text, sanitized=True)),
+        ("parse_fast_path", lambda: core.scan_regions_fast(text)),
+        ("parse_elementtree", lambda: list(core.iter_nuendo_regions(text, sanitized=True))),
+        # Chunked parsing forced on whatever the payload size, to compare with parse_nuendo_xml
+        ("parse_chunked_2", lambda: audiotally_parallel.parse_chunked(text, workers=2, min_size=0, min_chunk=1)),
+        ("parse_chunked_4", lambda: audiotally_parallel.parse_chunked(text, workers=4, min_size=0, min_chunk=1)),
+        ("parse_chunked_8", lambda: audiotally_parallel.parse_chunked(text, workers=8, min_size=0, min_chunk=1)),
+        # The copy parse_chunked makes to put the payload in shared memory
+        ("chunked_encode", lambda: text.encode('utf-8')),
+        # Two updates per run: to the edited copy and back again
+        ("retally_two_edits", lambda: (tally.update(edited), tally.update(text))),
+        ("retally_far_edits", lambda: (tally.update(far_edited), tally.update(text))),
+        ("aggregation", lambda: core.total_samples(clips)),
+        ("aggregation_per_file", clips.per_file_samples),
+        ("file_index", lambda: FileIndex(clips).rows()),
+        ("coverage_selection", lambda: audiotally_coverage.coverage(clips, audiotally_coverage.MODE_SELECTION)),
+        ("coverage_per_file", lambda: audiotally_coverage.coverage(clips, audiotally_coverage.MODE_PER_FILE)),
+        ("samples_to_time", lambda: [core.samples_to_time(duration, sample_rate)
+                                     for duration in clips.durations]),
+        # calculate_duration: the whole details report
+        ("report_formatting", lambda: "".join(core.iter_report_rows(clips, sample_rate, total))),
+    ]
+
+
+def run(sizes, repeat, sample_rate, stages=None):
+    """Benchmark every stage at every size and return the result records"""
+    results = []
+    for size in sizes:
+        raw = generate_clipboard_xml(size).encode('utf-8')
+        # Large payloads take long enough per run that a few repeats are plenty
+        runs = max(1, min(repeat, repeat * 1000 // size)) if size > 1000 else repeat
+        clips = core.parse_nuendo_bytes(raw)
+        print(f"{'clip store':>22} {size:>8} regions  {clips.nbytes() / size:10.1f} bytes/clip", file=sys.stderr)
+        for name, func in stage_functions(raw, sample_rate):
+            if stages and name not in stages:
+                continue
+            timings = time_stage(func, runs)
+            results.append({
+                'stage': name,
+                'regions': size,
+                'payload_bytes': len(raw),
+                'runs': runs,
+                'best_s': min(timings),
+                'median_s': statistics.median(timings),
+                'per_region_ns': min(timings) / size * 1e9,
+            })
+            print(f"{name:>22} {size:>8} regions  best {min(timings) * 1000:10.3f} ms", file=sys.stderr)
+    return results
+
+
+def environment():
+    """Describe the machine and revision the benchmark ran on"""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                  capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        revision = None
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'revision': revision,
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def compare(baseline, results):
+    """Print the change of each stage against a previous run"""
+    previous = {(r['stage'], r['regions']): r['best_s'] for r in baseline['results']}
+    print(f"{'stage':>22} {'regions':>8} {'before ms':>12} {'after ms':>12} {'ratio':>8}")
+    for result in results:
+        before = previous.get((result['stage'], result['regions']))
+        if before is None:
+            continue
+        print(f"{result['stage']:>22} {result['regions']:>8} {before * 1000:12.3f} "
+              f"{result['best_s'] * 1000:12.3f} {result['best_s'] / before:8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AudioTally's clipboard pipeline stages.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated region counts (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage for small payloads")
+    parser.add_argument("--rate", type=int, default=DEFAULT_RATE, help="sample rate for formatting")
+    parser.add_argument("--stages", default=None, help="comma-separated subset of stages to run")
+    parser.add_argument("--output", default=None, help="write JSON results to this file (default stdout)")
+    parser.add_argument("--compare", default=None, help="previous JSON results to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    stages = set(args.stages.split(",")) if args.stages else None
+    results = run(sizes, args.repeat, args.rate, stages)
+    report = {'environment': environment(), 'results': results}
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
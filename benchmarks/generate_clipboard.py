@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Synthetic Cubase/Nuendo clipboard generator
+
+Produces clipboard XML shaped like a real multi-event copy: a vst-xml document with one
+<region> per event, long nested file paths, non-ASCII names and the stray control
+characters Cubase/Nuendo sometimes leaves in the payload.
+
+    python benchmarks/generate_clipboard.py 100000 > selection.xml
+"""
+
+import argparse
+import random
+import sys
+
+NAME_WORDS = ["Dialog", "Ambience", "Foley", "Sfx", "Música", "Größe", "Café", "Gęś", "声", "Tür", "Zoë", "Ωmega"]
+FOLDER_WORDS = ["Projects", "Reel 3", "Audio", "Edits", "Recordings", "Stems", "Bounces", "Ünterordner", "Conform"]
+
+# Characters Cubase/Nuendo has been seen to leave in clipboard payloads (invalid in XML)
+CONTROL_CHARS = "\x01\x02\x08\x0B\x0C\x1B\x1F"
+
+HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<vst-xml version="1.0">\n <list name="Events" type="obj">\n'
+FOOTER = ' </list>\n</vst-xml>\n'
+
+
+def random_path(rng, depth, non_ascii):
+    """Build an absolute audio file path with the given folder depth"""
+    words = NAME_WORDS if non_ascii else [w for w in NAME_WORDS if w.isascii()]
+    folders = [rng.choice(FOLDER_WORDS if non_ascii else [w for w in FOLDER_WORDS if w.isascii()])
+               for _ in range(depth)]
+    name = f"{rng.choice(words)}_{rng.randrange(1000):03d}_Take{rng.randrange(1, 20)}.wav"
+    return "/Volumes/" + "/".join(folders) + "/" + name
+
+
+def iter_clipboard_xml(region_count, seed=0, path_depth=8, file_count=None, non_ascii=True,
+                       control_char_rate=0.001):
+    """Yield the clipboard XML for region_count events piece by piece
+
+    file_count limits how many distinct source files the events come from (default: one
+    per 20 events), so per-file aggregation sees realistic reuse.
+    """
+    rng = random.Random(seed)
+    file_count = file_count or max(1, region_count // 20)
+    paths = [random_path(rng, path_depth, non_ascii) for _ in range(file_count)]
+
+    yield HEADER
+    position = 0
+    for i in range(region_count):
+        start = rng.randrange(0, 48000 * 600)
+        length = rng.randrange(4800, 48000 * 30)
+        position += rng.randrange(0, 48000 * 5)
+        stray = rng.choice(CONTROL_CHARS) if rng.random() < control_char_rate else ""
+        yield (f'  <obj class="MAudioEvent" ID="{i + 1}">\n'
+               f'   <int name="Start" value="{position}"/>\n'
+               f'   <region>\n'
+               f'    <name>Event {i + 1}{stray}</name>\n'
+               f'    <filename>{rng.choice(paths)}</filename>\n'
+               f'    <start>{start}</start>\n'
+               f'    <end>{start + length}</end>\n'
+               f'   </region>\n'
+               f'  </obj>\n')
+    yield FOOTER
+
+
+def generate_clipboard_xml(region_count, **options):
+    """Return the whole clipboard XML for region_count events as a string"""
+    return "".join(iter_clipboard_xml(region_count, **options))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic Cubase/Nuendo clipboard XML.")
+    parser.add_argument("regions", type=int, help="number of events (10 to 1000000)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--path-depth", type=int, default=8, help="folders in each file path")
+    parser.add_argument("--files", type=int, default=None, help="distinct source files")
+    parser.add_argument("--ascii", action="store_true", help="only ASCII file and event names")
+    parser.add_argument("--control-rate", type=float, default=0.001,
+                        help="fraction of events carrying a stray control character")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout.buffer
+    for piece in iter_clipboard_xml(args.regions, seed=args.seed, path_depth=args.path_depth,
+                                    file_count=args.files, non_ascii=not args.ascii,
+                                    control_char_rate=args.control_rate):
+        out.write(piece.encode('utf-8'))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,7 +17,7 @@ OPTIONS = {
         'NSHighResolutionCapable': True,
     },
     'packages': ['customtkinter', 'PIL', 'tkinter'],
-    'includes': ['xml.etree.ElementTree', 'subprocess', 'json', 'os'],
+    'includes': ['xml.etree.ElementTree', 'subprocess', 'json', 'os', 'audiotally_core', 'audiotally_clipboard'],
 }
 
 setup(
@@ -26,4 +26,8 @@ setup(
     data_files=DATA_FILES,
     options={'py2app': OPTIONS},
     setup_requires=['py2app'],
+    # Headless command-line entry point (no GUI dependencies)
+    py_modules=['audiotally_core', 'audiotally_store', 'audiotally_coverage', 'audiotally_incremental', 'audiotally_cache', 'audiotally_basket', 'audiotally_history', 'audiotally_timing', 'audiotally_view', 'audiotally_clipboard', 'audiotally_worker', 'audiotally_scheduler', 'audiotally_cli', 'audiotally_batch', 'audiotally_service', 'audiotally_export', 'audiotally_parallel'],
+    entry_points={'console_scripts': ['audiotally = audiotally_cli:main',
+                                     'audiotally-service = audiotally_service:main']},
 )
\ No newline at end of file
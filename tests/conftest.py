@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the repository root, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(params=["builtins", "numpy"])
+def column_backend(request, monkeypatch):
+    """Run a test with the array builtins and again with NumPy, whatever the store size"""
+    import audiotally_store
+    if request.param == "numpy":
+        if audiotally_store.load_numpy() is None:
+            pytest.skip("NumPy is not installed")
+        monkeypatch.setattr(audiotally_store, 'NUMPY_MIN_ROWS', 0)
+    else:
+        monkeypatch.setattr(audiotally_store, 'NUMPY_MIN_ROWS', float('inf'))
+    return request.param
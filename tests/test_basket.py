@@ -0,0 +1,93 @@
+"""Tally basket: distinct regions across copies"""
+
+import random
+
+from audiotally_basket import TallyBasket
+from audiotally_store import ClipStore
+
+
+def copy_of(*records):
+    return ClipStore.from_records(records)
+
+
+A = ("/a.wav", 0, 100)
+B = ("/a.wav", 100, 250)
+C = ("/b.wav", 0, 40)
+D = ("/b.wav", 10, 20)
+
+
+def test_overlapping_copies_count_shared_regions_once():
+    basket = TallyBasket()
+    assert basket.add("first", copy_of(A, B)) == 2
+    assert basket.add("second", copy_of(B, C)) == 1
+    assert basket.events == 3
+    assert basket.total == 100 + 150 + 40
+    assert len(basket) == 2
+
+    # The same copy again, or a copy with a region repeated, adds nothing twice
+    assert basket.add("first", copy_of(A, B)) == 0
+    assert basket.add("third", copy_of(C, C)) == 0
+    assert basket.total == 290
+    assert sorted(basket.clips()) == sorted(copy_of(A, B, C))
+
+
+def test_undo_restores_the_previous_total_exactly():
+    basket = TallyBasket()
+    basket.add("first", copy_of(A, C))
+    before = (basket.total, basket.events, list(basket.clips()))
+
+    basket.add("second", copy_of(B, C, D))
+    assert basket.total == 100 + 40 + 150 + 10
+    assert basket.remove_last() == "second"
+    assert (basket.total, basket.events, list(basket.clips())) == before
+    assert "second" not in basket
+
+    assert basket.remove_last() == "first"
+    assert basket.remove_last() is None
+    assert basket.total == 0
+
+
+def test_removing_a_copy_keeps_regions_another_copy_shares():
+    basket = TallyBasket()
+    basket.add("first", copy_of(A, B))
+    basket.add("second", copy_of(B, C))
+
+    assert basket.remove("first") == 1  # Only A leaves; B is still in the second copy
+    assert basket.total == 150 + 40
+    assert sorted(basket.clips()) == sorted(copy_of(B, C))
+    assert basket.remove("first") == 0
+
+    assert basket.remove("second") == 2
+    assert basket.total == 0
+    assert basket.events == 0
+    assert not basket.clips()
+
+
+def test_clear():
+    basket = TallyBasket()
+    basket.add("first", copy_of(A, B))
+    basket.clips()
+    basket.clear()
+    assert (len(basket), basket.events, basket.total) == (0, 0, 0)
+    assert not basket.clips()
+    # Keys taken out by clear can be added again
+    assert basket.add("first", copy_of(A)) == 1
+    assert basket.total == 100
+
+
+def test_random_adds_and_removes_match_a_recount():
+    rng = random.Random(3)
+    pool = [(f"/{index % 5}.wav", index * 10, index * 10 + rng.randrange(1, 50)) for index in range(60)]
+    basket = TallyBasket()
+    copies = {}
+    for step in range(300):
+        if copies and rng.random() < 0.4:
+            key = rng.choice(sorted(copies))
+            basket.remove(key)
+            del copies[key]
+        else:
+            copies[step] = rng.sample(pool, rng.randrange(1, 15))
+            basket.add(step, copy_of(*copies[step]))
+        distinct = {record for records in copies.values() for record in records}
+        assert basket.events == len(distinct)
+        assert basket.total == sum(end - start for _, start, end in distinct)
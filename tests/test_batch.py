@@ -0,0 +1,95 @@
+"""Batch mode: input expansion, streamed per-file rows and the grand total"""
+
+import csv
+import io
+import json
+import os
+
+import pytest
+
+import audiotally_batch as batch
+import audiotally_cli
+
+HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<vst-xml version="1.0">\n<list name="Events">\n'
+FOOTER = '</list>\n</vst-xml>\n'
+
+
+def selection(*lengths):
+    regions = "".join(f'<obj class="MAudioEvent"><region><name>take{index}</name>'
+                      f'<filename>/Audio/take{index}.wav</filename><start>0</start><end>{length}</end></region></obj>\n'
+                      for index, length in enumerate(lengths))
+    return HEADER + regions + FOOTER
+
+
+def touch(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(text)
+    return str(path)
+
+
+def test_expand_inputs_walks_directories_and_globs_in_sorted_order(tmp_path):
+    b = touch(tmp_path / "dir" / "b.xml")
+    upper = touch(tmp_path / "dir" / "sub" / "C.XML")
+    touch(tmp_path / "dir" / "notes.txt")
+    a = touch(tmp_path / "glob" / "a.xml")
+    os.makedirs(tmp_path / "glob" / "folder.xml")  # A directory matching the pattern is not a file
+
+    inputs = [str(tmp_path / "glob" / "*.xml"), str(tmp_path / "dir"), b, str(tmp_path / "missing.xml")]
+    assert batch.expand_inputs(inputs) == sorted([a, b, upper, str(tmp_path / "missing.xml")])
+    assert batch.expand_inputs([str(tmp_path / "*" / "nothing*.xml")]) == []
+
+
+@pytest.fixture
+def results(tmp_path):
+    paths = [touch(tmp_path / "one.xml", selection(48000, 24000)), touch(tmp_path / "two.xml", selection(96000)),
+             touch(tmp_path / "junk.xml", "not a selection"), str(tmp_path / "gone.xml")]
+    return [batch.tally_file(path) for path in paths]
+
+
+def test_csv_rows_keep_input_order_and_end_with_the_grand_total(results):
+    out = io.StringIO()
+    grand_total = batch.write_results(iter(results), 48000, out)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+    assert list(rows[0]) == batch.CSV_FIELDS
+
+    assert [os.path.basename(row['file']) for row in rows] == ["one.xml", "two.xml", "junk.xml", "gone.xml", "TOTAL"]
+    assert [(row['events'], row['total_samples'], row['duration'], row['seconds']) for row in rows] == [
+        ("2", "72000", "0:01.500", "1.5"), ("1", "96000", "0:02.000", "2.0"),
+        ("0", "0", "0:00.000", "0.0"), ("0", "0", "0:00.000", "0.0"), ("3", "168000", "0:03.500", "3.5")]
+    assert rows[0]['error'] == rows[1]['error'] == ""
+    assert rows[2]['error'] == "no valid Cubase/Nuendo clip data"
+    assert rows[3]['error']  # The OSError text
+    assert rows[4]['error'] == "2 of 4 files had no valid clip data"
+    assert grand_total == dict(rows[4], events=3, total_samples=168000, seconds=3.5)
+
+
+def test_jsonl_has_one_object_per_file_and_the_total(results):
+    out = io.StringIO()
+    batch.write_results(results[:2], 96000, out, "json")
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [(row['events'], row['total_samples'], row['seconds'], row['error']) for row in rows] == [
+        (2, 72000, 0.75, None), (1, 96000, 1.0, None), (3, 168000, 1.75, None)]
+    assert rows[-1]['file'] == "TOTAL"
+    assert rows[-1]['duration'] == "0:01.750"
+
+
+def test_empty_batch_still_writes_a_total():
+    out = io.StringIO()
+    assert batch.write_results([], 48000, out, "json")['events'] == 0
+    assert json.loads(out.getvalue())['file'] == "TOTAL"
+
+
+def test_pool_keeps_input_order(tmp_path):
+    paths = [touch(tmp_path / f"{index}.xml", selection(*[100] * (index + 1))) for index in range(6)]
+    assert [result['events'] for result in batch.iter_batch(paths, workers=2, chunksize=1)] == list(range(1, 7))
+
+
+@pytest.mark.parametrize('option', [["--details"], ["--timecode", "25"], ["--coverage", "selection"],
+                                    ["--by-file"], ["--export-clips", "-"], ["--export-files", "files.csv"]])
+def test_single_selection_options_are_rejected_in_batch_mode(tmp_path, capsys, option):
+    touch(tmp_path / "one.xml", selection(48000))
+    assert audiotally_cli.main([str(tmp_path)] + option) == 2
+    captured = capsys.readouterr()
+    assert captured.out == ""
+    assert option[0] in captured.err and "batch mode" in captured.err
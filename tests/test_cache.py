@@ -0,0 +1,94 @@
+"""Parsed-selection cache: LRU order, bounds and counters"""
+
+import pytest
+
+from audiotally_cache import TallyCache
+
+
+def test_least_recently_used_entry_goes_first():
+    cache = TallyCache(max_entries=3, max_bytes=1000)
+    for key in "abc":
+        cache.put(key, key.upper(), 10)
+    assert cache.get("a") == "A"  # a is now the most recently used
+    cache.put("d", "D", 10)
+    assert list(cache.entries) == ["c", "a", "d"]
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+    # Putting an existing key again refreshes it instead of adding a second entry
+    cache.put("c", "C2", 10)
+    assert list(cache.entries) == ["a", "d", "c"]
+    assert cache.get("c") == "C2"
+    assert len(cache) == 3
+    assert cache.nbytes == 30
+
+
+def test_membership_test_is_not_a_use():
+    cache = TallyCache(max_entries=2, max_bytes=1000)
+    cache.put("a", 1, 1)
+    cache.put("b", 2, 1)
+    assert "a" in cache
+    cache.put("c", 3, 1)
+    assert "a" not in cache
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_byte_bound_evicts_until_the_new_entry_fits():
+    cache = TallyCache(max_entries=10, max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    cache.put("c", 3, 30)
+    assert list(cache.entries) == ["b", "c"]
+    assert cache.nbytes == 70
+    cache.put("d", 4, 100)  # Exactly the budget: everything else has to go
+    assert list(cache.entries) == ["d"]
+    assert cache.nbytes == 100
+    assert cache.evictions == 3
+
+
+def test_oversize_entry_is_not_cached_and_replaces_nothing():
+    cache = TallyCache(max_entries=4, max_bytes=100)
+    cache.put("a", 1, 50)
+    cache.put("huge", 2, 101)
+    assert "huge" not in cache
+    assert list(cache.entries) == ["a"]
+    assert cache.nbytes == 50
+    assert cache.evictions == 0
+
+    # A key that grows past the budget drops its old value rather than keep a stale one
+    cache.put("a", 3, 500)
+    assert "a" not in cache
+    assert cache.nbytes == 0
+
+
+def test_counters_and_stats():
+    cache = TallyCache(max_entries=1, max_bytes=100)
+    assert cache.stats()['hit_rate'] == 0.0
+    cache.put("a", 1, 10)
+    cache.get("a")
+    cache.get("a")
+    cache.get("missing")
+    cache.put("b", 2, 20)
+    assert cache.get("a") is None
+    assert cache.stats() == {
+        'entries': 1, 'bytes': 20, 'max_entries': 1, 'max_bytes': 100,
+        'hits': 2, 'misses': 2, 'evictions': 1, 'hit_rate': 0.5,
+    }
+
+    cache.clear()
+    assert (len(cache), cache.nbytes) == (0, 0)
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 2, 1)  # clear keeps the counters
+
+
+def test_discard():
+    cache = TallyCache()
+    cache.put("a", 1, 10)
+    cache.discard("a")
+    cache.discard("never")
+    assert (len(cache), cache.nbytes, cache.evictions) == (0, 0, 0)
+
+
+@pytest.mark.parametrize('max_entries, max_bytes', [(0, 100), (4, 0)])
+def test_bounds_must_be_positive(max_entries, max_bytes):
+    with pytest.raises(ValueError):
+        TallyCache(max_entries, max_bytes)
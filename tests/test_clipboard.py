@@ -0,0 +1,149 @@
+"""Clipboard change detection, guarded restores and polling"""
+
+import audiotally_core as core
+from audiotally_clipboard import ClipboardGuard, FakeClipboardBackend
+from audiotally_scheduler import AdaptivePollScheduler
+
+
+PAYLOAD = (b'<?xml version="1.0" encoding="utf-8"?>\n<tracklist2><list name="track">'
+           b'<region><obj><string name="Name" value="Event"/></obj></region></list></tracklist2>')
+
+
+def test_has_changed_only_after_a_copy():
+    backend = FakeClipboardBackend()
+    assert backend.has_changed()  # First poll always looks
+    assert not backend.has_changed()
+    assert not backend.has_changed()
+
+    backend.set_clipboard(PAYLOAD)
+    assert backend.has_changed()
+    assert not backend.has_changed()
+
+    # Copying the same bytes again is still a change
+    backend.set_clipboard(PAYLOAD)
+    assert backend.has_changed()
+    assert backend.reads == 0
+
+
+def guard_for(backend):
+    guard = ClipboardGuard(backend)
+    guard.close()  # Drive check() directly, off the background thread
+    return guard
+
+
+def test_guard_leaves_an_untouched_clipboard_alone():
+    backend = FakeClipboardBackend(PAYLOAD)
+    guard = guard_for(backend)
+    assert not guard.check(PAYLOAD, backend.change_count())
+    assert backend.writes == 0
+    assert guard.restores == 0
+
+
+def test_guard_restores_a_cleared_clipboard():
+    backend = FakeClipboardBackend(PAYLOAD)
+    guard = guard_for(backend)
+    read_at = backend.change_count()
+    backend.set_clipboard(b"")
+
+    assert guard.check(PAYLOAD, read_at)
+    assert backend.data == PAYLOAD
+    assert backend.writes == 1
+    assert guard.restores == 1
+
+    # Restored - the next check finds it untouched
+    assert not guard.check(PAYLOAD, backend.change_count())
+    assert backend.writes == 1
+
+
+def test_guard_never_clobbers_a_newer_copy():
+    backend = FakeClipboardBackend(PAYLOAD)
+    guard = guard_for(backend)
+    read_at = backend.change_count()
+    backend.set_clipboard(b"copied elsewhere")
+
+    assert not guard.check(PAYLOAD, read_at)
+    assert backend.data == b"copied elsewhere"
+    assert backend.writes == 0
+
+
+def test_guard_thread_runs_queued_checks():
+    backend = FakeClipboardBackend(PAYLOAD)
+    guard = ClipboardGuard(backend)
+    read_at = backend.change_count()
+    backend.set_clipboard(b"")
+    guard.restore(PAYLOAD, read_at)
+    guard._thread.join(0.2)  # Let the queued check run before stopping
+    guard.close()
+    assert backend.data == PAYLOAD
+
+
+def poll(backend, scheduler, state):
+    """The app's poll round: remember a new selection and schedule the next poll"""
+    result = core.poll_clipboard(backend, state.get('fingerprint'))
+    if result.changed:
+        state['fingerprint'] = result.fingerprint
+    return scheduler.next_interval(result.changed)
+
+
+def test_poll_clipboard_reads_and_scans_only_after_a_copy():
+    backend = FakeClipboardBackend(PAYLOAD)
+    first = core.poll_clipboard(backend)
+    assert first == (PAYLOAD, core.fingerprint_bytes(PAYLOAD), PAYLOAD.decode(), True)
+    assert core.poll_clipboard(backend, first.fingerprint) == core.NOTHING_COPIED
+    assert backend.reads == 1
+
+    # The same bytes copied again are read, but neither new nor decoded
+    backend.set_clipboard(PAYLOAD)
+    assert core.poll_clipboard(backend, first.fingerprint) == (PAYLOAD, first.fingerprint, None, False)
+    # Nor is a payload the cache already knows
+    backend.set_clipboard(PAYLOAD)
+    assert core.poll_clipboard(backend, None, {first.fingerprint}) == (PAYLOAD, first.fingerprint, None, True)
+
+    backend.set_clipboard(b"plain text")
+    assert core.poll_clipboard(backend, first.fingerprint) == (b"plain text", None, None, False)
+    backend.set_clipboard(b"")
+    assert core.poll_clipboard(backend, first.fingerprint) == (b"", None, None, False)
+    assert backend.reads == 5
+
+
+def test_poll_loop_reads_only_after_a_copy_and_backs_off_while_idle():
+    backend = FakeClipboardBackend()
+    scheduler = AdaptivePollScheduler(min_interval=100, max_interval=400, backoff=2)
+    state = {}
+
+    intervals = [poll(backend, scheduler, state) for _ in range(5)]
+    assert backend.reads == 1  # Only the first poll looks at the empty clipboard
+    assert intervals == [200, 400, 400, 400, 400]
+
+    backend.set_clipboard(PAYLOAD)
+    assert poll(backend, scheduler, state) == 100
+    assert backend.reads == 2
+    assert state['fingerprint'] == core.fingerprint_bytes(PAYLOAD)
+
+    # Idle again: no reads, and the interval climbs back to the cap
+    assert [poll(backend, scheduler, state) for _ in range(3)] == [200, 400, 400]
+    assert backend.reads == 2
+
+    # The same selection copied again is read but is not new content
+    backend.set_clipboard(PAYLOAD)
+    assert poll(backend, scheduler, state) == 400
+    assert backend.reads == 3
+
+    # Non-Nuendo content is read once and ignored
+    backend.set_clipboard(b"plain text")
+    assert poll(backend, scheduler, state) == 400
+    assert backend.reads == 4
+    assert state['fingerprint'] == core.fingerprint_bytes(PAYLOAD)
+
+    scheduler.note_activity()
+    assert poll(backend, scheduler, state) == 200
+    assert scheduler.stats()['polls'] == 12
+
+
+def test_default_back_off_notices_a_copy_within_half_a_second():
+    scheduler = AdaptivePollScheduler()
+    intervals = [scheduler.next_interval(False) for _ in range(100)]
+    assert max(intervals) <= 500
+    assert intervals == sorted(intervals)
+    scheduler.note_activity()
+    assert scheduler.interval == scheduler.min_interval
@@ -0,0 +1,128 @@
+"""Timeline coverage: overlap and gaps of a selection, per file or as a whole"""
+
+import random
+
+import pytest
+
+import audiotally_coverage as coverage_module
+from audiotally_coverage import MODE_PER_FILE, MODE_SELECTION, Coverage, coverage, file_coverage
+from audiotally_store import ClipStore, load_numpy
+
+
+def store_of(*records):
+    return ClipStore.from_records(records)
+
+
+def merged_length(intervals):
+    """Length of the union of (start, end) intervals, the slow obvious way"""
+    covered = 0
+    reach = None
+    for start, end in sorted(intervals):
+        if reach is None or start > reach:
+            covered += end - start
+            reach = end
+        elif end > reach:
+            covered += end - reach
+            reach = end
+    return covered
+
+
+def reference(records, per_file):
+    groups = {}
+    for path, start, end in records:
+        if end > start:
+            groups.setdefault(path if per_file else None, []).append((start, end))
+    totals = [0] * 5
+    for intervals in groups.values():
+        summed = sum(end - start for start, end in intervals)
+        covered = merged_length(intervals)
+        span = max(end for _, end in intervals) - min(start for start, _ in intervals)
+        for index, value in enumerate((summed, covered, summed - covered, span - covered, span)):
+            totals[index] += value
+    return Coverage(*totals)
+
+
+def test_nested_region_counts_once(column_backend):
+    store = store_of(("/a.wav", 0, 100), ("/b.wav", 20, 50))
+    assert coverage(store, MODE_SELECTION) == Coverage(summed=130, covered=100, overlap=30, gaps=0, span=100)
+    # In different files the nested region is no overlap at all
+    assert coverage(store, MODE_PER_FILE) == Coverage(summed=130, covered=130, overlap=0, gaps=0, span=130)
+
+
+def test_touching_regions_neither_overlap_nor_leave_a_gap(column_backend):
+    store = store_of(("/a.wav", 0, 10), ("/a.wav", 10, 25), ("/a.wav", 25, 26))
+    assert coverage(store) == Coverage(summed=26, covered=26, overlap=0, gaps=0, span=26)
+
+
+def test_overlap_and_gap(column_backend):
+    store = store_of(("/a.wav", 30, 40), ("/a.wav", 0, 10), ("/a.wav", 5, 15))
+    assert coverage(store) == Coverage(summed=30, covered=25, overlap=5, gaps=15, span=40)
+
+
+def test_selection_and_per_file_modes(column_backend):
+    store = store_of(("/a.wav", 0, 100), ("/a.wav", 50, 150), ("/b.wav", 20, 70), ("/b.wav", 200, 220))
+    assert coverage(store, MODE_SELECTION) == Coverage(summed=270, covered=170, overlap=100, gaps=50, span=220)
+    assert file_coverage(store) == [Coverage(summed=200, covered=150, overlap=50, gaps=0, span=150),
+                                    Coverage(summed=70, covered=70, overlap=0, gaps=130, span=200)]
+    assert coverage(store, MODE_PER_FILE) == Coverage(summed=270, covered=220, overlap=50, gaps=130, span=350)
+
+
+def test_zero_length_regions_are_left_out(column_backend):
+    store = store_of(("/a.wav", 0, 10), ("/a.wav", 5, 5), ("/a.wav", 40, 40), ("/b.wav", 3, 1))
+    assert len(store) == 1
+    assert coverage(store) == Coverage(summed=10, covered=10, overlap=0, gaps=0, span=10)
+    assert coverage(ClipStore()) == coverage_module.EMPTY
+
+
+@pytest.mark.parametrize('sweep', ['python', 'numpy'])
+def test_sweeps_handle_zero_length_regions(sweep):
+    np = load_numpy()
+    if sweep == 'numpy' and np is None:
+        pytest.skip("NumPy is not installed")
+    starts, ends, groups = [0, 5, 20, 7], [10, 5, 20, 30], [0, 0, 0, 1]
+    if sweep == 'numpy':
+        covered, span = coverage_module._sweep_numpy(np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64),
+                                                     np.array(groups, dtype=np.intc), 2)
+    else:
+        covered, span = coverage_module._sweep_python(starts, ends, groups, 2)
+    # A zero-length region adds no coverage, inside a block or after a gap, but the one at 20 ends the span
+    assert covered == [10, 23]
+    assert span == [20, 23]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('mode', [MODE_SELECTION, MODE_PER_FILE])
+def test_random_selections_match_the_reference(column_backend, seed, mode):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(rng.randrange(1, 300)):
+        start = rng.randrange(0, 10_000)
+        records.append((f"/file{rng.randrange(8)}.wav", start, start + rng.randrange(-50, 800)))
+    assert coverage(ClipStore.from_records(records), mode) == reference(records, mode == MODE_PER_FILE)
+
+
+@pytest.mark.parametrize('mode', [MODE_SELECTION, MODE_PER_FILE])
+def test_backends_agree(monkeypatch, mode):
+    if load_numpy() is None:
+        pytest.skip("NumPy is not installed")
+    import audiotally_store
+    rng = random.Random(7)
+    records = []
+    for _ in range(20_000):
+        start = rng.randrange(0, 48000 * 3600)
+        records.append((f"/file{rng.randrange(300)}.wav", start, start + rng.randrange(1, 48000 * 20)))
+    store = ClipStore.from_records(records)
+
+    results = []
+    for min_rows in (0, float('inf')):
+        monkeypatch.setattr(audiotally_store, 'NUMPY_MIN_ROWS', min_rows)
+        results.append((coverage(store, mode), file_coverage(store)))
+    assert results[0] == results[1]
+
+
+def test_far_apart_groups_fall_back_to_the_python_sweep(column_backend):
+    # Shifting 3 files apart by this width would overflow int64, so the builtins take over
+    base = 2 ** 61
+    store = store_of(("/a.wav", 0, 10), ("/b.wav", base, base + 10), ("/c.wav", 5, base))
+    assert coverage(store, MODE_PER_FILE) == reference([("/a.wav", 0, 10), ("/b.wav", base, base + 10),
+                                                        ("/c.wav", 5, base)], per_file=True)
@@ -0,0 +1,41 @@
+"""Export writers"""
+
+import io
+
+import pytest
+
+import audiotally_core as core
+import audiotally_export as export
+
+
+def timecode_frames(timecode, nominal):
+    hours, minutes, seconds, frames = map(int, timecode.replace(';', ':').split(':'))
+    return ((hours * 60 + minutes) * 60 + seconds) * nominal + frames
+
+
+@pytest.mark.parametrize('rate, nominal', [("24", 24), ("25", 25), ("30", 30)])
+def test_edl_record_events_last_as_long_as_source_events(rate, nominal):
+    sample_rate = 48000
+    # Starts and ends that fall between frames, so truncating each of them would drift
+    records = [(f"/Audio/take{index}.wav", 424_123 + index * 7_919, 424_123 + index * 7_919 + 95_777 + index * 311)
+               for index in range(200)]
+    lines = "".join(export.iter_edl_lines(records, sample_rate, rate)).splitlines()
+    events = [line.split()[-4:] for line in lines if line[:3].isdigit()]
+    assert len(events) == len(records)
+
+    record_position = 0
+    for (path, start, end), (source_in, source_out, record_in, record_out) in zip(records, events):
+        assert timecode_frames(source_in, nominal) == core.samples_to_frames(start, sample_rate, rate)
+        assert timecode_frames(source_out, nominal) == core.samples_to_frames(end, sample_rate, rate)
+        assert timecode_frames(record_in, nominal) == record_position
+        record_position = timecode_frames(record_out, nominal)
+        assert (timecode_frames(record_out, nominal) - timecode_frames(record_in, nominal)
+                == timecode_frames(source_out, nominal) - timecode_frames(source_in, nominal))
+
+
+def test_clip_rows_skip_empty_regions():
+    out = io.StringIO()
+    count = export.export_clips([("/a.wav", 0, 48000), ("/b.wav", 10, 10), ("/c.wav", 0, 24000)], 48000, out)
+    assert count == 2
+    assert out.getvalue().splitlines()[1:] == ["1,a.wav,/a.wav,0,48000,48000,0:01.000,1.0",
+                                               "2,c.wav,/c.wav,0,24000,24000,0:00.500,0.5"]
@@ -0,0 +1,160 @@
+"""Parity of the fast region scanners with the ElementTree parser"""
+
+import concurrent.futures
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import audiotally_core as core
+import audiotally_parallel
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from generate_clipboard import generate_clipboard_xml  # noqa: E402
+
+HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<vst-xml version="1.0">\n<list name="Events">\n'
+FOOTER = '</list>\n</vst-xml>\n'
+
+
+def region(name, start, end):
+    return (f'<obj class="MAudioEvent"><region><name>{name}</name><filename>/Audio/{name}.wav</filename>'
+            f'<start>{start}</start><end>{end}</end></region></obj>\n')
+
+
+def document(*body):
+    return HEADER + "".join(body) + FOOTER
+
+
+def reference(xml_content):
+    """Records of the ElementTree parser, or None when it rejects the document"""
+    try:
+        return list(core.iter_nuendo_regions(xml_content))
+    except ET.ParseError:
+        return None
+
+
+def streamed(xml_content):
+    try:
+        return list(core.iter_region_records(xml_content))
+    except ET.ParseError:
+        return None
+
+
+def rows(clips):
+    return [(clip.path, clip.start, clip.end) for clip in clips] if clips else []
+
+
+CASES = {
+    'plain': document(region("A", 0, 100), region("B", 50, 300)),
+    'comment': document(region("A", 0, 100), '<!-- ' + region("B", 0, 999) + ' -->\n'),
+    'cdata': document(region("A", 0, 100), '<obj><![CDATA[' + region("B", 0, 999) + ']]></obj>\n'),
+    'processing_instruction': document(region("A", 0, 100), '<?note ' + region("B", 0, 999) + ' ?>\n'),
+    'unclosed_tag': document(region("A", 0, 100), '<x>\n', region("B", 0, 200)),
+    'stray_close': document(region("A", 0, 100), '</x>\n', region("B", 0, 200)),
+    'mismatched': document('<obj>', region("A", 0, 100), '</list>\n'),
+    'undefined_entity': document(region("A", 0, 100), '<obj name="&nope;"/>\n', region("B", 0, 200)),
+    'stray_ampersand': document(region("A", 0, 100), 'a & b\n', region("B", 0, 200)),
+    'second_root': document(region("A", 0, 100)) + '<vst-xml></vst-xml>\n',
+    'region_outside_root': HEADER.replace('<list name="Events">\n', '') + '</vst-xml>' + region("A", 0, 10)
+                           + '<vst-xml>\n</vst-xml>\n',
+    'entities_between': document(region("A", 0, 100), '<obj name="a &amp; b &#233;">x &lt; y</obj>\n',
+                                 region("B", 0, 200)),
+    'nested_region': document('<obj><region><name>A</name><region><filename>/a.wav</filename>'
+                              '<start>0</start><end>10</end></region><filename>/b.wav</filename>'
+                              '<start>5</start><end>50</end></region></obj>\n'),
+}
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_fast_scanner_matches_elementtree(name):
+    xml_content = CASES[name]
+    expected = reference(xml_content)
+
+    fast = core.scan_regions_fast(xml_content)
+    assert fast is None or fast == expected  # None falls back to ElementTree
+    assert rows(core.parse_nuendo_xml(xml_content)) == [record for record in expected or [] if record[2] > record[1]]
+    assert streamed(xml_content) == expected
+
+
+@pytest.mark.parametrize('name', sorted(CASES))
+def test_chunked_scanner_matches_elementtree(name):
+    xml_content = CASES[name]
+    expected = reference(xml_content)
+    clips = audiotally_parallel.parse_chunked(xml_content, workers=2, min_size=0, min_chunk=1)
+    assert clips is None or rows(clips) == [record for record in expected if record[2] > record[1]]
+
+
+def test_chunked_parser_rejects_special_markup_before_copying(monkeypatch):
+    def copy(*args, **kwargs):
+        raise AssertionError("payload copied to shared memory")
+
+    monkeypatch.setattr(audiotally_parallel.shared_memory, 'SharedMemory', copy)
+    for name in ('comment', 'cdata', 'processing_instruction'):
+        assert audiotally_parallel.parse_chunked(CASES[name], workers=2, min_size=0, min_chunk=1) is None
+
+
+def test_cancelled_chunked_parse_waits_for_started_scans(monkeypatch):
+    attached = []
+
+    def slow_scan(name, begin, end):
+        time.sleep(0.2)
+        block = audiotally_parallel._attach(name)  # Fails once the parent has unlinked the block
+        block.close()
+        attached.append(name)
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(audiotally_parallel, '_get_pool', lambda workers: pool)
+    monkeypatch.setattr(audiotally_parallel, 'scan_chunk', slow_scan)
+    xml_content = document(*(region(f"E{index}", 0, 10) for index in range(40)))
+    assert audiotally_parallel.parse_chunked(xml_content, cancelled=lambda: True, workers=4,
+                                             min_size=0, min_chunk=1) is None
+    # The two scans already running attached before the block went away; the queued ones never ran
+    assert len(attached) == 2
+    pool.shutdown()
+
+
+def test_fast_scanner_rejects_broken_markup():
+    for name in ('comment', 'cdata', 'processing_instruction', 'unclosed_tag', 'stray_close',
+                 'undefined_entity', 'second_root'):
+        assert core.scan_regions_fast(CASES[name]) is None, name
+    assert core.scan_regions_fast(CASES['entities_between']) == reference(CASES['entities_between'])
+
+
+def test_nested_regions_come_in_document_order():
+    xml_content = document(
+        region("Before", 0, 10),
+        '<obj><region><name>Outer</name>'
+        '<region><filename>/inner.wav</filename><start>0</start><end>20</end>'
+        '<region><filename>/innermost.wav</filename><start>0</start><end>30</end></region></region>'
+        '<region><name>No fields</name></region>'
+        '<filename>/outer.wav</filename><start>0</start><end>40</end></region></obj>\n',
+        region("After", 0, 50))
+    expected = [("/Audio/Before.wav", 0, 10), ("/outer.wav", 0, 40), ("/inner.wav", 0, 20),
+                ("/innermost.wav", 0, 30), ("/Audio/After.wav", 0, 50)]
+    assert reference(xml_content) == expected
+    # Small slices put the nested start and end tags in different feeds
+    assert list(core.iter_nuendo_regions(xml_content, chunk_size=7)) == expected
+    assert rows(core.parse_nuendo_xml(xml_content)) == expected
+
+
+def test_commented_out_regions_in_generated_payload():
+    _, xml_content = core.scan_clipboard_bytes(generate_clipboard_xml(600, seed=3).encode('utf-8'))
+    pieces = xml_content.split('  <obj ')
+    xml_content = pieces[0] + ''.join(('<!--  <obj ' + piece.rstrip() + ' -->\n') if index % 200 == 1
+                                      else '  <obj ' + piece for index, piece in enumerate(pieces[1:], 1))
+    expected = [record for record in reference(xml_content) if record[2] > record[1]]
+    assert len(expected) < 600
+
+    assert core.scan_regions_fast(xml_content) is None
+    assert rows(core.parse_nuendo_xml(xml_content)) == expected
+    assert audiotally_parallel.parse_chunked(xml_content, workers=3, min_size=0, min_chunk=1) is None
+
+
+def test_chunked_scanner_matches_serial_on_generated_payload():
+    _, xml_content = core.scan_clipboard_bytes(generate_clipboard_xml(3000, seed=5).encode('utf-8'))
+    expected = rows(core.parse_nuendo_xml(xml_content))
+    for workers in (2, 3, 4):
+        assert rows(audiotally_parallel.parse_chunked(xml_content, workers=workers, min_size=0,
+                                                      min_chunk=1)) == expected
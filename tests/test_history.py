@@ -0,0 +1,100 @@
+"""Calculation history: keyset paging, filters and the batching writer"""
+
+import pytest
+
+from audiotally_history import HistoryWriter, TallyHistory, connect, make_entry, write_entries
+from audiotally_store import ClipStore, FileIndex
+
+
+def entry(created, *files):
+    """A tally at created with (path, events, total_samples) rows for files"""
+    return make_entry(48000, sum(row[2] for row in files), sum(row[1] for row in files), created=created)._replace(
+        files=list(files))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "history.db")
+
+
+@pytest.fixture
+def history(db_path):
+    history = TallyHistory(db_path)
+    yield history
+    history.close()
+
+
+def write(db_path, entries):
+    connection = connect(db_path)
+    write_entries(connection, entries)
+    connection.close()
+
+
+def all_pages(history, limit, **filters):
+    pages = []
+    before = None
+    while True:
+        page = history.page(before, limit, **filters)
+        if not page:
+            return pages
+        pages.append(page)
+        before = (page[-1].created, page[-1].id)
+
+
+def test_keyset_pages_cover_rows_with_equal_timestamps_once(db_path, history):
+    # Five tallies share one timestamp, so a page boundary falls inside the tie
+    created = [1.0, 2.0, 2.0, 2.0, 2.0, 2.0, 3.0, 4.0]
+    write(db_path, [entry(when, ("/a.wav", 1, 100)) for when in created])
+
+    pages = all_pages(history, limit=3)
+    assert [len(page) for page in pages] == [3, 3, 2]
+    rows = [row for page in pages for row in page]
+    assert [row.created for row in rows] == sorted(created, reverse=True)
+    # Newest first, and among equal timestamps the later insert first
+    assert [row.id for row in rows] == [8, 7, 6, 5, 4, 3, 2, 1]
+    assert history.page(limit=100) == rows
+
+
+def test_path_filter_and_time_bounds(db_path, history):
+    write(db_path, [entry(1.0, ("/a.wav", 2, 100), ("/b.wav", 1, 50)),
+                    entry(2.0, ("/b.wav", 1, 70)),
+                    entry(3.0, ("/a.wav", 1, 10)),
+                    entry(4.0, ("/c.wav", 3, 30))])
+    assert history.count() == 4
+    assert history.count("/a.wav") == 2
+    assert history.count("/missing.wav") == 0
+
+    assert [row.created for row in history.page(path="/a.wav")] == [3.0, 1.0]
+    assert [row.created for page in all_pages(history, 1, path="/b.wav") for row in page] == [2.0, 1.0]
+    assert [row.created for row in history.page(since=2.0, until=4.0)] == [3.0, 2.0]
+    assert [row.created for row in history.page(path="/a.wav", since=2.0)] == [3.0]
+
+
+def test_rows_and_files_read_back(db_path, history):
+    store = ClipStore.from_records([("/a.wav", 0, 100), ("/b.wav", 0, 300), ("/a.wav", 200, 250)])
+    write(db_path, [make_entry(44100, store.total_samples(), len(store), FileIndex(store), b"\x01" * 16, created=5.0)])
+
+    row, = history.page()
+    assert history.get(row.id) == row
+    assert (row.created, row.sample_rate, row.events, row.total_samples, row.file_count) == (5.0, 44100, 3, 450, 2)
+    assert history.files(row.id) == [("/b.wav", 1, 300), ("/a.wav", 2, 150)]
+    assert history.get(row.id + 1) is None
+
+
+def test_writer_flushes_queued_entries_on_close(db_path, history):
+    writer = HistoryWriter(db_path)
+    for index in range(250):
+        writer.record(entry(float(index), ("/a.wav", 1, index)))
+    writer.close()
+    assert not writer._thread.is_alive()
+    assert (writer.written, writer.failed) == (250, 0)
+    assert history.count() == 250
+    assert history.page(limit=1)[0].total_samples == 249
+
+
+def test_writer_without_a_usable_database_drops_entries_quietly(tmp_path):
+    writer = HistoryWriter(str(tmp_path / "missing" / "history.db"))
+    writer.record(entry(1.0))
+    writer.close()
+    assert not writer._thread.is_alive()
+    assert (writer.written, writer.failed) == (0, 0)
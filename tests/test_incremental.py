@@ -0,0 +1,195 @@
+"""Incremental re-tally against a full parse of every snapshot"""
+
+import random
+
+import pytest
+
+import audiotally_core as core
+import audiotally_incremental
+from audiotally_incremental import IncrementalTally, changed_hunks
+from audiotally_store import FileIndex
+
+HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<vst-xml version="1.0">\n <list name="Events" type="obj">\n'
+FOOTER = ' </list>\n</vst-xml>\n'
+PATHS = [f"/Volumes/Audio/Reel {index}/Take_{index:03d}.wav" for index in range(6)]
+
+
+def render(events):
+    return HEADER + "".join(
+        f'  <obj class="MAudioEvent">\n'
+        f'   <region>\n'
+        f'    <name>{name}</name>\n'
+        f'    <filename>{path}</filename>\n'
+        f'    <start>{start}</start>\n'
+        f'    <end>{end}</end>\n'
+        f'   </region>\n'
+        f'  </obj>\n'
+        for name, path, start, end in events) + FOOTER
+
+
+def random_event(rng, serial):
+    start = rng.randrange(0, 48000 * 60)
+    # Now and then an empty or reversed region, which gets no row
+    length = rng.choice([0, -480]) if rng.random() < 0.05 else rng.randrange(480, 48000 * 10)
+    return (f"Event {serial}", rng.choice(PATHS), start, start + length)
+
+
+def edit(rng, events, serial):
+    """Apply one random edit to events in place"""
+    count = len(events)
+    operation = rng.choice(['nudge', 'nudge_adjacent', 'insert', 'insert_run', 'delete', 'delete_run',
+                            'swap_adjacent', 'duplicate', 'repath', 'scatter'])
+    # Bias edits towards the first and last regions, where the window meets the header and footer
+    index = rng.choice([0, count - 1, rng.randrange(count)]) if count else 0
+    if operation == 'nudge' and count:
+        name, path, start, end = events[index]
+        shift = rng.randrange(-4800, 4800)
+        events[index] = (name, path, start + shift, end + shift)
+    elif operation == 'nudge_adjacent' and count > 1:
+        index = min(index, count - 2)
+        for row in (index, index + 1):
+            name, path, start, end = events[row]
+            events[row] = (name, path, start, end + rng.randrange(1, 4800))
+    elif operation == 'insert':
+        events.insert(rng.choice([0, count, rng.randrange(count + 1)]), random_event(rng, serial))
+    elif operation == 'insert_run':
+        position = rng.choice([0, count, rng.randrange(count + 1)])
+        events[position:position] = [random_event(rng, f"{serial}.{n}") for n in range(rng.randrange(2, 5))]
+    elif operation == 'delete' and count:
+        del events[index]
+    elif operation == 'delete_run' and count:
+        del events[index:index + rng.randrange(2, 5)]
+    elif operation == 'swap_adjacent' and count > 1:
+        index = min(index, count - 2)
+        events[index], events[index + 1] = events[index + 1], events[index]
+    elif operation == 'duplicate' and count:
+        events.insert(index + 1, events[index])
+    elif operation == 'repath' and count:
+        name, path, start, end = events[index]
+        events[index] = (name, rng.choice(PATHS), start, end)
+    elif operation == 'scatter' and count:
+        # Several edits far apart in one copy: an insert, a delete and a nudge
+        events.insert(rng.randrange(count + 1), random_event(rng, serial))
+        del events[rng.randrange(len(events))]
+        index = rng.randrange(len(events))
+        name, path, start, end = events[index]
+        events[index] = (name, path, start, end + 1)
+
+
+def assert_matches_full_parse(tally, clips, xml_content):
+    expected = core.parse_nuendo_xml(xml_content)
+    if not expected:
+        assert clips is None
+        return
+    assert list(clips) == list(expected)
+    assert tally.total == expected.total_samples()
+    assert tally.files.rows('path') == FileIndex(expected).rows('path')
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_incremental_updates_match_full_parse(seed):
+    rng = random.Random(seed)
+    events = [random_event(rng, serial) for serial in range(rng.randrange(1, 40))]
+    tally = IncrementalTally()
+    diffed = 0
+    for step in range(150):
+        xml_content = render(events)
+        clips, delta = tally.update(xml_content)
+        diffed += delta is not None
+        assert_matches_full_parse(tally, clips, xml_content)
+        edit(rng, events, f"{seed}-{step}")
+        if not events:
+            events.append(random_event(rng, f"{seed}-{step}"))
+    # Most snapshots must have taken the incremental path, or this tests only the full parse
+    assert diffed > 100
+
+
+def test_edits_at_both_ends_and_in_adjacent_regions():
+    events = [(f"Event {index}", PATHS[index % len(PATHS)], index * 9_600, index * 9_600 + 4_800)
+              for index in range(20)]
+    first = ("First", PATHS[0], 10, 20_000)
+    last = ("Last", PATHS[1], 30, 40_000)
+    edits = [
+        lambda events: [first] + events,
+        lambda events: events + [last],
+        lambda events: events[1:],
+        lambda events: events[:-1],
+        lambda events: events[:4] + [(name, path, start, end + 100)
+                                     for name, path, start, end in events[4:6]] + events[6:],
+        lambda events: events[:7] + [events[8], events[7]] + events[9:],
+        lambda events: events[:10] + [first, last] + events[10:],
+        lambda events: events[2:],
+        lambda events: events[:-2],
+    ]
+    tally = IncrementalTally()
+    tally.update(render(events))
+    for change in edits:
+        events = change(events)
+        xml_content = render(events)
+        clips, delta = tally.update(xml_content)
+        assert delta is not None
+        assert_matches_full_parse(tally, clips, xml_content)
+
+
+@pytest.mark.parametrize('opening, closing', [('<!-- ', ' -->'), ('<![CDATA[', ']]>')])
+def test_region_hidden_in_a_comment_is_not_counted(opening, closing):
+    events = [(f"Event {index}", PATHS[index % len(PATHS)], 0, 4_800 + index) for index in range(10)]
+    tally = IncrementalTally()
+    xml_content = render(events)
+    tally.update(xml_content)
+
+    hidden = render(events[5:6])[len(HEADER):-len(FOOTER)]
+    xml_content = xml_content.replace(hidden, opening + hidden + closing)
+    clips, _ = tally.update(xml_content)
+    assert_matches_full_parse(tally, clips, xml_content)
+    assert len(clips) == 9
+
+    # Uncommenting it again must count it once more
+    clips, _ = tally.update(render(events))
+    assert len(clips) == 10
+
+
+def test_far_apart_edits_cost_only_the_changed_regions(monkeypatch):
+    events = [(f"Event {index}", PATHS[index % len(PATHS)], index, index + 4_800) for index in range(2000)]
+    tally = IncrementalTally()
+    old = render(events)
+    tally.update(old)
+
+    edited = list(events)
+    edited[0] = ("Event 0", PATHS[0], 0, 9_600)
+    edited[1000:1001] = []
+    edited.insert(1500, ("Inserted", PATHS[2], 0, 480))
+    edited[-1] = ("Event 1999", PATHS[1], 1999, 9_999)
+    new = render(edited)
+
+    hunks = changed_hunks(old, new, 100)
+    assert len(hunks) == 4
+    # Each hunk holds the one block that changed, however far the hunks are apart
+    assert all(old[old_begin:old_end].count('</region>') <= 1 and new[new_begin:new_end].count('</region>') <= 1
+               for old_begin, old_end, new_begin, new_end in hunks)
+
+    scanned = []
+    parse_region_block = audiotally_incremental.core.parse_region_block
+    monkeypatch.setattr(audiotally_incremental.core, 'parse_region_block',
+                        lambda block: scanned.append(block) or parse_region_block(block))
+    clips, delta = tally.update(new)
+    assert len(scanned) == 3
+    assert delta == (3, 3)
+    assert_matches_full_parse(tally, clips, new)
+
+
+def test_hunks_line_up_after_inserts_and_deletes():
+    blocks = [f"<obj><region><name>E{index}</name></region></obj>" for index in range(50)]
+    old = "<doc>" + "".join(blocks) + "</doc>"
+    new = "<doc>" + "".join(blocks[:10] + ["<obj><region><name>X</name></region></obj>"] * 3
+                            + blocks[10:30] + blocks[33:]) + "</doc>"
+    hunks = changed_hunks(old, new, 100)
+    assert [(new[new_begin:new_end].count('</region>'), old[old_begin:old_end].count('</region>'))
+            for old_begin, old_end, new_begin, new_end in hunks] == [(3, 0), (0, 3)]
+    # Applying the hunks to old gives new back
+    rebuilt, copied = [], 0
+    for old_begin, old_end, new_begin, new_end in hunks:
+        rebuilt += [old[copied:old_begin], new[new_begin:new_end]]
+        copied = old_end
+    assert "".join(rebuilt) + old[copied:] == new
+    assert changed_hunks(old, new, 2) is None
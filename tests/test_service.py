@@ -0,0 +1,61 @@
+"""The tally service over a Unix socket"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+import audiotally_service as service
+
+pytestmark = pytest.mark.skipif(not hasattr(asyncio, 'start_unix_server'), reason="needs Unix sockets")
+
+PAYLOAD = ('<?xml version="1.0" encoding="utf-8"?>\n<vst-xml version="1.0"><list name="Events">'
+           '<obj><region><name>A</name><filename>/a.wav</filename><start>0</start><end>48000</end></region></obj>'
+           '</list></vst-xml>\n').encode('utf-8')
+
+
+async def exchange(socket_path, request):
+    """Send raw request bytes and return (status, JSON body) of the reply"""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = int(next(line.split(b":")[1] for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")))
+    body = await reader.readexactly(length)
+    writer.close()
+    return int(head.split()[1]), json.loads(body)
+
+
+def serve(tmp_path, *requests):
+    socket_path = os.path.join(tmp_path, "tally.sock")
+
+    async def run():
+        tally_service = service.TallyService()
+        await tally_service.start(socket_path)
+        try:
+            return [await exchange(socket_path, request) for request in requests]
+        finally:
+            await tally_service.close()
+
+    return asyncio.run(run())
+
+
+def test_tally_and_stats(tmp_path):
+    tally = (b"POST /tally?rate=48000 HTTP/1.1\r\nContent-Length: %d\r\nConnection: close\r\n\r\n" % len(PAYLOAD)
+             + PAYLOAD)
+    (status, body), (stats_status, stats) = serve(tmp_path, tally, b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 200 and body['events'] == 1 and body['total_samples'] == 48000
+    assert stats_status == 200
+
+
+def test_request_line_too_long(tmp_path):
+    request = b"GET /stats?" + b"x" * (service.MAX_LINE + 10) + b" HTTP/1.1\r\n\r\n"
+    [(status, body)] = serve(tmp_path, request)
+    assert status == 414 and 'request line' in body['error']
+
+
+def test_header_line_too_long(tmp_path):
+    request = b"GET /stats HTTP/1.1\r\nX-Long: " + b"x" * (service.MAX_LINE + 10) + b"\r\n\r\n"
+    [(status, body)] = serve(tmp_path, request)
+    assert status == 431 and 'header line' in body['error']
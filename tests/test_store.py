@@ -0,0 +1,155 @@
+"""Columnar clip store and per-file index, on the builtins and on NumPy"""
+
+import array
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+import audiotally_store
+from audiotally_store import NUMPY_MIN_ROWS, Clip, ClipStore, FileIndex, FileTotal, load_numpy, numpy_for
+
+RECORDS = [
+    ("/Audio/Dialog.wav", 0, 480),
+    ("/Audio/Foley.wav", 100, 400),
+    ("/Audio/Dialog.wav", 1000, 1960),
+    ("/Other/dialog.wav", 50, 350),
+    ("/Audio/Foley.wav", 10, 5),  # end <= start: no clip
+    (None, 0, 120),
+]
+
+
+def test_records_become_columns_and_clips(column_backend):
+    store = ClipStore.from_records(RECORDS)
+    assert len(store) == 5
+    assert store.paths == ["/Audio/Dialog.wav", "/Audio/Foley.wav", "/Other/dialog.wav", None]
+    assert store.names == ["Dialog.wav", "Foley.wav", "dialog.wav", "Unknown"]
+    assert list(store.file_ids) == [0, 1, 0, 2, 3]
+    assert list(store.durations) == [480, 300, 960, 300, 120]
+    assert store[2] == Clip("Dialog.wav", 1000, 1960, 960, "/Audio/Dialog.wav")
+    assert list(store)[-1] == Clip("Unknown", 0, 120, 120, None)
+
+    assert store.total_samples() == 2160
+    assert (store.shortest(), store.longest()) == (120, 960)
+    assert store.per_file_events() == [2, 1, 1, 1]
+    assert store.per_file_samples() == [1440, 300, 300, 120]
+
+
+def test_empty_store(column_backend):
+    store = ClipStore()
+    assert not store
+    assert (store.total_samples(), store.shortest(), store.longest()) == (0, 0, 0)
+    assert store.per_file_events() == [] and store.per_file_samples() == []
+    assert FileIndex(store).rows() == []
+
+
+def chunk(records):
+    """Columns of one parser chunk, with file ids indexing its own paths list"""
+    paths, file_ids = [], array.array('i')
+    starts, ends, durations = array.array('q'), array.array('q'), array.array('q')
+    for path, start, end in records:
+        if path not in paths:
+            paths.append(path)
+        file_ids.append(paths.index(path))
+        starts.append(start)
+        ends.append(end)
+        durations.append(end - start)
+    return paths, starts, ends, durations, file_ids
+
+
+def test_extend_columns_remaps_chunk_file_ids(column_backend):
+    first = [("/a.wav", 0, 10), ("/b.wav", 0, 20)]
+    # The second chunk numbers its files from 0 too, in a different order, with one new file
+    second = [("/c.wav", 0, 30), ("/b.wav", 5, 25), ("/a.wav", 1, 11), ("/c.wav", 2, 32)]
+    store = ClipStore()
+    store.extend_columns(*chunk(first))
+    store.extend_columns(*chunk(second))
+    assert store.paths == ["/a.wav", "/b.wav", "/c.wav"]
+    assert list(store.file_ids) == [0, 1, 2, 1, 0, 2]
+    assert list(store) == list(ClipStore.from_records(first + second))
+
+
+def test_splice_replaces_row_ranges_and_keeps_the_original():
+    store = ClipStore.from_records([(f"/{index}.wav", index, index + 10) for index in range(6)])
+    spliced = store.splice([(0, 1, [("/new.wav", 0, 5)]), (3, 5, []), (6, 6, [("/0.wav", 7, 9), ("/x.wav", 3, 3)])])
+    assert [(clip.path, clip.start, clip.end) for clip in spliced] == [
+        ("/new.wav", 0, 5), ("/1.wav", 1, 11), ("/2.wav", 2, 12), ("/5.wav", 5, 15), ("/0.wav", 7, 9)]
+    assert len(store) == 6 and store[0].path == "/0.wav"
+
+
+def random_records(count, seed):
+    rng = random.Random(seed)
+    records = []
+    for _ in range(count):
+        start = rng.randrange(0, 48000 * 600)
+        records.append((f"/Volumes/Take{rng.randrange(40)}.wav", start, start + rng.randrange(-100, 48000 * 30)))
+    return records
+
+
+@pytest.mark.parametrize('rows', [NUMPY_MIN_ROWS - 1, NUMPY_MIN_ROWS, 3 * NUMPY_MIN_ROWS])
+def test_backends_agree_around_the_numpy_threshold(monkeypatch, rows):
+    if load_numpy() is None:
+        pytest.skip("NumPy is not installed")
+    records = random_records(rows * 11 // 10, seed=rows)
+
+    results = []
+    for min_rows in (float('inf'), NUMPY_MIN_ROWS, 0):
+        monkeypatch.setattr(audiotally_store, 'NUMPY_MIN_ROWS', min_rows)
+        half = len(records) // 2
+        store = ClipStore()
+        store.extend_columns(*chunk([record for record in records[:half] if record[2] > record[1]]))
+        store.extend_columns(*chunk([record for record in records[half:] if record[2] > record[1]]))
+        files = FileIndex(store)
+        results.append((list(store), store.total_samples(), store.shortest(), store.longest(),
+                        store.per_file_events(), store.per_file_samples(),
+                        {sort: files.rows(sort) for sort in audiotally_store.FILE_SORTS}))
+    assert results[0] == results[1] == results[2]
+
+
+def test_numpy_only_above_the_threshold():
+    assert numpy_for(NUMPY_MIN_ROWS - 1) is None
+    assert numpy_for(NUMPY_MIN_ROWS) is load_numpy()
+
+
+def test_small_stores_never_import_numpy():
+    script = ("import sys, audiotally_core, audiotally_coverage\n"
+              "from audiotally_store import ClipStore, FileIndex\n"
+              "store = ClipStore.from_records([('/a.wav', index, index + 10) for index in range(1000)])\n"
+              "store.total_samples(); store.per_file_samples(); FileIndex(store).rows()\n"
+              "audiotally_coverage.coverage(store, 'per_file')\n"
+              "assert 'numpy' not in sys.modules\n")
+    root = os.path.dirname(os.path.abspath(audiotally_store.__file__))
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=root)
+
+
+def test_file_index_totals_shares_and_sort_orders(column_backend):
+    store = ClipStore.from_records(RECORDS)
+    files = FileIndex(store)
+    assert len(files) == 4
+    assert files.total_samples == 2160
+    dialog = files.get("/Audio/Dialog.wav")
+    assert dialog == FileTotal("/Audio/Dialog.wav", "Dialog.wav", 2, 1440, pytest.approx(1440 * 100 / 2160))
+    assert files.get("/missing.wav") is None
+    assert sum(row.percent for row in files.rows()) == pytest.approx(100)
+
+    assert [row.path for row in files.rows('duration')][0] == "/Audio/Dialog.wav"
+    assert [row.total_samples for row in files.rows('duration')] == [1440, 300, 300, 120]
+    assert [row.events for row in files.rows('events')][0] == 2
+    # Names sort case-insensitively with ties broken by path; a missing path shows as Unknown
+    assert [row.path for row in files.rows('name')] == [
+        "/Audio/Dialog.wav", "/Other/dialog.wav", "/Audio/Foley.wav", None]
+    # By path it sorts first
+    assert [row.path for row in files.rows('path')] == [
+        None, "/Audio/Dialog.wav", "/Audio/Foley.wav", "/Other/dialog.wav"]
+    assert [row.total_samples for row in files.rows('duration', descending=False)] == [120, 300, 300, 1440]
+
+
+def test_file_index_skips_files_without_clips():
+    store = ClipStore.from_records([("/a.wav", 0, 10), ("/b.wav", 0, 20)])
+    # Counts kept by delta, e.g. after the only clip of /a.wav was edited out
+    files = FileIndex(store, events=[0, 1], samples=[0, 20])
+    assert len(files) == 1
+    assert [row.path for row in files.rows()] == ["/b.wav"]
+    assert files.rows()[0].percent == 100.0
@@ -0,0 +1,90 @@
+"""Sample, seconds and SMPTE timecode conversions"""
+
+import fractions
+
+import pytest
+
+import audiotally_core as core
+
+
+@pytest.mark.parametrize('frames, timecode', [
+    (0, "00:00:00;00"),
+    (1799, "00:00:59;29"),
+    # Frame numbers 00 and 01 do not exist at the start of minute 1
+    (1800, "00:01:00;02"),
+    (1801, "00:01:00;03"),
+    (3597, "00:01:59;29"),
+    (3598, "00:02:00;02"),
+    (17981, "00:09:59;29"),
+    # Every tenth minute keeps all its frame numbers
+    (17982, "00:10:00;00"),
+    (17983, "00:10:00;01"),
+    (17984, "00:10:00;02"),
+    (19781, "00:10:59;29"),
+    (19782, "00:11:00;02"),
+    (107892, "01:00:00;00"),
+])
+def test_drop_frame_minute_boundaries(frames, timecode):
+    assert core.frames_to_timecode(frames, "29.97df") == timecode
+
+
+@pytest.mark.parametrize('frames, timecode', [
+    (3599, "00:00:59;59"),
+    (3600, "00:01:00;04"),
+    (35964, "00:10:00;00"),
+])
+def test_drop_frame_minute_boundaries_at_59_94(frames, timecode):
+    assert core.frames_to_timecode(frames, "59.94df") == timecode
+
+
+def test_drop_frame_labels_are_consecutive_and_never_use_dropped_numbers():
+    previous = None
+    for frames in range(0, 107892 + 1):
+        timecode = core.frames_to_timecode(frames, "29.97df")
+        hours, minutes, seconds, frame = map(int, timecode.replace(';', ':').split(':'))
+        if seconds == 0 and frame < 2:
+            assert minutes % 10 == 0, timecode
+        label = ((hours * 60 + minutes) * 60 + seconds) * 30 + frame
+        if previous is not None:
+            # One label ahead, or three across a dropped pair
+            assert label - previous in (1, 3), timecode
+        previous = label
+
+
+def test_ten_minutes_of_drop_frame_samples_read_ten_minutes():
+    # 17982 frames at 29.97 fps take 28799971.2 samples at 48 kHz
+    assert core.samples_to_timecode(28_799_971, 48000, "29.97df") == "00:09:59;29"
+    assert core.samples_to_timecode(28_799_972, 48000, "29.97df") == "00:10:00;00"
+
+
+@pytest.mark.parametrize('sample_rate, frames_2997', [
+    (47952.048, 6249),
+    ("47952.048", 6249),
+    # 48 kHz pulled down by exactly 1000/1001: 10M samples are exactly 6250 frames at 29.97
+    (fractions.Fraction(48_000_000, 1001), 6250),
+])
+def test_non_integer_sample_rates(sample_rate, frames_2997):
+    samples = 10_000_000  # 208.5416... seconds at either rate
+    assert core.samples_to_time(samples, sample_rate) == "3:28.541"
+    assert core.samples_to_seconds(samples, sample_rate) == "208.542"
+    assert core.samples_to_frames(samples, sample_rate, "25") == 5213
+    frames = core.samples_to_frames(samples, sample_rate, "29.97df")
+    assert type(frames) is int
+    assert frames == frames_2997
+    assert core.samples_to_timecode(samples, sample_rate, "29.97df") == core.frames_to_timecode(frames, "29.97df")
+
+
+def test_non_integer_rate_matches_its_integer_value():
+    for samples in (0, 1, 47999, 48000, 2_880_000, 172_800_000):
+        assert core.samples_to_time(samples, 48000.0) == core.samples_to_time(samples, 48000)
+        assert core.samples_to_seconds(samples, 48000.0) == core.samples_to_seconds(samples, 48000)
+        assert (core.samples_to_timecode(samples, 48000.0, "23.976")
+                == core.samples_to_timecode(samples, 48000, "23.976"))
+
+
+def test_pulled_down_rate_runs_slower_than_nominal():
+    # An hour of 48 kHz samples played at 47952 Hz lasts 3603.6 seconds
+    samples = 48000 * 3600
+    assert core.samples_to_time(samples, 47952) == "60:03.603"
+    assert core.samples_to_time(samples, 47952.0) == "60:03.603"
+    assert core.samples_to_seconds(samples, 47952.0, 1) == "3603.6"
@@ -0,0 +1,109 @@
+"""Stage timing: histogram statistics, the disabled no-op path and startup phases"""
+
+import json
+
+import pytest
+
+import audiotally_timing
+from audiotally_timing import BUCKET_BOUNDS_MS, RollingHistogram, StartupTimer, Timings
+
+
+def test_percentiles_and_mean_of_the_window():
+    histogram = RollingHistogram()
+    for milliseconds in range(100, 0, -1):  # Order of arrival does not matter
+        histogram.add(milliseconds / 1000)
+    summary = histogram.summary()
+    assert (summary['count'], summary['window']) == (100, 100)
+    assert summary['mean_ms'] == pytest.approx(50.5)
+    # Nearest rank, rounding up: the 50th percentile of 1..100 is the 51st value
+    assert summary['p50_ms'] == pytest.approx(51)
+    assert summary['p90_ms'] == pytest.approx(91)
+    assert summary['p99_ms'] == pytest.approx(100)
+    assert summary['max_ms'] == pytest.approx(100)
+
+
+def test_buckets_count_each_run_once_with_bounds_in_the_upper_bucket():
+    histogram = RollingHistogram()
+    for milliseconds in (0.05, 0.1, 0.2, 0.99, 1, 2.5, 50, 299, 1000, 5000):
+        histogram.add(milliseconds / 1000)
+    buckets = histogram.summary()['buckets']
+    assert list(buckets) == [f"<{bound}ms" for bound in BUCKET_BOUNDS_MS] + [">=1000ms"]
+    assert buckets == {"<0.1ms": 1, "<0.3ms": 2, "<1ms": 1, "<3ms": 2, "<10ms": 0, "<30ms": 0,
+                       "<100ms": 1, "<300ms": 1, "<1000ms": 0, ">=1000ms": 2}
+    assert sum(buckets.values()) == 10
+
+
+def test_window_keeps_only_the_latest_runs():
+    histogram = RollingHistogram(window=4)
+    for milliseconds in (100, 200, 1, 2, 3, 4):
+        histogram.add(milliseconds / 1000)
+    summary = histogram.summary()
+    assert (summary['count'], summary['window']) == (6, 4)
+    assert summary['max_ms'] == pytest.approx(4)
+    assert summary['mean_ms'] == pytest.approx(2.5)
+    assert RollingHistogram().summary() == {'count': 0, 'window': 0}
+
+
+def test_disabled_stage_is_one_shared_no_op():
+    timings = Timings(enabled=False)
+    assert timings.stage("a") is timings.stage("b")
+    with timings.stage("a"):
+        pass
+    assert timings.snapshot() == {}
+    assert timings.format_table().count("\n") == 0
+
+
+def test_enabled_stages_record_each_run_even_when_it_raises():
+    timings = Timings(enabled=True, window=8)
+    with timings.stage("parse"):
+        pass
+    with pytest.raises(ValueError):
+        with timings.stage("parse"):
+            raise ValueError
+    with timings.stage("format"):
+        pass
+
+    snapshot = timings.snapshot()
+    assert list(snapshot) == ["format", "parse"]
+    assert snapshot['parse']['count'] == 2
+    assert [line.split()[0] for line in timings.format_table().splitlines()] == ["stage", "format", "parse"]
+
+    timings.reset()
+    assert timings.snapshot() == {}
+
+
+def test_export_json(tmp_path):
+    timings = Timings(enabled=True)
+    timings.record("poll.scan", 0.002)
+    path = tmp_path / "timings.json"
+    timings.export_json(str(path))
+    report = json.loads(path.read_text())
+    assert report['window'] == timings.window
+    assert report['stages']['poll.scan']['p50_ms'] == pytest.approx(2)
+
+
+def test_startup_phases_and_budget(monkeypatch):
+    clock = iter([0.1, 0.4, 0.7, 0.9])
+    monkeypatch.setattr(audiotally_timing.time, 'perf_counter', lambda: next(clock))
+    startup = StartupTimer(started=0.0, budget_ms=650)
+    startup.mark("imports")
+    startup.mark("ui")
+    assert startup.budget_elapsed_ms() is None and not startup.within_budget()
+    startup.mark("first_poll", ends_budget=True)
+    startup.mark("idle")
+
+    assert startup.budget_elapsed_ms() == pytest.approx(700)
+    assert not startup.within_budget()
+    assert startup.as_dict()['total_ms'] == pytest.approx(900)
+    assert "OVER the 650 ms budget" in startup.format_report()
+
+    timings = Timings()
+    startup.record(timings)
+    assert list(timings.snapshot()) == ["startup.first_poll", "startup.idle", "startup.imports", "startup.ui"]
+
+
+def test_startup_budget_from_the_environment(monkeypatch):
+    monkeypatch.setenv("AUDIOTALLY_STARTUP_BUDGET_MS", "1200")
+    assert StartupTimer().budget_ms == 1200
+    monkeypatch.setenv("AUDIOTALLY_STARTUP_BUDGET_MS", "soon")
+    assert StartupTimer().budget_ms == audiotally_timing.STARTUP_BUDGET_MS
@@ -0,0 +1,77 @@
+"""View state: status bar options and configure() only on change"""
+
+import pytest
+
+from audiotally_view import INACTIVE, READY_ACTIVE, STATUS_STATES, WidgetView, status_sections
+
+
+class FakeWidget:
+    """Records configure() calls like a customtkinter widget would redraw"""
+
+    def __init__(self):
+        self.calls = []
+
+    def configure(self, **options):
+        self.calls.append(options)
+
+
+def test_unchanged_options_skip_configure():
+    view = WidgetView()
+    widget = FakeWidget()
+    assert view.configure(widget, text="0:00.000", text_color="white")
+    assert not view.configure(widget, text="0:00.000", text_color="white")
+    assert not view.configure(widget, text="0:00.000")
+    assert widget.calls == [{'text': "0:00.000", 'text_color': "white"}]
+    assert view.stats() == {'widgets': 1, 'configured': 1, 'skipped': 2}
+
+
+def test_only_the_differing_options_are_passed_on():
+    view = WidgetView()
+    widget = FakeWidget()
+    view.remember(widget, text="Status", fg_color=INACTIVE[0])
+    assert not view.configure(widget, text="Status")  # Created with it, so nothing to redraw
+    assert view.configure(widget, text="Status", fg_color=READY_ACTIVE[0])
+    assert widget.calls == [{'fg_color': READY_ACTIVE[0]}]
+
+
+def test_forget_makes_the_next_update_configure_again():
+    view = WidgetView()
+    widget = FakeWidget()
+    view.configure(widget, text="a")
+    view.forget(widget)
+    assert view.configure(widget, text="a")
+    assert widget.calls == [{'text': "a"}, {'text': "a"}]
+    view.forget(FakeWidget())  # Unknown widgets are fine
+
+
+def test_none_is_a_value_like_any_other():
+    view = WidgetView()
+    widget = FakeWidget()
+    assert view.configure(widget, image=None)
+    assert not view.configure(widget, image=None)
+
+
+def test_repeating_a_status_state_configures_nothing():
+    view = WidgetView()
+    sections = [FakeWidget(), FakeWidget(), FakeWidget()]
+    for state in STATUS_STATES:
+        for widget, options in zip(sections, status_sections(state, 12, calculated_before=True)):
+            view.configure(widget, **options)
+    calls = sum(len(widget.calls) for widget in sections)
+
+    for widget, options in zip(sections, status_sections("calculated_phase2", 12, calculated_before=True)):
+        view.configure(widget, **options)
+    assert sum(len(widget.calls) for widget in sections) == calls
+
+
+def test_ready_keeps_a_calculated_result_on_screen():
+    assert status_sections("ready", calculated_before=True)[2] == {}
+    assert status_sections("ready")[2]['text'] == "Status"
+    # While detecting, the calculated section is grayed out but keeps its text
+    assert 'text' not in status_sections("detecting", 3, calculated_before=True)[2]
+    assert "3 events" in status_sections("detecting", 3)[1]['text']
+
+
+def test_unknown_status_state():
+    with pytest.raises(ValueError):
+        status_sections("calculating")